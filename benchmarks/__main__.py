@@ -0,0 +1,73 @@
+"""Runs the benchmark suite and writes the results as JSON.
+
+Run from the repository root::
+
+    python -m benchmarks --properties 100 --children 1000 --depth 2 --output results.json
+
+Results from different versions can be compared by diffing the JSON.
+"""
+from __future__ import absolute_import, print_function
+import argparse
+import json
+import platform
+import sys
+import time
+
+from .documents import DOCUMENTS
+from .stages import prepare, measure
+
+
+def run(documents, properties, children, depth, repeat, stages=None):
+    """Returns a list of result dicts, one per document and stage."""
+    params = {'properties': properties, 'children': children, 'depth': depth}
+    results = []
+    for name in documents:
+        doc = DOCUMENTS[name](**params)
+        for stage, func in prepare(doc):
+            if stages and stage not in stages:
+                continue
+            result = {'document': name, 'stage': stage}
+            result.update(params)
+            result.update(measure(func, repeat))
+            results.append(result)
+    return results
+
+
+def print_results(results, file=sys.stdout):
+    print('{:>10} {:>16} {:>12} {:>12} {:>14}'.format(
+        'document', 'stage', 'best (ms)', 'mean (ms)', 'peak (KiB)'
+    ), file=file)
+    for r in results:
+        print('{:>10} {:>16} {:>12.3f} {:>12.3f} {:>14.1f}'.format(
+            r['document'], r['stage'], r['best'] * 1e3, r['mean'] * 1e3, r['peak_memory'] / 1024.
+        ), file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--documents', nargs='+', choices=sorted(DOCUMENTS), default=sorted(DOCUMENTS))
+    parser.add_argument('--stages', nargs='+', help='only run these stages')
+    parser.add_argument('--properties', type=int, default=100, help='extra properties for the basic document')
+    parser.add_argument('--children', type=int, default=1000, help='list children for the dynamic and complex documents')
+    parser.add_argument('--depth', type=int, default=2, help='nesting depth of the extra basic properties')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    results = run(args.documents, args.properties, args.children, args.depth, args.repeat, args.stages)
+    print_results(results)
+
+    if args.output:
+        report = {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Measures the cost of attribute access on XML_Object.
+
+Compares the current DescriptorMixin with the previous implementation,
+which intercepted every attribute read with __getattribute__.
+
+Run from the repository root::
+
+    python -m benchmarks.attributes [number]
+"""
+from __future__ import absolute_import, print_function
+import sys
+import timeit
+
+from obj2xml import XML_Object, XML_Property
+
+
+class LegacyDescriptorMixin(object):
+    """The DescriptorMixin from obj2xml 1.0.1."""
+    def __getattribute__(self, name):
+        attr = super(LegacyDescriptorMixin, self).__getattribute__(name)
+        if hasattr(attr, "__get__") and not callable(attr):
+            return attr.__get__(self, self.__class__)
+        else:
+            return attr
+
+    def __setattr__(self, name, value):
+        try:
+            attr = super(LegacyDescriptorMixin, self).__getattribute__(name)
+            return attr.__set__(self, value)
+        except AttributeError:
+            return super(LegacyDescriptorMixin, self).__setattr__(name, value)
+
+
+class Current(XML_Object):
+    prop = XML_Property(['root', 'prop'], 'default')
+
+    def method(self):
+        pass
+
+
+class Legacy(LegacyDescriptorMixin):
+    prop = XML_Property(['root', 'prop'], 'default')
+
+    def method(self):
+        pass
+
+
+STATEMENTS = [
+    ('get attribute', 'obj.plain'),
+    ('set attribute', 'obj.plain = 1'),
+    ('get method', 'obj.method'),
+    ('get __dict__', 'obj.__dict__'),
+    ('get property', 'obj.prop'),
+    ('set property', 'obj.prop = "value"'),
+    ('get runtime property', 'obj.runtime'),
+    ('set runtime property', 'obj.runtime = "value"'),
+]
+
+
+def create(cls):
+    obj = cls()
+    obj.plain = 0
+    obj.runtime = XML_Property(['root', 'runtime'], 'default')
+    return obj
+
+
+def run(number=200000):
+    print('{:>22} {:>10} {:>10}'.format('ns per operation', 'legacy', 'current'))
+    for name, statement in STATEMENTS:
+        timings = []
+        for cls in (Legacy, Current):
+            obj = create(cls)
+            seconds = min(timeit.repeat(statement, globals={'obj': obj}, number=number, repeat=3))
+            timings.append(seconds / number * 1e9)
+        print('{:>22} {:>10.1f} {:>10.1f}'.format(name, *timings))
+
+
+if __name__ == '__main__':
+    run(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,50 @@
+"""Compares writing compact XML through to_dict, dict2xml and
+ElementTree's tostring with the native writer and the generated writer.
+
+Builds a CurrentSync document with a few thousand FileDownload children.
+
+Run from the repository root::
+
+    python -m benchmarks.compact [downloads] [repeat]
+"""
+from __future__ import absolute_import, print_function
+import sys
+import timeit
+from xml.etree.ElementTree import tostring
+
+from dict2xml import dict2xml
+
+from examples.complex_doc import CurrentSync, FileDownload
+from .documents import create_current_sync
+
+
+def dict_bytes(doc):
+    return tostring(dict2xml(doc.to_dict()), encoding='UTF-8')
+
+
+def native_bytes(doc):
+    return doc.to_bytes()
+
+
+def codegen_bytes(doc):
+    CurrentSync.xml_codegen = FileDownload.xml_codegen = True
+    try:
+        return doc.to_bytes()
+    finally:
+        del CurrentSync.xml_codegen, FileDownload.xml_codegen
+
+
+def run(downloads=3000, repeat=20):
+    doc = create_current_sync(children=downloads)
+    print('CurrentSync with {} FileDownload children, best of {}'.format(downloads, repeat))
+    results = {}
+    for name, func in [('dict2xml', dict_bytes), ('native', native_bytes),
+                       ('codegen', codegen_bytes)]:
+        results[name] = min(timeit.repeat(lambda: func(doc), number=1, repeat=repeat))
+        print('{:>10}: {:.4f}s {:>6.2f}x'.format(
+            name, results[name], results[name] / results['dict2xml']
+        ))
+
+
+if __name__ == '__main__':
+    run(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,84 @@
+"""Scaled up versions of the example documents.
+
+Each factory returns a populated XML_Object. Fragment caching is
+turned off, so repeated renders do the full amount of work.
+"""
+from __future__ import absolute_import
+
+from obj2xml import XML_Property, XML_TextProperty
+from examples import basic_doc, dynamic_doc
+from examples.complex_doc import CurrentSync, FileDownload
+
+
+def scaled_basic_class(properties, depth):
+    """Creates a subclass of basic_doc.MyExampleXML with extra properties.
+
+    The properties are nested depth elements below the root,
+    alternating between text nodes and attributes.
+    """
+    attrs = {}
+    for i in range(properties):
+        path = ['root'] + ['level{}'.format(d) for d in range(depth)]
+        if i % 2:
+            attrs['prop{}'.format(i)] = XML_Property(path + ['attr{}'.format(i)], i)
+        else:
+            attrs['prop{}'.format(i)] = XML_TextProperty(path + ['text{}'.format(i)], i)
+    return type('ScaledExampleXML', (basic_doc.MyExampleXML,), attrs)
+
+
+def create_basic(properties=100, children=0, depth=2):
+    """basic_doc with additional properties. children is unused."""
+    doc = scaled_basic_class(properties, depth)()
+    doc.xml_incremental = False
+    doc.test_value = 'Benchmark value'
+    doc.text_node = 'Some text'
+    return doc
+
+
+def create_dynamic(properties=0, children=1000, depth=0):
+    """dynamic_doc with children ChildNodes and presentations."""
+    doc = dynamic_doc.MyExampleXML()
+    doc.xml_incremental = False
+    doc.children = [dynamic_doc.ChildNode(text='child {}'.format(i)) for i in range(children)]
+    doc.presentations = [{'index': i, '_text': 'presentation {}'.format(i)} for i in range(children)]
+    return doc
+
+
+def create_current_sync(properties=0, children=1000, depth=0, incremental=False):
+    """complex_doc CurrentSync with children FileDownloads."""
+    doc = CurrentSync()
+    doc.xml_incremental = incremental
+    doc.unit_name = 'Benchmark Unit'
+    for i in range(children):
+        f = FileDownload()
+        f.xml_incremental = incremental
+        f.name = 'file-{}.mov'.format(i)
+        f.hash = '{:040x}'.format(i)
+        f.size = i * 1024
+        f.link = 'pool/{0}/{0}/sha1-{1:040x}'.format(i % 10, i)
+        doc.files.append(f)
+    return doc
+
+
+DOCUMENTS = {
+    'basic': create_basic,
+    'dynamic': create_dynamic,
+    'complex': create_current_sync,
+}
+
+
+class Source(object):
+    """A plain object used as the input to from_object."""
+    pass
+
+
+def create_source(doc):
+    """Creates a plain object holding a value for each
+    scalar property of doc.
+    """
+    source = Source()
+    for entry in doc.xml_plan():
+        value = getattr(doc, entry.name)
+        if value is not None and not isinstance(value, list):
+            setattr(source, entry.name, value)
+    return source
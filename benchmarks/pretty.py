@@ -0,0 +1,39 @@
+"""Compares pretty printing through xml.dom.minidom with the
+writer's built in pretty printing.
+
+Builds a CurrentSync document with a few thousand FileDownload children.
+
+Run from the repository root::
+
+    python -m benchmarks.pretty [downloads] [repeat]
+"""
+from __future__ import absolute_import, print_function
+import sys
+import timeit
+import xml.dom.minidom
+from xml.etree.ElementTree import tostring
+
+from .documents import create_current_sync
+
+
+def minidom_pretty(doc):
+    s = tostring(doc.to_xml(), encoding='UTF-8')
+    return xml.dom.minidom.parseString(s).toprettyxml(indent='  ')
+
+
+def native_pretty(doc):
+    return doc.to_string(pretty=True)
+
+
+def run(downloads=5000, repeat=5):
+    doc = create_current_sync(children=downloads)
+    print('CurrentSync with {} FileDownload children, best of {}'.format(downloads, repeat))
+    results = {}
+    for name, func in [('minidom', minidom_pretty), ('native', native_pretty)]:
+        results[name] = min(timeit.repeat(lambda: func(doc), number=1, repeat=repeat))
+        print('{:>10}: {:.4f}s'.format(name, results[name]))
+    print('{:>10}: {:.1f}x'.format('speedup', results['minidom'] / results['native']))
+
+
+if __name__ == '__main__':
+    run(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,55 @@
+"""Times each stage of rendering a document separately.
+
+Stages which consume the output of an earlier stage are given
+that output pre-computed, so only their own cost is measured.
+"""
+from __future__ import absolute_import
+import gc
+import timeit
+import tracemalloc
+import xml.dom.minidom
+from xml.etree.ElementTree import tostring
+
+from dict2xml import dict2xml
+
+from .documents import create_source
+
+
+def prepare(doc):
+    """Returns (stage, function) pairs for doc."""
+    data = doc.to_dict()
+    element = dict2xml(data)
+    encoded = tostring(element, encoding='UTF-8')
+    source = create_source(doc)
+    cls = doc.__class__
+
+    return [
+        ('to_dict', doc.to_dict),
+        ('dict2xml', lambda: dict2xml(data)),
+        ('tostring', lambda: tostring(element, encoding='UTF-8')),
+        ('minidom', lambda: xml.dom.minidom.parseString(encoded).toprettyxml(indent='  ')),
+        ('to_bytes', doc.to_bytes),
+        ('to_bytes_pretty', lambda: doc.to_bytes(pretty=True)),
+        ('from_object', lambda: cls.from_object(source)),
+    ]
+
+
+def measure(func, repeat=5, number=1):
+    """Returns the best and mean seconds per call, and the peak
+    memory allocated by a single call.
+    """
+    timings = [t / number for t in timeit.repeat(func, number=number, repeat=repeat)]
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'best': min(timings),
+        'mean': sum(timings) / len(timings),
+        'peak_memory': peak,
+    }
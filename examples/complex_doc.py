@@ -19,9 +19,8 @@ import sys
 import os
 sys.path.append(os.path.join('..', os.path.basename(__file__)))
 
-import shutil
-import hashlib
-from obj2xml import XML_Object, XML_Property, XML_TextProperty
+from obj2xml import XML_Object, XML_Property, XML_TextProperty, XML_ListProperty
+from obj2xml import hashing, pool
 
 
 class TrueFalseProperty(XML_TextProperty):
@@ -40,7 +39,17 @@ class TrueFalseProperty(XML_TextProperty):
         super(TrueFalseProperty, self).__init__(path, default)
 
     def __get__(self, instance, owner):
-        return self.true if self.value else self.false
+        value = super(TrueFalseProperty, self).__get__(instance, owner)
+        if value is None:
+            return None
+        return self.true if value else self.false
+
+    def parse(self, text):
+        if text == str(self.true):
+            return True
+        if text == str(self.false):
+            return False
+        return text
 
 
 class YesNoProperty(TrueFalseProperty):
@@ -81,9 +90,32 @@ class ServerTrueFalseProperty(TrueFalseProperty, ServerProperty):
     pass
 
 
+class FileActionsProperty(XML_ListProperty):
+    """Lists the CurrentSync.files actions of a single type.
+
+    These are written as sync/files/{action} nodes.
+    Setting the property directly, for example to a generator,
+    overrides the files list.
+    """
+    prefix = ['sync', 'files']
+
+    def __init__(self, action, child=None, key=None):
+        self.action = action
+        super(FileActionsProperty, self).__init__([action], child=child, key=key)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self.default
+        value = self.load(instance)
+        if value is not None:
+            return value
+        return (f for f in instance.files if f.action == self.action)
+
+
 class FileAction(XML_Object):
     """Sub xml document for defining file actions."""
     action = None
+    xml_incremental = True
 
 
 class FileDownload(FileAction):
@@ -96,64 +128,58 @@ class FileDownload(FileAction):
     link = XML_TextProperty(['link'])
     probe = XML_TextProperty(['probe'])
     headers = XML_TextProperty(['headers'])
-    headers_inherit = XML_Property(['name', 'inherit'])
-    chargeable = YesNoProperty(['name'], False)
+    headers_inherit = XML_Property(['headers', 'inherit'])
+    chargeable = YesNoProperty(['chargeable'], False)
 
     @classmethod
-    def hash_file(cls, filepath):
+    def hash_file(cls, filepath, cache=None):
         """Generates a hash string for the specified file
         """
-        sha1 = hashlib.sha1()
-        f = open(filepath, 'rb')
-        try:
-            sha1.update(f.read())
-        finally:
-            f.close()
-        return sha1.hexdigest()
+        return hashing.cached_hash(filepath, 'sha1', cache)
 
     @classmethod
-    def create_download(cls, path, dest):
-        """Creates a download action document for the specified file.
-        """
-        # process the file hash
-        # put the file in the dest directory pool
-        # return a new file download object
+    def create_downloads(cls, paths, dest, link=False, cache=None, workers=None):
+        """Creates download action documents for many files,
+        adding them to the dest directory pool.
 
-        filename = os.path.basename(path)
+        Files are hashed in parallel. cache is an
+        obj2xml.hashing.HashCache, files which haven't changed since
+        they were last hashed aren't read again.
+        Files already in the pool aren't copied again.
 
-        # hash the file with SHA1
-        hash_value = cls.hash_file(path)
+        Returns the documents and the pool manifest, which records
+        which files were written.
+        """
+        manifest = pool.ingest(paths, dest, link, cache, workers)
+        return [cls.from_pool_entry(entry) for entry in manifest], manifest
 
+    @classmethod
+    def create_download(cls, path, dest, hash_value=None):
+        """Creates a download action document for the specified file.
+        """
+        # hash the file with SHA1 and put it in the dest directory pool
         # the destination is /pool/{hash[-2]}/{hash[-1]}/sha1-{hash}
-        rel_dest = 'pool/{}/{}/sha1-{}'.format(
-            hash_value[-2],
-            hash_value[-1],
-            hash_value,
-        )
-
-        # get the file size
-        size = os.path.getsize(path)
-
-        # don't put in the full path yet
-        # we don't know the server name
-        # we'll just put the pool/file/path
-        link = rel_dest
+        hashes = {path: hash_value} if hash_value is not None else None
+        manifest = pool.ingest([path], dest, hashes=hashes)
+        return cls.from_pool_entry(manifest[0])
 
+    @classmethod
+    def from_pool_entry(cls, entry):
+        """Creates a download action document for a file in the pool.
+        """
         # TODO: probe the file
         # if a video, add all the probe crap
         # <probe>2|TT=MP4|IX=Y|AP=1|AC=AAC|ACH=2|ASR=32000|AD=0000f180|VP=2|VC=H264|W=320|H=240|VD=0000f120|CD=8|D=0000f120</probe>
 
         # create our download object
         download = cls()
-        download.name = filename
-        download.hash = hash_value
-        download.size = size
-        download.link = link
-
-        # copy the file
-        abs_dest = os.path.join(dest, rel_dest)
-        shutil.copyfile(path, abs_dest)
-
+        download.name = os.path.basename(entry.path)
+        download.hash = entry.hash
+        download.size = entry.size
+        # don't put in the full path yet
+        # we don't know the server name
+        # we'll just put the pool/file/path
+        download.link = entry.link
         return download
 
 
@@ -170,6 +196,10 @@ class FileIgnore(FileAction):
 
 
 class CurrentSync(XML_Object):
+    # the meta nodes rarely change between renders
+    # so keep their text around
+    xml_incremental = True
+
     # sync
     version = XML_Property(['sync', 'version'], 1.0)
     name = XML_Property(['sync', 'name'], 'Simple Networking')
@@ -273,30 +303,15 @@ class CurrentSync(XML_Object):
     server_group = ServerProperty(['group'], 'Simple Networking')
 
     # sync/files
-    # these are handled by the class itself
+    # these are read from the files list
+    files_download = FileActionsProperty('download', FileDownload, key='name')
+    files_delete = FileActionsProperty('delete', FileDelete, key='pattern')
+    files_ignore = FileActionsProperty('ignore', FileIgnore, key='pattern')
 
     def __init__(self, files=None, **kwargs):
         super(CurrentSync, self).__init__(**kwargs)
         self.files = files or []
 
-    def files_to_dict(self):
-        # iterate through our files and make a dictionary
-        files = {}
-        for action in self.files:
-            # actions need to be in a list
-            if action.action not in files:
-                files[action.action] = []
-            files[action.action].append(action.to_dict())
-        return files
-
-    def to_dict(self):
-        d = super(CurrentSync, self).to_dict()
-
-        # add our file actions to our dictionary
-        d['sync']['files'] = self.files_to_dict()
-
-        return d
-
     @classmethod
     def create(cls, **kwargs):
         c = cls()
@@ -1,8 +1,17 @@
 from __future__ import absolute_import, print_function
 import collections
+import io
+import itertools
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
 from dict2xml import dict2xml
-from xml.etree.cElementTree import tostring
-import xml.dom.minidom
+from . import writer
+from . import reader
+from . import instrument
+from . import cache
+from . import backends
 
 
 def Tree():
@@ -12,23 +21,305 @@ def Tree():
     return collections.defaultdict(Tree)
 
 
+PlanEntry = collections.namedtuple('PlanEntry', ['name', 'prop', 'parents', 'leaf'])
+
+
+class XML_Plan(tuple):
+    """An ordered tuple of PlanEntry.
+
+    The element layout used by the writer is compiled on first use.
+    """
+    _layout = None
+    _index = None
+    _names = None
+    _constants = None
+    _signature = None
+    _serializer = None
+    _readers = None
+    # the class the plan was compiled for
+    owner = None
+
+    @property
+    def layout(self):
+        if self._layout is None:
+            self._layout = writer.compile_layout(self)
+        return self._layout
+
+    @property
+    def index(self):
+        """The reverse index used to read documents."""
+        if self._index is None:
+            self._index = reader.compile_index(self)
+        return self._index
+
+    @property
+    def names(self):
+        """The attribute names of the properties."""
+        if self._names is None:
+            self._names = tuple(entry.name for entry in self)
+        return self._names
+
+    @property
+    def constants(self):
+        """The shared text of elements holding only default values."""
+        if self._constants is None:
+            self._constants = writer.Constants(default_values(self, self.owner), MISSING)
+        return self._constants
+
+    @property
+    def serializer(self):
+        """The generated writer of the class, see obj2xml.codegen.
+
+        It is generated again if a default written into it has changed.
+        """
+        render = self._serializer
+        if render is None or any(prop.default is not default for prop, default in render.defaults):
+            from . import codegen
+            render = self._serializer = codegen.serializer(self)
+        return render
+
+    @property
+    def readers(self):
+        """(prop, key) for each entry. key is the instance __dict__
+        key of plain properties, see is_plain, and None for those
+        whose __get__ must be called.
+        """
+        if self._readers is None:
+            self._readers = tuple(
+                (entry.prop, entry.prop.key if is_plain(entry.prop) else None) for entry in self
+            )
+        return self._readers
+
+    @property
+    def signature(self):
+        """Identifies the class and the paths of its properties."""
+        if self._signature is None:
+            owner = self.owner
+            self._signature = '%s.%s(%s)' % (
+                owner.__module__, owner.__name__,
+                ','.join('%s=%s' % (entry.name, entry.prop.key) for entry in self)
+            )
+        return self._signature
+
+
+# bumped whenever a descriptor is added to or removed from a class
+# compiled plans record the generation they were built against
+_plan_generation = [0]
+
+
+def invalidate_plans():
+    """Discards every compiled property plan.
+
+    Called automatically when descriptors are added to or removed from
+    an XML_Object class at runtime.
+    """
+    _plan_generation[0] += 1
+
+
+def compile_plan(cls):
+    """Returns the ordered list of PlanEntry for the XML_Property
+    descriptors declared on cls, including inherited ones.
+
+    The plan is built once per class and cached until invalidate_plans
+    is called.
+    """
+    cached = cls.__dict__.get('_xml_plan')
+    if cached is not None and cached[0] == _plan_generation[0]:
+        return cached[1]
+
+    plan = []
+    for name in dir(cls):
+        # the first class in the mro that defines the name wins
+        # if it isn't an XML_Property, the name has been masked
+        for klass in cls.__mro__:
+            if name in klass.__dict__:
+                prop = klass.__dict__[name]
+                if isinstance(prop, XML_Property):
+                    plan.append(PlanEntry(name, prop, tuple(prop.path[:-1]), prop.path[-1]))
+                break
+    plan = XML_Plan(plan)
+    plan.owner = cls
+
+    # use type.__setattr__ so we don't trigger an invalidation
+    type.__setattr__(cls, '_xml_plan', (_plan_generation[0], plan))
+    return plan
+
+
+def default_values(plan, cls):
+    """Returns the value each entry in the plan has on an instance
+    which hasn't set it.
+
+    Values written as elements, or which can't be read without
+    running __init__, are MISSING.
+    """
+    try:
+        blank = cls.__new__(cls)
+    except Exception:
+        return [MISSING] * len(plan)
+
+    defaults = []
+    for entry in plan:
+        try:
+            value = entry.prop.__get__(blank, cls)
+        except Exception:
+            value = MISSING
+        if entry.prop.is_list or (value is not None and writer.is_element(value)):
+            value = MISSING
+        defaults.append(value)
+    return defaults
+
+
+def declaration(encoding=None):
+    """Returns the XML declaration for the given encoding."""
+    if encoding is None:
+        return '<?xml version="1.0" ?>'
+    return '<?xml version="1.0" encoding="%s"?>' % encoding
+
+
+def encode(text, encoding):
+    """Encodes text, replacing characters the encoding can't represent
+    with character references.
+    """
+    if encoding is None:
+        return text
+    return text.encode(encoding, 'xmlcharrefreplace')
+
+
+# writer formats, keyed by (pretty, indent, short_empty_elements)
+# the same instances are reused so they can key fragment caches
+_formats = {}
+
+
+class _Missing(object):
+    """Marks a compact storage slot which holds no value."""
+    __slots__ = ()
+
+    def __repr__(self):
+        return 'MISSING'
+
+    def __reduce__(self):
+        return 'MISSING'
+
+
+MISSING = _Missing()
+
+
 class XML_Property(object):
-    """Descriptor class for XML properties."""
+    """Descriptor class for XML properties.
+
+    Values are stored in the instance __dict__, keyed by the path.
+    For classes with xml_compact set, values are kept in a list
+    on the instance instead, at the index the class assigned to
+    this property.
+    """
+    is_list = False
+
     def __init__(self, path, default=None):
         self.path = path
+        # defaults are shared by every instance, so lists are kept
+        # as tuples, which are written the same but can't be changed
+        if isinstance(default, list):
+            default = tuple(default)
         self.default = default
+        self.key = str(path)
+        # the paths of the elements which hold this value
+        self.prefixes = tuple(tuple(path[:i]) for i in range(len(path)))
+
+    def load(self, instance):
+        """Returns the value stored on the instance, or None."""
+        attrs = instance.__dict__
+        value = attrs.get(self.key, MISSING)
+        if value is not MISSING:
+            return value
+
+        slots = getattr(instance, '_xml_slots', None)
+        if slots is not None:
+            index = slots.get(self)
+            if index is not None:
+                try:
+                    value = instance._xml_values[index]
+                except (AttributeError, IndexError):
+                    value = MISSING
+                if value is not MISSING:
+                    return value
+
+        # documents opened with from_xml(lazy=True) decode on demand
+        lazy = attrs.get('_xml_lazy')
+        return lazy.load(self, instance) if lazy is not None else None
+
+    def store(self, instance, value):
+        """Stores the value on the instance."""
+        slots = getattr(instance, '_xml_slots', None)
+        if slots is not None:
+            index = slots.get(self)
+            if index is not None:
+                try:
+                    values = instance._xml_values
+                except AttributeError:
+                    values = [MISSING] * len(slots)
+                    object.__setattr__(instance, '_xml_values', values)
+                if index >= len(values):
+                    values.extend([MISSING] * (index + 1 - len(values)))
+                values[index] = value
+                self.changed(instance)
+                return
+        attrs = instance.__dict__
+        attrs[self.key] = value
+        if '_xml_fragments' in attrs or '_xml_digest' in attrs:
+            self.changed(instance)
+
+    def changed(self, instance):
+        """Discards any cached fragments of the elements which
+        hold this value, and the instance's cached digest.
+        """
+        attrs = getattr(instance, '__dict__', {})
+        attrs.pop('_xml_digest', None)
+        cached = attrs.get('_xml_fragments')
+        if cached is not None:
+            fragments = cached[1]
+            for prefix in self.prefixes:
+                fragments.pop(prefix, None)
+
+    def parse(self, text):
+        """Converts text read from a document into a value.
+
+        Text is converted to the type of the default if that is
+        an int or a float.
+        """
+        default = self.default
+        if isinstance(default, (int, float)) and not isinstance(default, bool):
+            try:
+                return type(default)(text)
+            except ValueError:
+                pass
+        return text
 
     def __get__(self, instance, owner):
-        value = getattr(instance, str(self.path), None)
+        value = self.load(instance) if instance is not None else None
         if not value:
             value = self.default
         return value
 
     def __set__(self, instance, value):
-        setattr(instance, str(self.path), value)
+        self.store(instance, value)
 
     def __delete__(self, instance):
-        delattr(instance, str(self.path))
+        if self.load(instance) is None:
+            raise AttributeError(self.key)
+        slots = getattr(instance, '_xml_slots', None)
+        if slots is not None and self in slots:
+            self.store(instance, MISSING)
+        else:
+            del instance.__dict__[self.key]
+            self.changed(instance)
+
+
+def is_plain(prop):
+    """Returns True if prop reads values as XML_Property does, so
+    they can be read from the instance __dict__ directly.
+    """
+    cls = type(prop)
+    return cls.__get__ is XML_Property.__get__ and cls.load is XML_Property.load
 
 
 class XML_PathProperty(XML_Property):
@@ -50,22 +341,57 @@ class XML_TextProperty(XML_PathProperty):
 
 
 class XML_ListProperty(XML_PathProperty):
-    def __init__(self, path, default=None):
+    """A list of child nodes.
+
+    Setting a list, or any other iterable such as a generator, replaces
+    the children. Setting anything else appends it as a child.
+    Generators are pulled one child at a time as the document is
+    written, but can only be written once.
+
+    child is the XML_Object class children are read into by from_xml.
+    Without it, children are read as dicts.
+
+    key is the attribute name, or function, XML_Object.diff matches
+    children by. Without it, children are matched by position.
+    """
+    is_list = True
+
+    def __init__(self, path, default=None, child=None, key=None):
         path = self.prefix + path + self.postfix
         super(XML_PathProperty, self).__init__(path, default)
+        self.child = child
+        self.key_by = key
 
     def __set__(self, instance, value):
-        if isinstance(value, list):
-            setattr(instance, str(self.path), value)
+        if writer.is_sequence(value):
+            self.store(instance, value)
         else:
             val = self.__get__(instance, instance.__class__)
             if not val:
                 val = []
-                setattr(instance, str(self.path), val)
+                self.store(instance, val)
+            elif not isinstance(val, list):
+                if hasattr(val, '__len__'):
+                    val = list(val)
+                    self.store(instance, val)
+                else:
+                    # keep iterators lazy
+                    self.store(instance, itertools.chain(val, [value]))
+                    return
             val.append(value)
+            self.changed(instance)
 
-    def __delete__(self, instance):
-        delattr(instance, str(self.path))
+
+def is_descriptor(value):
+    """Returns True if value is a descriptor, rather than a method
+    or other callable, and so is read through its __get__ when
+    assigned to an instance.
+    """
+    return hasattr(value, '__get__') and not callable(value)
+
+
+def raise_frozen(obj):
+    raise AttributeError("'{}' object is frozen".format(obj.__class__.__name__))
 
 
 class DescriptorMixin(object):
@@ -74,71 +400,414 @@ class DescriptorMixin(object):
     This provides a work around to let us dynamically add descriptors.
     Without this, any descriptors added outside the class declaration
     will be ignored.
+
+    Descriptors assigned to an instance are kept in a per-instance
+    registry rather than the instance __dict__. Only names which
+    normal attribute lookup can't find go through the registry,
+    so ordinary attributes, methods and class descriptors
+    aren't slowed down.
+
+    Frozen instances raise AttributeError when set or deleted.
     """
-    def __getattribute__(self, name):
-        attr = super(DescriptorMixin, self).__getattribute__(name)
-        if hasattr(attr, "__get__") and not callable(attr):
-            return attr.__get__(self, self.__class__)
-        else:
-            return attr
+    _xml_descriptors = None
+
+    def __getattr__(self, name):
+        # only called when normal lookup fails
+        descriptors = self._xml_descriptors
+        if descriptors and name in descriptors:
+            return descriptors[name].__get__(self, self.__class__)
+        raise AttributeError("'{}' object has no attribute '{}'".format(
+            self.__class__.__name__, name
+        ))
 
     def __setattr__(self, name, value):
-        try:
-            attr = super(DescriptorMixin, self).__getattribute__(name)
-            return attr.__set__(self, value)
-        except AttributeError:
-            return super(DescriptorMixin, self).__setattr__(name, value)
+        if '_xml_frozen' in self.__dict__ and not name.startswith('_xml_'):
+            raise_frozen(self)
+        descriptors = self._xml_descriptors
+        if descriptors and name in descriptors:
+            descriptor = descriptors[name]
+            if hasattr(descriptor, '__set__'):
+                descriptor.__set__(self, value)
+                return
+            # descriptors which can't be set are replaced by the value
+            self._register_descriptor(name, None)
+        if is_descriptor(value) and not hasattr(self.__class__, name):
+            self._register_descriptor(name, value)
+        else:
+            object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        if '_xml_frozen' in self.__dict__:
+            raise_frozen(self)
+        descriptors = self._xml_descriptors
+        if descriptors and name in descriptors:
+            self._register_descriptor(name, None)
+        else:
+            object.__delattr__(self, name)
+
+    def _register_descriptor(self, name, prop):
+        """Records a descriptor added to this instance at runtime.
+        Passing None for prop removes it.
+
+        The instance's cached fragments and digest are discarded,
+        as the document it's written as has changed.
+        """
+        descriptors = dict(self._xml_descriptors or {})
+        attrs = self.__dict__
+        if prop is None:
+            descriptors.pop(name, None)
+        else:
+            descriptors[name] = prop
+            # a value set earlier would hide the descriptor
+            attrs.pop(name, None)
+        attrs['_xml_descriptors'] = descriptors
+        attrs['_xml_instance_plan'] = None
+        attrs.pop('_xml_fragments', None)
+        attrs.pop('_xml_digest', None)
+
+
+def class_attribute(cls, name):
+    """Returns the attribute 'name' of the first class in the mro
+    which defines it, without calling its __get__, or None.
+    """
+    for klass in cls.__mro__:
+        if name in klass.__dict__:
+            return klass.__dict__[name]
+    return None
+
+
+def assign_slots(cls):
+    """Gives each property in the plan of a compact class, and of its
+    subclasses, an index into the instance value list.
+
+    Indices are never reassigned, so existing instances stay valid
+    when descriptors are added at runtime.
+    """
+    if cls.xml_compact:
+        slots = cls._xml_slots
+        for entry in compile_plan(cls):
+            if entry.prop not in slots:
+                slots[entry.prop] = len(slots)
+    for subclass in cls.__subclasses__():
+        assign_slots(subclass)
+
+
+class XML_ObjectType(type):
+    """Metaclass for XML_Object.
+
+    Invalidates compiled property plans when descriptors are
+    added to or removed from a class after it has been created.
+
+    Classes which set xml_compact get a '_xml_values' slot, and
+    a mapping of property to index within it. Subclasses which
+    set it to False store their values in the instance __dict__.
+    """
+    def __new__(meta, name, bases, namespace):
+        compact = namespace.get('xml_compact')
+        if compact and not any(getattr(base, 'xml_compact', False) for base in bases):
+            namespace = dict(namespace)
+            namespace['__slots__'] = tuple(namespace.get('__slots__', ())) + ('_xml_values',)
+        return super(XML_ObjectType, meta).__new__(meta, name, bases, namespace)
+
+    def __init__(cls, name, bases, namespace):
+        super(XML_ObjectType, cls).__init__(name, bases, namespace)
+        if getattr(cls, 'xml_compact', False):
+            type.__setattr__(cls, '_xml_slots', {})
+            assign_slots(cls)
+        elif getattr(cls, '_xml_slots', None) is not None:
+            type.__setattr__(cls, '_xml_slots', None)
+
+    def __setattr__(cls, name, value):
+        # a value set on a subclass masks a property it inherits
+        if isinstance(value, XML_Property) or isinstance(class_attribute(cls, name), XML_Property):
+            invalidate_plans()
+        super(XML_ObjectType, cls).__setattr__(name, value)
+        if isinstance(value, XML_Property):
+            assign_slots(cls)
+
+    def __delattr__(cls, name):
+        removed = cls.__dict__.get(name)
+        super(XML_ObjectType, cls).__delattr__(name)
+        # removing a value may reveal a property it masked
+        if isinstance(removed, XML_Property) or isinstance(class_attribute(cls, name), XML_Property):
+            invalidate_plans()
+
+
+def overrides(cls, name):
+    """Returns True if cls replaces the XML_Object implementation
+    of the method 'name'.
+    """
+    for klass in cls.__mro__:
+        if name in klass.__dict__:
+            return klass is not XML_Object
+    return False
+
+
+def read_values(obj, names):
+    """Returns a dict of the values of the attributes 'names' of obj.
+
+    Mappings and namedtuples are read by key. Other objects are read
+    from their __dict__ where possible, falling back to getattr for
+    properties and __slots__.
+    Missing and callable values are skipped.
+    """
+    if isinstance(obj, Mapping):
+        get = obj.get
+    elif isinstance(obj, tuple) and hasattr(obj, '_fields'):
+        get = obj._asdict().get
+    else:
+        attrs = getattr(obj, '__dict__', None) or {}
+
+        def get(name, default):
+            if name in attrs:
+                return attrs[name]
+            return getattr(obj, name, default)
+
+    values = {}
+    for name in names:
+        value = get(name, MISSING)
+        if value is MISSING or callable(value):
+            continue
+        values[name] = value
+    return values
 
 
-class XML_Object(DescriptorMixin):
+def lazy_module():
+    """Imports the lazy loading module on first use, so mmap
+    isn't needed unless it's used.
+    """
+    from . import lazy
+    return lazy
+
+
+def with_metaclass(meta, *bases):
+    """Creates a base class with a metaclass.
+    Works with both Python 2 and 3 class syntax.
+    """
+    return meta('XML_ObjectBase', bases, {})
+
+
+class XML_Object(with_metaclass(XML_ObjectType, DescriptorMixin)):
     """Generates a deep xml hierarchy from a simple flat class.
 
     Uses XML_Property to define values to put into the XML.
     Use unicode(obj) or str(obj) to get the string XML representation.
+    Set xml_indent and xml_short_empty_elements to change how
+    it is pretty printed.
+
+    Set xml_compact to store property values in a list held in a slot,
+    rather than one instance __dict__ entry per property.
+
+    Set xml_incremental to cache the written text of each element,
+    and reuse it until a property beneath it is set.
+    Elements holding lists, dicts or objects aren't cached, as they
+    can change without us knowing, but XML_Object children keep
+    caches of their own.
+    Changing a descriptor's default in place isn't detected,
+    replace the descriptor on the class instead.
+
+    Elements whose values are all class defaults are written once
+    per class and shared. Set xml_constants to False to disable this.
+
+    Set xml_cache to a RenderCache to reuse the text of documents
+    whose class and values are identical.
+
+    Set xml_backend to the name of a serializer backend to use it
+    rather than the default, see obj2xml.backends.
+
+    Set xml_codegen to write documents with code generated for the
+    class, rather than by walking its layout, see obj2xml.codegen.
+    It takes the place of xml_constants. Classes with xml_incremental
+    set keep the generic writer, as reusing cached text is faster
+    still for documents which are written repeatedly.
     """
+    xml_indent = '  '
+    xml_short_empty_elements = True
+    xml_compact = False
+    xml_incremental = False
+    xml_constants = True
+    xml_cache = None
+    xml_backend = None
+    xml_codegen = False
+    _xml_slots = None
+
     @classmethod
-    def from_object(cls, obj, ignore_underscore=True):
-        values = {}
-        for k in dir(obj):
-            if ignore_underscore:
-                if k.startswith('_'):
-                    continue
-            v = getattr(obj, k)
-            if callable(v):
-                continue
-            values[k] = v
+    def xml_names(cls, ignore_underscore=True):
+        """Returns the attribute names of the class's properties."""
+        names = compile_plan(cls).names
+        if ignore_underscore:
+            names = tuple(name for name in names if not name.startswith('_'))
+        return names
+
+    @classmethod
+    def from_object(cls, obj, ignore_underscore=True, names=None):
+        """Creates a document from the attributes of obj.
+
+        Only the names of the class's properties are read, unless
+        names is given. obj may also be a mapping or a namedtuple.
+        """
+        if names is None:
+            names = cls.xml_names(ignore_underscore)
+        return cls(**read_values(obj, names))
+
+    @classmethod
+    def from_objects(cls, objects, ignore_underscore=True, names=None):
+        """Lazily creates a document from each of objects,
+        such as the rows of a database cursor.
+        """
+        if names is None:
+            names = cls.xml_names(ignore_underscore)
+        for obj in objects:
+            yield cls(**read_values(obj, names))
+
+    @classmethod
+    def from_xml(cls, source, lazy=False):
+        """Creates a document by reading XML.
+
+        source is a filename, a file object or bytes.
+        The document is read in a single pass, clearing elements
+        as they are read.
+
+        With lazy set, source must be a filename. The file is memory
+        mapped and each property is decoded when it is first read.
+        The whole file is only parsed when the whole document is
+        needed, such as when it's written. Call xml_close, or use the
+        document in a with statement, to release the file early.
+        """
+        if isinstance(source, bytes):
+            source = io.BytesIO(source)
+        plan = compile_plan(cls)
+        obj = cls()
+        if lazy and isinstance(source, str) and lazy_module().is_lazy_supported(source):
+            obj.__dict__['_xml_lazy'] = lazy_module().LazySource(source, plan)
+        else:
+            obj.xml_assign(reader.read_document(source, plan.index))
+        return obj
+
+    @classmethod
+    def from_element(cls, elem):
+        """Creates a document from an ElementTree element.
+
+        The element is the one this object would be written as, so
+        paths are relative to it. Used to read list children.
+        """
+        plan = compile_plan(cls)
+        obj = cls()
+        obj.xml_assign(reader.read_element(elem, plan.index))
+        return obj
+
+    def xml_materialize(self):
+        """Reads the rest of a lazily loaded document and
+        releases its file.
+
+        Values which have already been read or set are kept.
+        """
+        lazy = self.__dict__.pop('_xml_lazy', None)
+        if lazy is None:
+            return
+        try:
+            values = lazy.read_all()
+        except BaseException:
+            # keep the document readable
+            self.__dict__['_xml_lazy'] = lazy
+            raise
+        for entry, value in values.items():
+            current = entry.prop.load(self)
+            if current is None or isinstance(current, lazy_module().LazyChildren):
+                if not entry.prop.is_list:
+                    value = entry.prop.parse(value)
+                entry.prop.store(self, value)
+        lazy.close()
+
+    xml_close = xml_materialize
+
+    def __enter__(self):
+        return self
 
-        return cls(**values)
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Closes a lazily loaded document. If the block raised,
+        the file is released without reading the rest of it.
+        """
+        if exc_type is None:
+            self.xml_close()
+            return
+        lazy = self.__dict__.pop('_xml_lazy', None)
+        if lazy is not None:
+            lazy.close()
+
+    def xml_assign(self, values):
+        """Sets property values read from a document.
+        values maps plan entries to text, or to a list of children.
+        """
+        for entry, value in values.items():
+            if not entry.prop.is_list:
+                value = entry.prop.parse(value)
+            entry.prop.__set__(self, value)
 
     def __init__(self, **kwargs):
         for k, v in kwargs.items():
             setattr(self, k, v)
 
+    def __copy__(self):
+        """Returns a shallow copy, with its own compact value list.
+
+        Cached fragments aren't copied, as they're changed in place.
+        """
+        cls = self.__class__
+        copied = cls.__new__(cls)
+        attrs = copied.__dict__
+        attrs.update(self.__dict__)
+        attrs.pop('_xml_fragments', None)
+        values = getattr(self, '_xml_values', None)
+        if values is not None:
+            object.__setattr__(copied, '_xml_values', list(values))
+        return copied
+
+    def xml_plan(self):
+        """Returns the compiled property plan for this object.
+
+        This is the class plan, merged with any descriptors added
+        to this instance at runtime.
+        """
+        plan = compile_plan(self.__class__)
+        descriptors = self._xml_descriptors
+        if not descriptors:
+            return plan
+
+        cached = self.__dict__.get('_xml_instance_plan')
+        if cached is not None and cached[0] == _plan_generation[0]:
+            return cached[1]
+
+        # instance descriptors take precedence over the class
+        entries = dict((entry.name, entry) for entry in plan)
+        for name, prop in descriptors.items():
+            if isinstance(prop, XML_Property):
+                entries[name] = PlanEntry(name, prop, tuple(prop.path[:-1]), prop.path[-1])
+        merged = XML_Plan(entries[name] for name in sorted(entries))
+        merged.owner = self.__class__
+
+        self.__dict__['_xml_instance_plan'] = (_plan_generation[0], merged)
+        return merged
+
     def to_dict(self):
         """This function takes any property descriptors set on this class
         and adds them to a dict at their specified path.
         """
-        tree = Tree()
-        for name in dir(self):
-            # we must get descriptors directly, or we'll get the value
-            # they can reside inside the object, OR in the class
-            # fall back to class if not present.
-            try:
-                prop = self.__dict__[name]
-            except:
-                try:
-                    prop = self.__class__.__dict__[name]
-                except:
-                    continue
+        # read the flag once, another thread may switch it meanwhile
+        timed = instrument.enabled
+        if timed:
+            start = instrument.timer()
+        if '_xml_lazy' in self.__dict__:
+            self.xml_materialize()
 
-            # check if it's one of our properties
-            # it must have a __get__ method and not be callable
-            if not isinstance(prop, XML_Property):
-                continue
+        tree = Tree()
+        owner = self.__class__
+        for name, prop, parents, leaf in self.xml_plan():
+            value = prop.__get__(self, owner)
 
             # value must be non null
             # we still need 0 values to come through
-            if getattr(self, name) is None:
+            if value is None:
                 continue
 
             # navigate to the path
@@ -146,30 +815,427 @@ class XML_Object(DescriptorMixin):
             # but don't create a branch for the leaf
             # we can use the Tree to automatically create nodes for us
             branch = tree
-            path = prop.path
-
-            for p in path[:-1]:
+            for p in parents:
                 branch = branch[p]
-            path = path[-1]
-
-            # assign our value to the leaf
-            value = getattr(self, name)
 
             # convert lists to child docs
-            if isinstance(value, list):
+            if writer.is_sequence(value):
                 value = [v.to_dict() if hasattr(v, 'to_dict') else v for v in value]
 
-            branch[path] = value
+            branch[leaf] = value
 
+        if timed:
+            instrument.record('to_dict', owner, instrument.timer() - start)
         return tree
 
-    def to_xml(self):
-        return dict2xml(self.to_dict())
+    def xml_values(self, plan=None):
+        """Returns the current value of each entry in the plan."""
+        if '_xml_lazy' in self.__dict__:
+            self.xml_materialize()
+        if plan is None:
+            plan = self.xml_plan()
+        timed = instrument.enabled
+        if timed:
+            start = instrument.timer()
+        owner = self.__class__
+        if self._xml_slots is None:
+            # plain properties are read as XML_Property.__get__ would
+            attrs = self.__dict__
+            values = [
+                (attrs.get(key) or prop.default) if key is not None else prop.__get__(self, owner)
+                for prop, key in plan.readers
+            ]
+        else:
+            values = [entry.prop.__get__(self, owner) for entry in plan]
+        if timed:
+            instrument.record('values', owner, instrument.timer() - start)
+        return values
+
+    def xml_serializer(self, incremental=True):
+        """Returns the generated writer of the class, or None if
+        the generic writer should be used.
+
+        Pass incremental as False if cached fragments wouldn't be
+        reused anyway, such as for an instance written once per row.
+        """
+        if not self.xml_codegen or (incremental and self.xml_incremental) or self._xml_descriptors:
+            return None
+        if '_xml_lazy' in self.__dict__:
+            self.xml_materialize()
+        return compile_plan(self.__class__).serializer
+
+    def xml_fragments(self):
+        """Returns the cache of written elements, or None if
+        xml_incremental isn't set.
+        """
+        if not self.xml_incremental:
+            return None
+        cached = self.__dict__.get('_xml_fragments')
+        if cached is None or cached[0] != _plan_generation[0]:
+            cached = self.__dict__['_xml_fragments'] = (_plan_generation[0], {})
+        return cached[1]
+
+    def xml_constants_for(self, plan, values):
+        """Returns the shared text of elements whose values are all
+        defaults, bound to values, or None.
+        """
+        if not self.xml_constants:
+            return None
+        return plan.constants.bind(values)
+
+    @property
+    def xml_frozen(self):
+        """True if this object was returned by freeze."""
+        return '_xml_frozen' in self.__dict__
+
+    def freeze(self):
+        """Returns an immutable snapshot of this object, or this object
+        if it's already frozen.
+
+        Snapshots are hashable, and can be written from several threads
+        at once, or sent to a process pool. List values are copied into
+        tuples and their XML_Object children frozen, so generators are
+        read here.
+        """
+        if self.xml_frozen:
+            return self
+        from .frozen import freeze
+        return freeze(self)
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        # only frozen objects compare by value
+        if (self.xml_frozen and isinstance(other, XML_Object) and other.xml_frozen
+                and self.__class__ is other.__class__):
+            return self.digest() == other.digest()
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        if not self.xml_frozen:
+            return object.__hash__(self)
+        cached = self.__dict__.get('_xml_hash')
+        if cached is None:
+            cached = self.__dict__['_xml_hash'] = hash(self.digest())
+        return cached
+
+    def diff(self, other, keys=None):
+        """Returns the changes from this document to other, as a
+        diff.ChangeSet, which is empty if they're the same.
+
+        Property values are compared as their descriptors return them,
+        without writing either document.
+        List children are matched by the list property's key, which
+        keys, a dict of list property name to attribute name or
+        function, overrides.
+        List properties holding generators are read to compare them.
+        """
+        from .diff import diff
+        return diff(self, other, keys)
+
+    def xml_content(self):
+        """Returns the plan signature and the values the document is
+        written from, or the class name and to_dict for classes
+        which extend to_dict.
+
+        Raises cache.Uncacheable if a list property holds an iterator,
+        as reading it would leave nothing to write.
+        """
+        if overrides(self.__class__, 'to_dict'):
+            return '%s.%s' % (self.__class__.__module__, self.__class__.__name__), self.to_dict()
+
+        plan = self.xml_plan()
+        values = self.xml_values(plan)
+        for index, entry in enumerate(plan):
+            value = values[index]
+            if (entry.prop.is_list and value is not None
+                    and writer.is_sequence(value) and not writer.is_reusable(value)):
+                # generators made by __get__ are new each time it's called
+                if entry.prop.load(self) is value:
+                    raise cache.Uncacheable(value)
+                values[index] = list(value)
+        return plan.signature, values
+
+    def digest(self):
+        """Returns a hex digest of the class, its property paths and
+        the property values, as the document's ETag.
+
+        The same values always give the same digest, in any process,
+        and the document isn't written. The digest of the values which
+        aren't lists, dicts or objects is kept until a property or a
+        descriptor is set, or a default is changed. Child objects
+        keep digests of their own, so only lists are read each time.
+        Values computed by custom descriptors from other attributes
+        aren't tracked, set a property to discard the digest.
+
+        Raises cache.Uncacheable if a list property holds an iterator,
+        or a value has neither a repr nor a str of its own.
+        """
+        plan = self.xml_plan()
+        cached = self.__dict__.get('_xml_digest')
+        if (cached is None or cached[0] != _plan_generation[0]
+                or cached[1] is not self._xml_descriptors
+                or any(prop.default is not default for prop, default in cached[2])):
+            if overrides(self.__class__, 'to_dict'):
+                signature, values = self.xml_content()
+                return cache.hash_parts(cache.iter_parts(values), '<%s>' % signature)
+            signature, values = self.xml_content()
+            digest, elements = cache.digest_values(signature, values)
+            defaults = tuple((entry.prop, entry.prop.default) for entry in plan)
+            self.__dict__['_xml_digest'] = (
+                _plan_generation[0], self._xml_descriptors, defaults, digest, elements
+            )
+            return cache.combine(digest, [(index, values[index]) for index in elements])
+
+        digest, elements = cached[3:]
+        if not elements:
+            return digest
+        owner = self.__class__
+        values = []
+        for index in elements:
+            value = plan[index].prop.__get__(self, owner)
+            if value is not None and writer.is_sequence(value) and not writer.is_reusable(value):
+                if plan[index].prop.load(self) is value:
+                    raise cache.Uncacheable(value)
+                value = list(value)
+            values.append((index, value))
+        return cache.combine(digest, values)
+
+    def xml_cached(self, fmt, xml_declaration=True, encoding=None):
+        """Returns the document text from xml_cache, writing and
+        storing it if it isn't there.
+
+        Returns None if there's no cache, or the document
+        can't be cached.
+        """
+        store = self.xml_cache
+        if store is None:
+            return None
+        try:
+            key = cache.content_key(
+                self, fmt.pretty, fmt.indent, fmt.empty, xml_declaration, encoding
+            )
+        except cache.Uncacheable:
+            return None
+
+        text = store.get(key)
+        if text is None:
+            text = self.xml_render(
+                backends.get(self.xml_backend), fmt, xml_declaration, encoding
+            )
+            store.put(key, text)
+        return text
+
+    def xml_render(self, backend, fmt, xml_declaration=True, encoding=None):
+        """Returns the document as text, written by backend."""
+        text = backend.to_string(self, fmt)
+        if xml_declaration:
+            return declaration(encoding) + fmt.newline + text
+        return text
+
+    def iter_xml(self, out, fmt=writer.COMPACT):
+        """Writes the document into the list 'out'.
+
+        This is a generator which yields after each list child, so
+        callers can flush 'out' as the document is written.
+        """
+        # classes which extend to_dict may add their own content
+        if overrides(self.__class__, 'to_dict'):
+            return writer.iter_dict_document(self.to_dict(), out, fmt)
+        render = self.xml_serializer()
+        if render is not None:
+            return render(self, out, fmt, 0, None)
+        plan = self.xml_plan()
+        values = self.xml_values(plan)
+        return writer.iter_document(
+            plan.layout, values, out, fmt, self.xml_fragments(),
+            self.xml_constants_for(plan, values)
+        )
+
+    def iter_xml_element(self, tag, out, fmt=writer.COMPACT, level=0):
+        """Writes this object as the element 'tag' into the list 'out'.
+
+        Used when this object is the child of another document.
+        """
+        if overrides(self.__class__, 'to_dict'):
+            return writer.iter_dict(tag, self.to_dict(), out, fmt, level)
+        # this runs for every list child, so the options are
+        # checked here rather than by calling each method
+        if self.xml_codegen:
+            render = self.xml_serializer()
+            if render is not None:
+                return render(self, out, fmt, level, tag)
+
+        fragments = None
+        if self.xml_incremental:
+            fragments = self.xml_fragments()
+            # don't bother reading our values if nothing has changed
+            fragment = writer.cached_fragment(fragments, (), (fmt, level, tag))
+            if fragment is not None:
+                out.append(fragment)
+                return iter(())
+
+        plan = self.xml_plan()
+        values = self.xml_values(plan)
+        return writer.iter_node(
+            tag, plan.layout, values, out, fmt, level, fragments,
+            self.xml_constants_for(plan, values)
+        )
+
+    def write(self, fp, encoding='utf-8', pretty=False, indent=None,
+              short_empty_elements=None, xml_declaration=True, buffer_size=1024,
+              backend=None):
+        """Writes the XML document to a file object.
+
+        The document is written directly, without building a dict
+        or an element tree first.
+        If encoding is None, text is written to the file instead of bytes.
+        indent and short_empty_elements default to the class's
+        xml_indent and xml_short_empty_elements.
+        buffer_size is the number of chunks held before writing to fp.
+        backend names the serializer backend, see obj2xml.backends.
+        """
+        timed = instrument.enabled
+        if timed:
+            start = instrument.timer()
+
+        for chunk in self.iter_bytes(encoding, pretty, indent, short_empty_elements,
+                                     xml_declaration, buffer_size, backend):
+            fp.write(chunk)
+
+        if timed:
+            instrument.record('write', self.__class__, instrument.timer() - start)
+
+    def iter_bytes(self, encoding='utf-8', pretty=False, indent=None,
+                   short_empty_elements=None, xml_declaration=True, buffer_size=1024,
+                   backend=None):
+        """Yields the XML document in encoded chunks.
+
+        List children are written one at a time, and the buffer is
+        emptied every buffer_size chunks, so memory use stays flat
+        when the children come from a generator.
+        Backends other than native yield the document in one chunk.
+        If encoding is None, text is yielded instead of bytes.
+        """
+        fmt = self.xml_format(pretty, indent, short_empty_elements)
+        if self.xml_cache is not None:
+            text = self.xml_cached(fmt, xml_declaration, encoding)
+            if text is not None:
+                yield encode(text, encoding)
+                return
+        backend = backends.get(backend or self.xml_backend)
+        if backend.name != 'native':
+            yield encode(self.xml_render(backend, fmt, xml_declaration, encoding), encoding)
+            return
+
+        out = []
+        if xml_declaration:
+            out.append(declaration(encoding) + fmt.newline)
+        for _ in self.iter_xml(out, fmt):
+            if len(out) >= buffer_size:
+                yield encode(''.join(out), encoding)
+                del out[:]
+        if out:
+            yield encode(''.join(out), encoding)
+
+    def aiter_xml(self, chunk_size=65536, encoding='utf-8', pretty=False, indent=None,
+                  short_empty_elements=None, xml_declaration=True, backend=None):
+        """Returns an async iterator of encoded chunks of the XML document.
+
+        Control returns to the event loop between chunks::
+
+            async for chunk in obj.aiter_xml():
+                ...
+        """
+        from .aio import aiter_xml
+        return aiter_xml(self, chunk_size, encoding, pretty, indent,
+                         short_empty_elements, xml_declaration, backend)
+
+    def awrite(self, stream, chunk_size=65536, encoding='utf-8', pretty=False, indent=None,
+               short_empty_elements=None, xml_declaration=True, backend=None):
+        """Writes the XML document to an asyncio StreamWriter, respecting
+        its backpressure. Returns a coroutine::
+
+            await obj.awrite(writer)
+        """
+        from .aio import awrite
+        return awrite(self, stream, chunk_size, encoding, pretty, indent,
+                      short_empty_elements, xml_declaration, backend)
+
+    def to_bytes(self, encoding='utf-8', pretty=False, indent=None,
+                 short_empty_elements=None, xml_declaration=True, backend=None):
+        """Returns the XML document as encoded bytes."""
+        return encode(self.to_string(
+            pretty, indent, short_empty_elements, xml_declaration, encoding, backend
+        ), encoding)
+
+    def to_string(self, pretty=True, indent=None, short_empty_elements=None,
+                  xml_declaration=True, encoding=None, backend=None):
+        """Returns the XML document as text.
+
+        encoding only changes the XML declaration, the text isn't encoded.
+        backend names the serializer backend, see obj2xml.backends.
+        Every backend writes the same text.
+        """
+        timed = instrument.enabled
+        if timed:
+            start = instrument.timer()
+
+        fmt = self.xml_format(pretty, indent, short_empty_elements)
+        text = None
+        if self.xml_cache is not None:
+            text = self.xml_cached(fmt, xml_declaration, encoding)
+        if text is None:
+            text = self.xml_render(
+                backends.get(backend or self.xml_backend), fmt, xml_declaration, encoding
+            )
+
+        if timed:
+            instrument.record('write', self.__class__, instrument.timer() - start)
+        return text
+
+    def xml_format(self, pretty=False, indent=None, short_empty_elements=None):
+        """Returns the writer Format for the given options,
+        falling back to the class defaults.
+        """
+        if indent is None:
+            indent = self.xml_indent
+        if short_empty_elements is None:
+            short_empty_elements = self.xml_short_empty_elements
+        if not pretty:
+            if short_empty_elements:
+                return writer.COMPACT
+            indent = None
+        key = (pretty, indent, short_empty_elements)
+        fmt = _formats.get(key)
+        if fmt is None:
+            fmt = _formats[key] = writer.Format(pretty, indent, short_empty_elements)
+        return fmt
+
+    def to_xml(self, backend=None):
+        """Returns the document as an Element.
+
+        By default this is built by dict2xml. backend may name the
+        etree or lxml backend to build it with instead.
+        """
+        if backend is not None:
+            return backends.get(backend).to_elements(self)[0]
+        data = self.to_dict()
+        if instrument.enabled:
+            start = instrument.timer()
+            element = dict2xml(data)
+            instrument.record('dict2xml', self.__class__, instrument.timer() - start)
+            return element
+        return dict2xml(data)
 
     def __str__(self):
-        data = self.to_xml()
-        s = tostring(data, encoding='UTF-8')
-        # pretty print the xml
-        # http://stackoverflow.com/a/1206856/1591957
-        x = xml.dom.minidom.parseString(s)
-        return x.toprettyxml(indent='  ')
+        return self.to_string()
+
+
+from .batch import render_many, render_sharded
+from .cache import RenderCache
+from .records import Records
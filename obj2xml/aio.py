@@ -0,0 +1,51 @@
+"""asyncio support for writing documents.
+
+Documents are written in chunks, handing control back to the event loop
+between chunks, so large documents don't stall other tasks.
+"""
+from __future__ import absolute_import
+import asyncio
+
+
+async def aiter_xml(obj, chunk_size=65536, encoding='utf-8', pretty=False, indent=None,
+                    short_empty_elements=None, xml_declaration=True, backend=None):
+    """Yields the XML document of obj in encoded chunks of chunk_size,
+    and a shorter last chunk.
+
+    The document is written by iter_bytes, so the class's xml_cache
+    and xml_backend are used as they are by write.
+    If encoding is None, text is yielded instead of bytes.
+    """
+    pending = []
+    size = 0
+    # join every 64 pieces, so we don't have to measure every one
+    for piece in obj.iter_bytes(encoding, pretty, indent, short_empty_elements,
+                                xml_declaration, 64, backend):
+        pending.append(piece)
+        size += len(piece)
+        if size < chunk_size:
+            continue
+
+        # cached documents and other backends arrive in one piece
+        data = piece[:0].join(pending)
+        start = 0
+        while len(data) - start >= chunk_size:
+            yield data[start:start + chunk_size]
+            start += chunk_size
+            await asyncio.sleep(0)
+        pending = [data[start:]] if start < len(data) else []
+        size = len(data) - start
+
+    if pending:
+        yield pending[0][:0].join(pending)
+
+
+async def awrite(obj, stream, chunk_size=65536, encoding='utf-8', pretty=False, indent=None,
+                 short_empty_elements=None, xml_declaration=True, backend=None):
+    """Writes the XML document of obj to an asyncio StreamWriter,
+    waiting for it to drain after each chunk.
+    """
+    async for chunk in aiter_xml(obj, chunk_size, encoding, pretty, indent,
+                                 short_empty_elements, xml_declaration, backend):
+        stream.write(chunk)
+        await stream.drain()
@@ -0,0 +1,238 @@
+"""Serializer backends.
+
+Each backend writes a document as text, and every backend writes
+identical text for the same document and options:
+
+    native      the streaming writer, building the text directly
+    etree       the standard library's ElementTree
+    lxml        lxml.etree, if it is installed
+
+The default is the first available backend in PREFERENCE, which is
+ordered fastest first. It can be changed globally with set_default,
+per class with XML_Object.xml_backend, or per call with the backend
+argument of to_string, to_bytes and write.
+"""
+from __future__ import absolute_import
+from xml.etree import ElementTree
+
+from . import writer
+
+
+class Backend(object):
+    """Writes documents as text."""
+    name = None
+
+    def is_available(self):
+        return True
+
+    def to_string(self, obj, fmt):
+        """Returns the document, without an XML declaration."""
+        raise NotImplementedError
+
+    def to_elements(self, obj):
+        """Returns the root elements of the document. Backends which
+        don't build elements use ElementTree's.
+        """
+        return BACKENDS['etree'].to_elements(obj)
+
+
+class NativeBackend(Backend):
+    """Writes text directly with the streaming writer."""
+    name = 'native'
+
+    def to_string(self, obj, fmt):
+        out = []
+        for _ in obj.iter_xml(out, fmt):
+            pass
+        return ''.join(out)
+
+
+def build(factory, sub_factory, tag, data, parent=None):
+    """Builds an element from a dict using the same attribute,
+    _text and child element rules as the native writer.
+    """
+    if parent is None:
+        elem = factory(tag)
+    else:
+        elem = sub_factory(parent, tag)
+
+    if not isinstance(data, dict):
+        elem.text = writer.text_type(data)
+        return elem
+
+    children = []
+    for name, value in data.items():
+        if value is None:
+            continue
+        if name == '_text':
+            elem.text = writer.text_type(value)
+        elif writer.is_element(value):
+            children.append((name, value))
+        else:
+            elem.set(name, writer.text_type(value))
+
+    for name, value in children:
+        add_value(factory, sub_factory, elem, name, value)
+    return elem
+
+
+def add_value(factory, sub_factory, parent, tag, value):
+    if hasattr(value, 'to_dict'):
+        build(factory, sub_factory, tag, value.to_dict(), parent)
+    elif writer.is_sequence(value):
+        for item in value:
+            add_value(factory, sub_factory, parent, tag, item)
+    else:
+        build(factory, sub_factory, tag, value, parent)
+
+
+def iter_roots(factory, sub_factory, obj):
+    """Yields the root elements of a document."""
+    from . import overrides
+    # values at the root are only written by classes extending to_dict
+    scalars = overrides(obj.__class__, 'to_dict')
+    for name, value in obj.to_dict().items():
+        if value is None or not (scalars or writer.is_element(value)):
+            continue
+        items = value if writer.is_sequence(value) else [value]
+        for item in items:
+            if hasattr(item, 'to_dict'):
+                item = item.to_dict()
+            yield build(factory, sub_factory, name, item)
+
+
+def indent(elem, fmt, level=0):
+    """Adds whitespace to the tree as the native writer lays it out.
+
+    ElementTree.indent leaves the text of elements with children
+    inline, so it can't be used here.
+    """
+    children = list(elem)
+    if not children:
+        elem.tail = fmt.newline
+        return
+    inner = fmt.newline + fmt.prefix(level + 1)
+    if elem.text:
+        elem.text = inner + elem.text + inner
+    else:
+        elem.text = inner
+    for child in children:
+        indent(child, fmt, level + 1)
+        child.tail = inner
+    children[-1].tail = fmt.newline + fmt.prefix(level)
+    elem.tail = fmt.newline
+
+
+def mark_empty(elem):
+    """Gives empty elements empty text, so they're written as
+    <tag></tag> rather than <tag/>.
+    """
+    for child in elem.iter():
+        if child.text is None and len(child) == 0:
+            child.text = ''
+
+
+class ElementTreeBackend(Backend):
+    """Builds an xml.etree.ElementTree tree and serializes it."""
+    name = 'etree'
+
+    def element(self, tag, data):
+        return build(ElementTree.Element, ElementTree.SubElement, tag, data)
+
+    def to_elements(self, obj):
+        return list(iter_roots(ElementTree.Element, ElementTree.SubElement, obj))
+
+    def to_string(self, obj, fmt):
+        short = '%s' not in fmt.empty
+        out = []
+        for elem in self.to_elements(obj):
+            if fmt.pretty:
+                indent(elem, fmt)
+            text = ElementTree.tostring(elem, encoding='unicode', short_empty_elements=short)
+            out.append(text)
+        text = ''.join(out)
+        # tabs in attributes are written as &#09; rather than &#9;
+        # and carriage returns in text aren't escaped
+        if '&#09;' in text:
+            text = text.replace('&#09;', '&#9;')
+        if '\r' in text:
+            text = text.replace('\r', '&#13;')
+        if fmt.pretty and short:
+            # '>' is always escaped in text and attributes
+            text = text.replace(' />', '/>')
+        return text
+
+
+class LxmlBackend(Backend):
+    """Builds an lxml tree and serializes it."""
+    name = 'lxml'
+
+    def __init__(self):
+        try:
+            from lxml import etree
+        except ImportError:
+            etree = None
+        self.etree = etree
+
+    def is_available(self):
+        return self.etree is not None
+
+    def element(self, tag, data):
+        return build(self.etree.Element, self.etree.SubElement, tag, data)
+
+    def to_elements(self, obj):
+        return list(iter_roots(self.etree.Element, self.etree.SubElement, obj))
+
+    def to_string(self, obj, fmt):
+        short = '%s' not in fmt.empty
+        out = []
+        for elem in self.to_elements(obj):
+            if fmt.pretty:
+                indent(elem, fmt)
+            if not short:
+                mark_empty(elem)
+            out.append(self.etree.tostring(elem, encoding='unicode', with_tail=True))
+        text = ''.join(out)
+        if short and not fmt.pretty:
+            # '>' is always escaped in text and attributes
+            text = text.replace('/>', ' />')
+        return text
+
+
+BACKENDS = dict((backend.name, backend) for backend in (
+    NativeBackend(), ElementTreeBackend(), LxmlBackend()
+))
+
+# fastest first
+PREFERENCE = ['native', 'lxml', 'etree']
+
+_default = [None]
+
+
+def available():
+    """Returns the names of the backends which can be used."""
+    return [name for name in PREFERENCE if BACKENDS[name].is_available()]
+
+
+def set_default(name):
+    """Sets the backend used when none is given, None picks the
+    fastest available.
+    """
+    if name is not None:
+        get(name)
+    _default[0] = name
+
+
+def get(name=None):
+    """Returns the named backend, or the default."""
+    if name is None:
+        name = _default[0]
+        if name is None:
+            name = available()[0]
+    try:
+        backend = BACKENDS[name]
+    except KeyError:
+        raise ValueError('Unknown backend "{}", expected one of {}'.format(name, sorted(BACKENDS)))
+    if not backend.is_available():
+        raise ValueError('Backend "{}" is not available'.format(name))
+    return backend
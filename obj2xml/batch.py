@@ -0,0 +1,202 @@
+"""Renders many XML_Objects at once, or the list children of one
+large XML_Object, optionally spread across a thread or process pool.
+"""
+from __future__ import absolute_import
+import collections
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+from . import compile_plan, declaration, encode, overrides
+from . import writer
+
+
+EXECUTORS = ('serial', 'thread', 'process')
+
+
+def warm(classes):
+    """Compiles the property plan of each class.
+
+    Used as the process pool initializer, so each worker compiles
+    a class once rather than once per chunk.
+    """
+    for cls in classes:
+        compile_plan(cls)
+
+
+def render_chunk(objects, options):
+    return [obj.to_bytes(**options) for obj in objects]
+
+
+def iter_completed(pool, chunks, options):
+    with pool:
+        futures = dict(
+            (pool.submit(render_chunk, chunk, options), start)
+            for start, chunk in chunks
+        )
+        for future in as_completed(futures):
+            start = futures[future]
+            for offset, document in enumerate(future.result()):
+                yield start + offset, document
+
+
+def render_many(objects, workers=None, executor='process', chunksize=None,
+                ordered=True, **options):
+    """Renders each XML_Object to bytes.
+
+    executor is one of 'serial', 'thread' or 'process'.
+    Objects are sent to the workers in chunks of chunksize,
+    by default each worker receives about four chunks.
+    Objects must be picklable to use the process executor.
+
+    Returns a list of documents in the same order as objects.
+    If ordered is False, returns an iterator of (index, document)
+    pairs, as each chunk completes.
+
+    options are passed to XML_Object.to_bytes.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError('Unknown executor "{}" - {}'.format(executor, EXECUTORS))
+
+    objects = list(objects)
+    if executor == 'serial' or len(objects) <= 1:
+        documents = render_chunk(objects, options)
+        return documents if ordered else iter(enumerate(documents))
+
+    # compile the plans up front, forked workers will inherit them
+    classes = set(obj.__class__ for obj in objects)
+    warm(classes)
+
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, -(-len(objects) // (workers * 4)))
+    chunks = [
+        (start, objects[start:start + chunksize])
+        for start in range(0, len(objects), chunksize)
+    ]
+
+    if executor == 'process':
+        pool = ProcessPoolExecutor(workers, initializer=warm, initargs=(classes,))
+    else:
+        pool = ThreadPoolExecutor(workers)
+
+    if not ordered:
+        return iter_completed(pool, chunks, options)
+
+    with pool:
+        futures = [pool.submit(render_chunk, chunk, options) for _, chunk in chunks]
+        documents = []
+        for future in futures:
+            documents.extend(future.result())
+    return documents
+
+
+def render_items(tag, items, fmt, level, encoding):
+    """Writes list children as 'tag' elements, encoded by the worker."""
+    out = []
+    for item in items:
+        for _ in writer.iter_value(tag, item, out, fmt, level):
+            pass
+    return encode(''.join(out), encoding)
+
+
+def iter_chunks(items, chunksize):
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Shards(object):
+    """A list value whose children are written in chunks by a pool.
+
+    The writer appends each chunk, in order, to its output as it
+    completes. At most 'window' chunks are in flight, so children
+    from a generator aren't all read at once.
+    """
+    def __init__(self, items, pool, chunksize, encoding, window):
+        self.items = items
+        self.pool = pool
+        self.chunksize = chunksize
+        self.encoding = encoding
+        self.window = window
+
+    def iter_xml_element(self, tag, out, fmt=writer.COMPACT, level=0):
+        pending = collections.deque()
+        for chunk in iter_chunks(self.items, self.chunksize):
+            pending.append(self.pool.submit(render_items, tag, chunk, fmt, level, self.encoding))
+            if len(pending) >= self.window:
+                out.append(pending.popleft().result())
+                yield None
+        while pending:
+            out.append(pending.popleft().result())
+            yield None
+
+
+def iter_sharded(obj, workers=None, chunksize=1000, executor='process', encoding='utf-8',
+                 pretty=False, indent=None, short_empty_elements=None,
+                 xml_declaration=True, buffer_size=1024):
+    """Yields a single document in encoded chunks, writing the children
+    of its large list properties in a pool.
+
+    The document's own elements are written here as usual. List
+    properties with at least chunksize children, or whose length isn't
+    known, are split into chunks of chunksize, which the workers
+    write and encode. The chunks are placed back in order.
+    List children must be picklable to use the process executor.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError('Unknown executor "{}" - {}'.format(executor, EXECUTORS))
+    if executor == 'serial' or overrides(obj.__class__, 'to_dict'):
+        for chunk in obj.iter_bytes(encoding, pretty, indent, short_empty_elements,
+                                    xml_declaration, buffer_size):
+            yield chunk
+        return
+
+    workers = workers or os.cpu_count() or 1
+    if executor == 'process':
+        pool = ProcessPoolExecutor(workers)
+    else:
+        pool = ThreadPoolExecutor(workers)
+
+    fmt = obj.xml_format(pretty, indent, short_empty_elements)
+    plan = obj.xml_plan()
+    values = obj.xml_values(plan)
+    for index, entry in enumerate(plan):
+        value = values[index]
+        if (entry.prop.is_list and value is not None and writer.is_sequence(value)
+                and not hasattr(value, 'iter_xml_element')
+                and (not hasattr(value, '__len__') or len(value) >= chunksize)):
+            values[index] = Shards(value, pool, chunksize, encoding, workers * 2)
+
+    def join(out):
+        # the workers' chunks are already encoded
+        if encoding is None:
+            return ''.join(out)
+        return b''.join(
+            piece if isinstance(piece, bytes) else encode(piece, encoding) for piece in out
+        )
+
+    with pool:
+        out = []
+        if xml_declaration:
+            out.append(declaration(encoding) + fmt.newline)
+        constants = obj.xml_constants_for(plan, values)
+        for _ in writer.iter_document(plan.layout, values, out, fmt, None, constants):
+            if len(out) >= buffer_size:
+                yield join(out)
+                del out[:]
+        if out:
+            yield join(out)
+
+
+def render_sharded(obj, workers=None, chunksize=1000, executor='process', **options):
+    """Returns a single document as bytes, writing the children of its
+    large list properties across a pool. See iter_sharded.
+    """
+    chunks = list(iter_sharded(obj, workers, chunksize, executor, **options))
+    if options.get('encoding', 'utf-8') is None:
+        return ''.join(chunks)
+    return b''.join(chunks)
@@ -0,0 +1,185 @@
+"""Caches rendered documents by their content.
+
+Documents are keyed by a digest of their class and every value they
+are written from, including list children, so identical documents
+are rendered once, however many objects hold them.
+"""
+from __future__ import absolute_import
+import hashlib
+import threading
+from collections import OrderedDict
+
+from .writer import is_element, is_sequence, is_reusable, text_type
+
+try:
+    SCALARS = (str, unicode, int, long, float, bool, type(None))
+except NameError:
+    SCALARS = (str, bytes, int, float, bool, type(None))
+
+
+class Uncacheable(Exception):
+    """Raised when a document holds values which can only be read once,
+    such as generators, or which have no text that is the same in
+    every process, such as objects with the default repr.
+    """
+
+
+def canonical(value):
+    """Returns the text value is hashed as.
+
+    Scalars are hashed by their repr, and other values by the text
+    they're written as.
+    """
+    cls = type(value)
+    if isinstance(value, SCALARS):
+        # the type is included so 1, 1.0 and True don't collide
+        return '%s:%r;' % (cls.__name__, value)
+    if cls.__str__ is object.__str__ and cls.__repr__ is object.__repr__:
+        # the default repr holds the address of the object
+        raise Uncacheable(value)
+    return '%s.%s:%s;' % (cls.__module__, cls.__name__, text_type(value))
+
+
+def iter_parts(value):
+    """Yields the text the content key of value is built from."""
+    if hasattr(value, 'xml_content'):
+        yield '#%s;' % value.digest()
+    elif isinstance(value, dict):
+        yield '{'
+        for name, item in value.items():
+            yield repr(name)
+            for part in iter_parts(item):
+                yield part
+        yield '}'
+    elif isinstance(value, (list, tuple)) or (
+        is_sequence(value) and is_reusable(value)
+    ):
+        yield '['
+        for item in value:
+            if hasattr(item, 'xml_content'):
+                yield '#%s;' % item.digest()
+            else:
+                for part in iter_parts(item):
+                    yield part
+        yield ']'
+    elif is_sequence(value):
+        raise Uncacheable(value)
+    else:
+        yield canonical(value)
+
+
+def hash_parts(parts, prefix=''):
+    text = prefix + ''.join(parts)
+    return hashlib.sha1(text.encode('utf-8', 'backslashreplace')).hexdigest()
+
+
+def content_key(obj, *options):
+    """Returns a digest of the class and values of obj, and options.
+
+    Raises Uncacheable if obj holds generators or iterators.
+    """
+    return hash_parts([obj.digest()], repr(options))
+
+
+def digest_values(signature, values):
+    """Returns the digest of the values which aren't elements, and
+    the indices of those which are.
+
+    Elements such as lists can change without us knowing, so they're
+    hashed each time by combine.
+    """
+    elements = []
+    parts = ['<%s>' % signature]
+    for index, value in enumerate(values):
+        if value is not None and is_element(value):
+            elements.append(index)
+        else:
+            parts.append('%d=' % index)
+            parts.extend(iter_parts(value))
+    return hash_parts(parts), tuple(elements)
+
+
+def combine(digest, elements):
+    """Returns the digest of a document from the digest of its
+    values which aren't elements and (index, value) for the rest.
+    """
+    if not elements:
+        return digest
+    parts = [digest]
+    for index, value in elements:
+        parts.append('%d=' % index)
+        parts.extend(iter_parts(value))
+    return hash_parts(parts)
+
+
+class RenderCache(object):
+    """A least recently used cache of rendered documents.
+
+    Assign one to a class's xml_cache to use it::
+
+        CurrentSync.xml_cache = RenderCache(max_entries=256)
+
+    The oldest documents are dropped once there are more than
+    max_entries, or their total length is over max_size characters.
+    Either limit can be None. The cache is thread safe.
+    """
+    def __init__(self, max_entries=1024, max_size=None):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the document for key, or None."""
+        with self.lock:
+            text = self.entries.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key, text):
+        """Stores a document, evicting the least recently used ones."""
+        if self.max_size is not None and len(text) > self.max_size:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[key] = text
+            self.size += len(text)
+            while self.entries and (
+                (self.max_entries is not None and len(self.entries) > self.max_entries)
+                or (self.max_size is not None and self.size > self.max_size)
+            ):
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        """Discards every document. The statistics are kept."""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """Returns the hit, miss and eviction counts, and the number
+        and total length of the cached documents.
+        """
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self.entries),
+                'size': self.size,
+            }
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,387 @@
+"""Generates a specialized writer for each XML_Object class.
+
+The generic writer walks a class's compiled layout for every document
+it writes. For classes which set xml_codegen, the layout is instead
+turned into the Python source of a function which writes that class's
+documents, with the tags, the attribute and text placement of each
+property, and the defaults of plain properties written into the code.
+
+The function is compiled once per class, and the compiled code kept in
+the __pycache__ directory next to the class's module, so later
+processes load it rather than generating it again. The file name holds
+a digest of everything the code depends on, so changing a class's
+properties writes a new file. Nothing is written if the directory
+isn't writable or sys.dont_write_bytecode is set.
+
+The defaults written into the code are checked before each document
+is written, and the code generated again if a descriptor's default has
+been changed in place.
+
+Objects with descriptors added at runtime, and classes which extend
+to_dict, are written by the generic writer.
+"""
+from __future__ import absolute_import
+import hashlib
+import marshal
+import os
+import sys
+from importlib.util import MAGIC_NUMBER
+
+from . import writer, is_plain
+
+# bumped whenever the generated code changes
+VERSION = 3
+
+# values which are written into the code, rather than passed to it
+LITERALS = (bool, int, float, str, type(None))
+
+
+def literal(value):
+    """Returns the source of value, or None if it can't be written
+    as a literal.
+    """
+    if type(value) not in LITERALS:
+        return None
+    text = repr(value)
+    if isinstance(value, float) and text in ('nan', 'inf', '-inf'):
+        return None
+    return text
+
+
+def is_inlined(prop, inline=True):
+    return inline and is_plain(prop)
+
+
+def in_order(*keys):
+    """Returns True if the keys which aren't None are ascending."""
+    last = -1
+    for key in keys:
+        if key is not None:
+            if key < last:
+                return False
+            last = key
+    return True
+
+
+def iter_reordered(node):
+    """Yields each layout node whose children may be reordered."""
+    if node.reorders:
+        yield node
+    for _, _, child in node.items:
+        if child is not None:
+            for found in iter_reordered(child):
+                yield found
+
+
+def namespace(plan, inline=True):
+    """Returns the names the generated code refers to which aren't
+    literals: the writer functions, descriptors which are called,
+    and defaults which can't be written into the code.
+    """
+    names = {
+        'is_element': writer.is_element,
+        'escape_text': writer.escape_text,
+        'escape_attrib': writer.escape_attrib,
+        'text_type': writer.text_type,
+        'child_header': writer.child_header,
+        'iter_value': writer.iter_value,
+        'iter_node': writer.iter_node,
+        'iter_document': writer.iter_document,
+        'in_order': in_order,
+        'layout': plan.layout,
+    }
+    for index, entry in enumerate(plan):
+        prop = entry.prop
+        if not is_inlined(prop, inline):
+            names['p%d' % index] = prop
+        elif literal(prop.default) is None:
+            names['d%d' % index] = prop.default
+    return names
+
+
+class Generator(object):
+    """Writes the source of a render function for a plan."""
+    def __init__(self, plan, inline=True):
+        self.plan = plan
+        self.inline = inline
+        self.lines = []
+        self.depth = 0
+        self.count = 0
+        self.levels = 1
+
+    def line(self, text):
+        self.lines.append('    ' * self.depth + text)
+
+    def source(self):
+        """Returns the source of the function."""
+        plan = self.plan
+        body, self.lines = self.lines, []
+
+        self.depth = 1
+        self.line('if tag is None:')
+        self.depth += 1
+        self.write_document(plan.layout)
+        self.depth -= 1
+        self.line('else:')
+        self.depth += 1
+        self.write_node(plan.layout, 0, None)
+        self.depth -= 1
+        # a generator, so nothing is written until the caller iterates
+        self.line('if False:')
+        self.line('    yield')
+        nodes, self.lines = self.lines, body
+
+        self.depth = 0
+        self.line('def render(obj, out, fmt, level, tag):')
+        self.depth = 1
+        self.line('owner = obj.__class__')
+        self.line('attrs = obj.__dict__')
+        for index, entry in enumerate(plan):
+            self.write_value(index, entry.prop)
+        self.line('nl = fmt.newline')
+        self.line('empty = fmt.empty')
+        self.line("named = '%s' in empty")
+        self.line('prefix = fmt.prefix')
+        for depth in range(self.levels):
+            self.line('i%d = prefix(level + %d)' % (depth, depth))
+        self.write_order_check()
+        return '\n'.join(self.lines + nodes) + '\n'
+
+    def write_value(self, index, prop):
+        """Reads the value of the plan entry index into v{index}."""
+        if is_inlined(prop, self.inline):
+            default = literal(prop.default) or 'd%d' % index
+            # as XML_Property.__get__, any false value reads as the default
+            self.line('v%d = attrs.get(%r) or %s' % (index, prop.key, default))
+        else:
+            self.line('v%d = p%d.__get__(obj, owner)' % (index, index))
+
+    def write_order_check(self):
+        """Writes documents whose elements are in a different order
+        than the generated code has them with the generic writer.
+        """
+        checks = []
+        for node in iter_reordered(self.plan.layout):
+            keys = []
+            for _, index, child in node.items:
+                indices = child.indices if child is not None else [index]
+                keys.append('(%s else None)' % ' else '.join(
+                    '%d if v%d is not None' % (i, i) for i in indices
+                ))
+            checks.append('in_order(%s)' % ', '.join(keys))
+        if not checks:
+            return
+        self.line('if not (%s):' % ' and '.join(checks))
+        self.depth += 1
+        self.line('values = [%s]' % ', '.join('v%d' % i for i in range(len(self.plan))))
+        self.line('if tag is None:')
+        self.line('    generic = iter_document(layout, values, out, fmt)')
+        self.line('else:')
+        self.line('    generic = iter_node(tag, layout, values, out, fmt, level)')
+        self.line('for flush in generic:')
+        self.line('    yield flush')
+        self.line('return')
+        self.depth -= 1
+
+    def is_present(self, node):
+        return ' or '.join('v%d is not None' % index for index in node.indices)
+
+    def write_document(self, node):
+        """Writes the root elements, as writer.iter_document does."""
+        if not node.items:
+            self.line('pass')
+        for name, index, child in node.items:
+            if child is not None:
+                self.line('if %s:' % self.is_present(child))
+                self.depth += 1
+                self.write_node(child, 0, name)
+                self.depth -= 1
+            else:
+                self.line('if v%d is not None and is_element(v%d):' % (index, index))
+                self.line('    for flush in iter_value(%r, v%d, out, fmt, level):' % (name, index))
+                self.line('        yield flush')
+
+    def write_node(self, node, depth, tag):
+        """Writes an element, as writer.iter_node does.
+
+        tag is None for the root element, whose tag is a parameter.
+        """
+        self.count += 1
+        n = self.count
+        self.levels = max(self.levels, depth + 1)
+        if tag is None:
+            start = "'<' + tag"
+            end = "'</' + tag + '>'"
+            empty = 'empty % tag'
+        else:
+            start = repr('<' + tag)
+            end = repr('</%s>' % tag)
+            empty = 'empty %% %r' % tag
+
+        text = 'None'
+        self.line('s%d = i%d + %s' % (n, depth, start))
+        for name, index in node.leaves:
+            if name == '_text':
+                # as writer.node_content, empty text is no text
+                text = 't%d' % n
+                self.line('t%d = v%d if v%d is None else text_type(v%d) or None' % (
+                    n, index, index, index
+                ))
+                continue
+            self.line('if v%d is not None and not is_element(v%d):' % (index, index))
+            self.line('    s%d += %r + escape_attrib(text_type(v%d)) + \'"\'' % (
+                n, ' %s="' % name, index
+            ))
+        self.line('out.append(s%d)' % n)
+        self.line('m%d = len(out) - 1' % n)
+
+        children = [item for item in node.items if item[2] is not None or item[0] != '_text']
+        if children:
+            self.line('h%d = False' % n)
+        for name, index, child in children:
+            if child is not None:
+                self.line('if %s:' % self.is_present(child))
+                self.depth += 1
+                self.line('if not h%d:' % n)
+                self.line('    out.append(child_header(%s, fmt, level + %d))' % (text, depth))
+                self.line('    h%d = True' % n)
+                self.write_node(child, depth + 1, name)
+                self.depth -= 1
+                continue
+
+            # like iter_element, the header is only kept if the
+            # value writes something, such as a non empty list
+            child = 'iter_value(%r, v%d, out, fmt, level + %d)' % (name, index, depth + 1)
+            self.line('if v%d is not None and is_element(v%d):' % (index, index))
+            self.depth += 1
+            self.line('if h%d:' % n)
+            self.line('    for flush in %s:' % child)
+            self.line('        yield flush')
+            self.line('else:')
+            self.line('    out.append(child_header(%s, fmt, level + %d))' % (text, depth))
+            self.line('    start = len(out)')
+            self.line('    for flush in %s:' % child)
+            self.line('        h%d = True' % n)
+            self.line('        yield flush')
+            self.line('    if h%d or len(out) > start:' % n)
+            self.line('        h%d = True' % n)
+            self.line('    else:')
+            self.line('        out.pop()')
+            self.depth -= 1
+
+        branch = 'if'
+        if children:
+            self.line('if h%d:' % n)
+            self.line('    out.append(i%d + %s + nl)' % (depth, end))
+            branch = 'elif'
+        if text != 'None':
+            self.line('%s %s is not None:' % (branch, text))
+            self.line("    out.append('>' + escape_text(text_type(%s)) + %s + nl)" % (text, end))
+            branch = 'elif'
+        if branch == 'if':
+            self.line('if named:')
+        else:
+            self.line('elif named:')
+        self.line('    out[m%d] += %s + nl' % (n, empty))
+        self.line('else:')
+        self.line('    out[m%d] += empty + nl' % n)
+
+
+def generate(plan, inline=True):
+    """Returns the source of the render function for plan.
+
+    With inline set, values of plain properties are read from the
+    instance __dict__ directly.
+    """
+    return Generator(plan, inline).source()
+
+
+def cache_key(plan, inline=True):
+    """Returns a digest of everything the generated code depends on."""
+    parts = [str(VERSION), plan.signature, str(inline)]
+    for entry in plan:
+        parts.append('%s:%s' % (
+            is_inlined(entry.prop, inline), literal(entry.prop.default)
+        ))
+    return hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def cache_path(cls, key):
+    """Returns the file the compiled code of cls is kept in,
+    or None if its module has no file.
+    """
+    module = sys.modules.get(cls.__module__)
+    filename = getattr(module, '__file__', None)
+    if not filename:
+        return None
+    directory = os.path.join(os.path.dirname(os.path.abspath(filename)), '__pycache__')
+    return os.path.join(directory, '%s.%s.obj2xml-%s.bin' % (
+        cls.__module__.rpartition('.')[2], cls.__name__, key[:16]
+    ))
+
+
+def read_code(path):
+    """Returns the code stored at path, or None."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except (IOError, OSError):
+        return None
+    if data[:len(MAGIC_NUMBER)] != MAGIC_NUMBER:
+        return None
+    try:
+        return marshal.loads(data[len(MAGIC_NUMBER):])
+    except (EOFError, ValueError, TypeError):
+        return None
+
+
+def write_code(path, code):
+    """Stores code at path, replacing the files of earlier versions
+    of the class. Failures are ignored.
+    """
+    if sys.dont_write_bytecode:
+        return
+    directory, name = os.path.split(path)
+    stem = name.rpartition('-')[0] + '-'
+    temp = '%s.%d.tmp' % (path, os.getpid())
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(temp, 'wb') as f:
+            f.write(MAGIC_NUMBER + marshal.dumps(code))
+        os.replace(temp, path)
+        for other in os.listdir(directory):
+            if other.startswith(stem) and other.endswith('.bin') and other != name:
+                os.remove(os.path.join(directory, other))
+    except (IOError, OSError):
+        if os.path.exists(temp):
+            os.remove(temp)
+
+
+def serializer(plan):
+    """Returns the render function for a class plan, loading its
+    compiled code from disk, or generating and storing it.
+
+    render(obj, out, fmt, level, tag) is a generator which writes obj
+    as iter_node would, or as iter_document would when tag is None.
+    render.defaults holds (descriptor, default) for each default
+    written into the code.
+    """
+    cls = plan.owner
+    inline = not cls.xml_compact
+    key = cache_key(plan, inline)
+    path = cache_path(cls, key)
+
+    code = read_code(path) if path is not None else None
+    if code is None:
+        source = generate(plan, inline)
+        code = compile(source, '<obj2xml %s.%s>' % (cls.__module__, cls.__name__), 'exec')
+        if path is not None:
+            write_code(path, code)
+    names = namespace(plan, inline)
+    exec(code, names)
+    render = names['render']
+    render.defaults = tuple(
+        (entry.prop, entry.prop.default) for entry in plan if is_inlined(entry.prop, inline)
+    )
+    return render
@@ -0,0 +1,234 @@
+"""Compares the property values of two XML_Objects.
+
+Values are compared as the descriptors return them, so defaults count,
+and neither document is written. List children are matched by the
+list property's key, or by position if it has none, and XML_Object
+children are compared property by property.
+
+The resulting ChangeSet is empty if nothing changed, and can be
+written as a delta document holding only what changed::
+
+    changes = old.diff(new)
+    if changes:
+        send(changes.to_bytes())
+"""
+from __future__ import absolute_import
+import collections
+
+from . import writer
+from . import Tree, declaration, encode
+
+
+Change = collections.namedtuple('Change', ['name', 'path', 'old', 'new'])
+Change.__doc__ = """A property whose value changed."""
+
+ListChange = collections.namedtuple(
+    'ListChange', ['name', 'path', 'key', 'added', 'removed', 'changed']
+)
+ListChange.__doc__ = """A list property whose children changed.
+
+key is what children were matched by, or None if they were matched
+by position. added and removed hold children, changed holds
+(old, new, changes) for matched children which differ, where changes
+is a ChangeSet for XML_Object children and None for anything else.
+"""
+
+
+def plan_values(obj):
+    """Returns (entry, value) for each property of obj, by name.
+    List values are read into lists.
+    """
+    plan = obj.xml_plan()
+    values = obj.xml_values(plan)
+    result = collections.OrderedDict()
+    for entry, value in zip(plan, values):
+        if entry.prop.is_list and value is not None and writer.is_sequence(value):
+            value = list(value)
+        result[entry.name] = (entry, value)
+    return result
+
+
+def child_key(key, child):
+    """Returns the key a list child is matched by."""
+    if callable(key):
+        return key(child)
+    if isinstance(child, dict):
+        return child.get(key)
+    return getattr(child, key, None)
+
+
+def compare(old, new):
+    """Returns (changed, changes) for a pair of list children."""
+    if hasattr(old, 'xml_plan') and hasattr(new, 'xml_plan'):
+        changes = diff(old, new)
+        return bool(changes), changes
+    return not writer.same(old, new), None
+
+
+def match(old, new, key):
+    """Returns the (added, removed, changed) children of a list."""
+    added = []
+    removed = []
+    changed = []
+    if key is None:
+        pairs = list(zip(old, new))
+        removed = old[len(new):]
+        added = new[len(old):]
+    else:
+        # children with the same key are matched in order
+        unmatched = collections.OrderedDict()
+        for child in old:
+            unmatched.setdefault(child_key(key, child), []).append(child)
+        pairs = []
+        for child in new:
+            candidates = unmatched.get(child_key(key, child))
+            if candidates:
+                pairs.append((candidates.pop(0), child))
+            else:
+                added.append(child)
+        for candidates in unmatched.values():
+            removed.extend(candidates)
+
+    for a, b in pairs:
+        differs, changes = compare(a, b)
+        if differs:
+            changed.append((a, b, changes))
+    return added, removed, changed
+
+
+def diff(old, new, keys=None):
+    """Returns the ChangeSet which turns old into new.
+
+    keys maps list property names to the attribute name, or function,
+    their children are matched by, overriding the properties' key.
+    """
+    keys = keys or {}
+    before = plan_values(old)
+    after = plan_values(new)
+    changes = ChangeSet()
+
+    names = list(before)
+    names.extend(name for name in after if name not in before)
+    for name in names:
+        entry, a = before.get(name, (None, None))
+        entry_b, b = after.get(name, (None, None))
+        entry = entry or entry_b
+        path = tuple(entry.prop.path)
+
+        if entry.prop.is_list and (isinstance(a, list) or isinstance(b, list)):
+            key = keys.get(name, getattr(entry.prop, 'key_by', None))
+            added, removed, changed = match(
+                a if isinstance(a, list) else [],
+                b if isinstance(b, list) else [],
+                key
+            )
+            if added or removed or changed:
+                changes.append(ListChange(name, path, key, added, removed, changed))
+        elif a is None and b is None:
+            continue
+        elif hasattr(a, 'xml_plan') and hasattr(b, 'xml_plan'):
+            if diff(a, b, keys):
+                changes.append(Change(name, path, a, b))
+        elif not writer.same(a, b):
+            changes.append(Change(name, path, a, b))
+    return changes
+
+
+def key_values(child, key):
+    """Returns the tree holding the key of a list child, so a delta
+    document can identify it.
+    """
+    tree = Tree()
+    if key is None or callable(key):
+        return tree
+    for entry in child.xml_plan():
+        if entry.name == key:
+            set_path(tree, entry.prop.path, getattr(child, key))
+    return tree
+
+
+def set_path(tree, path, value):
+    branch = tree
+    for tag in path[:-1]:
+        branch = branch[tag]
+    branch[path[-1]] = value
+
+
+def merge(tree, other):
+    """Adds the values in other to tree."""
+    for name, value in other.items():
+        if isinstance(value, dict) and isinstance(tree.get(name), dict):
+            merge(tree[name], value)
+        else:
+            tree[name] = value
+
+
+def delta_child(child, delta):
+    """Returns a list child as a dict, marked with delta."""
+    if hasattr(child, 'to_dict'):
+        child = child.to_dict()
+    elif isinstance(child, dict):
+        child = dict(child)
+    else:
+        return child
+    child['delta'] = delta
+    return child
+
+
+class ChangeSet(list):
+    """The Change and ListChange of each property which differs.
+
+    Empty, and so false, when nothing changed.
+    """
+    def to_dict(self):
+        """Returns the delta document as a dict.
+
+        Changed values are written at their paths with their new value,
+        values which were removed are written empty.
+        List children are written with a delta attribute of added,
+        removed or changed. Removed and changed XML_Object children
+        only hold their key and what changed.
+        """
+        tree = Tree()
+        for change in self:
+            if isinstance(change, Change):
+                value = change.new
+                if value is None:
+                    value = ''
+                elif hasattr(value, 'to_dict'):
+                    value = value.to_dict()
+                set_path(tree, change.path, value)
+                continue
+
+            children = [delta_child(child, 'added') for child in change.added]
+            for old, new, changes in change.changed:
+                if changes is None:
+                    children.append(delta_child(new, 'changed'))
+                else:
+                    child = key_values(old, change.key)
+                    merge(child, changes.to_dict())
+                    child['delta'] = 'changed'
+                    children.append(child)
+            for old in change.removed:
+                if hasattr(old, 'xml_plan'):
+                    child = key_values(old, change.key)
+                    child['delta'] = 'removed'
+                    children.append(child)
+                else:
+                    children.append(delta_child(old, 'removed'))
+            set_path(tree, change.path, children)
+        return tree
+
+    def to_string(self, pretty=False, indent='  ', xml_declaration=True, encoding=None):
+        """Returns the delta document as text."""
+        fmt = writer.Format(pretty, indent)
+        out = []
+        if xml_declaration:
+            out.append(declaration(encoding) + fmt.newline)
+        for _ in writer.iter_dict_document(self.to_dict(), out, fmt):
+            pass
+        return ''.join(out)
+
+    def to_bytes(self, encoding='utf-8', pretty=False, indent='  ', xml_declaration=True):
+        """Returns the delta document as encoded bytes."""
+        return encode(self.to_string(pretty, indent, xml_declaration, encoding), encoding)
@@ -0,0 +1,85 @@
+"""Immutable snapshots of XML_Objects.
+
+XML_Object.freeze copies an object into a frozen instance of the same
+class. Its lists are copied into tuples, its dicts into FrozenDicts and
+its XML_Object children frozen in turn, so nothing it holds can change
+and it can be written by several threads at once, without locks::
+
+    snapshot = sync.freeze()
+    futures = [executor.submit(snapshot.to_bytes) for _ in range(4)]
+
+Frozen objects are equal if they have the same class and digest,
+and hash by their digest.
+"""
+from __future__ import absolute_import
+
+from . import writer
+
+
+class FrozenDict(dict):
+    """A dict which can't be changed, and so can be hashed."""
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("'FrozenDict' object does not support item assignment")
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __hash__(self):
+        return hash(tuple(sorted((repr(name), hash(value)) for name, value in self.items())))
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+def freeze_value(value):
+    """Returns a copy of value which can't be changed.
+
+    Sequences, including generators, are read into tuples.
+    """
+    if hasattr(value, 'xml_plan'):
+        return value.freeze()
+    if isinstance(value, dict):
+        return FrozenDict((name, freeze_value(item)) for name, item in value.items())
+    if isinstance(value, tuple) and hasattr(value, '_fields'):
+        # namedtuples keep their type
+        return value
+    if writer.is_sequence(value):
+        return tuple(freeze_value(item) for item in value)
+    return value
+
+
+def freeze(obj):
+    """Returns a frozen copy of obj.
+
+    Property values are copied as they're stored, so defaults and
+    custom descriptors are applied when the copy is read, as they
+    would be for obj. Other lists and dicts on the instance, which
+    to_dict or descriptors may read, are frozen too.
+    """
+    if '_xml_lazy' in obj.__dict__:
+        obj.xml_materialize()
+
+    cls = obj.__class__
+    plan = obj.xml_plan()
+    keys = set(entry.prop.key for entry in plan)
+    frozen = cls.__new__(cls)
+    attrs = frozen.__dict__
+    for name, value in obj.__dict__.items():
+        if name in keys:
+            continue
+        if name.startswith('_xml_'):
+            # caches are rebuilt by the copy as it's written
+            if name == '_xml_descriptors':
+                attrs[name] = value
+            continue
+        if isinstance(value, (list, tuple, dict)) or hasattr(value, 'xml_plan'):
+            value = freeze_value(value)
+        attrs[name] = value
+
+    for entry in plan:
+        value = entry.prop.load(obj)
+        if value is not None:
+            entry.prop.store(frozen, freeze_value(value))
+
+    attrs['_xml_frozen'] = True
+    return frozen
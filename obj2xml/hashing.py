@@ -0,0 +1,125 @@
+"""Hashes files for download documents.
+
+Files are read in fixed size chunks, so memory use doesn't grow with
+the file size. Many files are hashed at once in a thread pool, which
+runs in parallel as hashlib releases the GIL while hashing.
+
+A HashCache remembers the hash of each file by its path, size and
+modification time, so unchanged files aren't hashed again::
+
+    cache = HashCache('.hashes.json')
+    hashes = hash_files(paths, cache=cache)
+    cache.save()
+"""
+from __future__ import absolute_import
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path, algorithm='sha1', chunk_size=CHUNK_SIZE):
+    """Returns the hex digest of the file at path."""
+    digest = hashlib.new(algorithm)
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            read = f.readinto(buf)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+
+class HashCache(object):
+    """Hashes of files, keyed by path, size and modification time.
+
+    If filename is given, the cache is read from it if it exists,
+    and save writes it back. The cache is thread safe.
+    """
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.changed = False
+        if filename is not None and os.path.exists(filename):
+            with open(filename, 'r') as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def key(path):
+        return os.path.abspath(path)
+
+    def get(self, path, stat, algorithm='sha1'):
+        """Returns the cached hash of path, or None if the file
+        has changed since it was hashed.
+        """
+        with self.lock:
+            entry = self.entries.get(self.key(path))
+        if entry is None:
+            return None
+        size, mtime_ns, method, value = entry
+        if size != stat.st_size or mtime_ns != stat.st_mtime_ns or method != algorithm:
+            return None
+        return value
+
+    def put(self, path, stat, value, algorithm='sha1'):
+        """Records the hash of path."""
+        with self.lock:
+            self.entries[self.key(path)] = [stat.st_size, stat.st_mtime_ns, algorithm, value]
+            self.changed = True
+
+    def save(self, filename=None):
+        """Writes the cache to filename, or the file it was read from.
+
+        The file is replaced atomically, so a failed save leaves
+        the previous cache intact.
+        """
+        filename = filename or self.filename
+        if filename is None:
+            raise ValueError('No filename to save the hash cache to')
+        with self.lock:
+            entries = dict(self.entries)
+            self.changed = False
+        temp = '%s.%d.tmp' % (filename, os.getpid())
+        with open(temp, 'w') as f:
+            json.dump(entries, f)
+        os.replace(temp, filename)
+
+
+def cached_hash(path, algorithm='sha1', cache=None, chunk_size=CHUNK_SIZE):
+    """Returns the hex digest of path, from cache if the file
+    hasn't changed.
+    """
+    if cache is None:
+        return hash_file(path, algorithm, chunk_size)
+    stat = os.stat(path)
+    value = cache.get(path, stat, algorithm)
+    if value is None:
+        value = hash_file(path, algorithm, chunk_size)
+        # the file may have changed while it was read
+        if os.stat(path).st_mtime_ns == stat.st_mtime_ns:
+            cache.put(path, stat, value, algorithm)
+    return value
+
+
+def hash_files(paths, algorithm='sha1', cache=None, workers=None, chunk_size=CHUNK_SIZE):
+    """Returns a dict of path to hex digest for each path.
+
+    Files are hashed in a pool of 'workers' threads, which defaults
+    to the number of CPUs.
+    """
+    paths = list(paths)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(paths) <= 1:
+        return dict((path, cached_hash(path, algorithm, cache, chunk_size)) for path in paths)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        values = pool.map(lambda path: cached_hash(path, algorithm, cache, chunk_size), paths)
+        return dict(zip(paths, values))
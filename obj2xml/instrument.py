@@ -0,0 +1,161 @@
+"""Opt-in instrumentation of rendering.
+
+When enabled, each rendering stage records a call count and the
+cumulative time spent, per stage and per XML_Object subclass.
+Hooks are called with each measurement, so they can be forwarded
+to a metrics system.
+
+The stages are:
+    values      reading property values through the descriptors
+    to_dict     XML_Object.to_dict
+    dict2xml    building an Element from the dict in to_xml
+    write       the writer, in write, to_bytes and to_string
+
+Stages of child objects are also included in their parent's timings.
+
+When disabled, each stage costs a single flag check.
+"""
+from __future__ import absolute_import
+import threading
+import time
+from contextlib import contextmanager
+
+
+enabled = False
+timer = time.perf_counter
+
+_lock = threading.Lock()
+_local = threading.local()
+_switched_on = False
+_capturing = 0
+_stats = {}
+_hooks = []
+
+
+def _update():
+    global enabled
+    enabled = _switched_on or _capturing > 0
+
+
+def enable():
+    """Starts recording stage timings."""
+    global _switched_on
+    with _lock:
+        _switched_on = True
+        _update()
+
+
+def disable():
+    """Stops recording stage timings.
+    Captures which are in progress keep recording.
+    """
+    global _switched_on
+    with _lock:
+        _switched_on = False
+        _update()
+
+
+def reset():
+    """Discards the recorded timings."""
+    with _lock:
+        _stats.clear()
+
+
+def stats():
+    """Returns the recorded timings as a dict of
+    {stage: {class name: {'count': int, 'seconds': float}}}.
+    """
+    result = {}
+    with _lock:
+        for (stage, name), (count, seconds) in _stats.items():
+            result.setdefault(stage, {})[name] = {'count': count, 'seconds': seconds}
+    return result
+
+
+def add_hook(hook):
+    """Registers a callable which is called as hook(stage, cls, seconds)
+    after each measurement.
+    """
+    _hooks.append(hook)
+
+
+def remove_hook(hook):
+    _hooks.remove(hook)
+
+
+def record(stage, cls, seconds):
+    """Records a single measurement of a stage."""
+    captures = getattr(_local, 'captures', None)
+    if not _switched_on and not captures:
+        # recording was switched on by a capture in another thread
+        return
+
+    key = (stage, cls.__name__)
+    with _lock:
+        entry = _stats.get(key)
+        if entry is None:
+            _stats[key] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+    for hook in _hooks:
+        hook(stage, cls, seconds)
+
+    for breakdown in captures or ():
+        breakdown.add(stage, cls, seconds)
+
+
+class Breakdown(object):
+    """The timings recorded by capture.
+
+    'stages' maps stage to {'count': int, 'seconds': float}.
+    'classes' maps (stage, class name) to the same.
+    """
+    def __init__(self):
+        self.stages = {}
+        self.classes = {}
+
+    def add(self, stage, cls, seconds):
+        for table, key in ((self.stages, stage), (self.classes, (stage, cls.__name__))):
+            entry = table.get(key)
+            if entry is None:
+                table[key] = {'count': 1, 'seconds': seconds}
+            else:
+                entry['count'] += 1
+                entry['seconds'] += seconds
+
+    def __repr__(self):
+        return '<Breakdown {}>'.format(', '.join(
+            '{}={:.6f}s/{}'.format(stage, entry['seconds'], entry['count'])
+            for stage, entry in sorted(self.stages.items())
+        ))
+
+
+@contextmanager
+def capture():
+    """Captures the timings of the renders made by this thread
+    within the block::
+
+        with instrument.capture() as breakdown:
+            str(obj)
+        print(breakdown.stages)
+
+    Recording is switched on for this thread for the duration of the
+    block. Renders made by other threads meanwhile aren't recorded,
+    unless enable has been called.
+    """
+    global _capturing
+    breakdown = Breakdown()
+    captures = _local.__dict__.setdefault('captures', [])
+    captures.append(breakdown)
+    with _lock:
+        _capturing += 1
+        _update()
+    try:
+        yield breakdown
+    finally:
+        captures.remove(breakdown)
+        with _lock:
+            _capturing -= 1
+            _update()
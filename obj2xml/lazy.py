@@ -0,0 +1,211 @@
+"""Lazily loads documents from memory mapped files.
+
+The file is scanned for the offsets of the elements the plan reads
+on the first property access. Each property is decoded on its own
+when it is first read, list children are decoded one at a time as
+they are accessed.
+"""
+from __future__ import absolute_import
+import io
+import mmap
+import re
+from xml.etree.ElementTree import fromstring
+
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
+
+from . import reader
+
+
+TOKEN = re.compile(
+    br'<(?:!--.*?--|!\[CDATA\[.*?\]\]|[?!][^>]*'
+    br'|(/)?([^\s/>]+)((?:[^>"\']|"[^"]*"|\'[^\']*\')*?)(/)?)>',
+    re.S
+)
+ENCODING = re.compile(br'^\s*<\?xml[^>]*encoding=["\']([\w.\-]+)["\']')
+
+
+class Span(object):
+    """The offsets of an element within the file."""
+    __slots__ = ('start', 'content', 'end')
+
+    def __init__(self, start, content, end=None):
+        self.start = start
+        # the end of the start tag
+        self.content = content
+        self.end = end
+
+
+class LazyChildren(Sequence):
+    """The children of a list property, decoded as they are accessed."""
+    def __init__(self, source, entry, spans):
+        self.source = source
+        self.entry = entry
+        self.spans = spans
+
+    def __len__(self):
+        return len(self.spans)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        span = self.spans[index]
+        elem = fromstring(self.source.data[span.start:span.end])
+        return reader.read_child(self.entry, elem)
+
+
+def is_lazy_supported(path):
+    """Lazy loading decodes fragments as UTF-8, so other
+    encodings are read eagerly instead.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(256)
+    match = ENCODING.match(head)
+    return match is None or match.group(1).lower().replace(b'_', b'-') in (b'utf-8', b'utf8', b'us-ascii', b'ascii')
+
+
+def iter_scan(data, index, elements, lists):
+    """Records the spans of the elements the plan reads in elements
+    and lists, yielding the path of each one as it's found so scanning
+    can stop as soon as the element we're after has been seen.
+
+    It doesn't hold the source, so a document which is dropped
+    part way through a scan releases its file straight away.
+    """
+    wanted = set(index.texts) | set(index.attrs)
+
+    path = []
+    spans = []
+    for match in TOKEN.finditer(data):
+        closing, tag, _, self_closing = match.groups()
+        if tag is None:
+            continue
+        if closing:
+            path.pop()
+            span = spans.pop()
+            if span is not None:
+                span.end = match.end()
+            continue
+
+        path.append(tag.decode('utf-8'))
+        key = tuple(path)
+        span = None
+        if key in lists:
+            span = Span(match.start(), match.end())
+            lists[key].append(span)
+        elif key in wanted and key not in elements:
+            span = elements[key] = Span(match.start(), match.end())
+
+        if self_closing:
+            path.pop()
+            if span is not None:
+                span.end = match.end()
+        else:
+            spans.append(span)
+        if span is not None:
+            yield key
+
+
+class LazySource(object):
+    """Decodes the property values of one document on demand."""
+    def __init__(self, path, plan):
+        self.path = path
+        self.plan = plan
+        self.entries = dict((entry.prop, entry) for entry in plan)
+        with open(path, 'rb') as f:
+            try:
+                # the map holds its own descriptor, so the file
+                # doesn't have to be kept open
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty files can't be mapped
+                self.data = b''
+        self.scanner = None
+        self.scanned = False
+        self.elements = None
+        self.lists = None
+
+    def close(self):
+        # a suspended scan holds an export of the map,
+        # which would stop it being closed
+        if self.scanner is not None:
+            self.scanner.close()
+            self.scanner = None
+        if hasattr(self.data, 'close'):
+            self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def scan(self, key=None, span=None):
+        """Scans until the element at key is found, or to the end
+        of the document. If span is given, scans until its end is found.
+        """
+        if self.scanner is None:
+            self.elements = {}
+            self.lists = dict((path, []) for path in self.plan.index.lists)
+            self.scanned = False
+            self.scanner = iter_scan(self.data, self.plan.index, self.elements, self.lists)
+        while not self.scanned and (key is None or key not in self.elements):
+            self.scanned = next(self.scanner, None) is None
+        while not self.scanned and span is not None and span.end is None:
+            self.scanned = next(self.scanner, None) is None
+
+    def read(self, entry):
+        """Decodes the value of a plan entry, or returns None."""
+        if entry.prop.is_list:
+            # we need every child to know how many there are
+            self.scan()
+            spans = self.lists.get(entry.parents + (entry.leaf,))
+            return LazyChildren(self, entry, spans) if spans else None
+
+        self.scan(entry.parents)
+        span = self.elements.get(entry.parents)
+        if span is None:
+            return None
+
+        tag = self.data[span.start:span.content]
+        if tag.endswith(b'/>'):
+            if entry.leaf == '_text':
+                return None
+        else:
+            tag = tag[:-1] + b'/>'
+        if entry.leaf != '_text':
+            # parse the start tag on its own
+            return fromstring(tag).attrib.get(entry.leaf)
+
+        # the whole element is parsed, so comments and CDATA
+        # are read as from_xml reads them
+        self.scan(span=span)
+        elem = fromstring(self.data[span.start:span.end])
+        values = {}
+        reader.read_text(elem, entry.parents, self.plan.index, values, len(elem) > 0)
+        return values.get(entry)
+
+    def load(self, prop, instance):
+        """Decodes and stores the value of prop on instance."""
+        entry = self.entries.get(prop)
+        if entry is None:
+            return None
+        value = self.read(entry)
+        if value is None:
+            return None
+        if not prop.is_list:
+            value = prop.parse(value)
+        # store it without going through __set__, which some
+        # properties override
+        prop.store(instance, value)
+        return value
+
+    def read_all(self):
+        """Reads the whole document, as from_xml would."""
+        if not isinstance(self.data, mmap.mmap):
+            # an empty file fails to parse as it would eagerly
+            return reader.read_document(io.BytesIO(self.data), self.plan.index)
+        self.data.seek(0)
+        return reader.read_document(self.data, self.plan.index)
@@ -0,0 +1,179 @@
+"""Ingests files into a content addressed pool.
+
+Each file is stored once, at pool/{hash[-2]}/{hash[-1]}/sha1-{hash},
+however many publishes include it. Files already in the pool are
+skipped, and the rest are hard linked or copied without passing the
+data through Python where the platform allows::
+
+    manifest = ingest(paths, dest, cache=HashCache('.hashes.json'))
+    for entry in manifest.written:
+        ...
+"""
+from __future__ import absolute_import
+import collections
+import errno
+import os
+import shutil
+
+from . import hashing
+
+
+PoolEntry = collections.namedtuple('PoolEntry', ['path', 'hash', 'link', 'size', 'method'])
+
+
+class Manifest(list):
+    """The PoolEntry of each ingested file, in the order given.
+
+    method is how the file reached the pool: 'existing' if it was
+    already there, otherwise 'hardlink', 'copy_file_range', 'sendfile'
+    or 'copy'.
+    """
+    @property
+    def written(self):
+        """The entries which were added to the pool."""
+        return [entry for entry in self if entry.method != 'existing']
+
+    @property
+    def existing(self):
+        """The entries which were already in the pool."""
+        return [entry for entry in self if entry.method == 'existing']
+
+
+def pool_link(hash_value):
+    """Returns the pool path of a file, relative to the pool root."""
+    return 'pool/{}/{}/sha1-{}'.format(hash_value[-2], hash_value[-1], hash_value)
+
+
+def check_copied(dst, offset, size):
+    """Returns False if nothing was copied, so the caller can fall
+    back to another method, and raises if the copy stopped short.
+    """
+    if offset == 0 and size:
+        return False
+    if offset != size:
+        raise IOError(errno.EIO, 'copied %d of %d bytes' % (offset, size), dst.name)
+    return True
+
+
+def copy_range(src, dst, size):
+    """Copies with os.copy_file_range, which can share blocks on
+    filesystems with reflinks. Returns False if it isn't supported.
+    """
+    if not hasattr(os, 'copy_file_range'):
+        return False
+    offset = 0
+    try:
+        while offset < size:
+            copied = os.copy_file_range(src.fileno(), dst.fileno(), size - offset)
+            if not copied:
+                break
+            offset += copied
+    except OSError as e:
+        if offset == 0 and e.errno in (errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP):
+            return False
+        raise
+    return check_copied(dst, offset, size)
+
+
+def send_file(src, dst, size):
+    """Copies in the kernel with os.sendfile.
+    Returns False if it isn't supported.
+    """
+    if not hasattr(os, 'sendfile'):
+        return False
+    offset = 0
+    try:
+        while offset < size:
+            sent = os.sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+            if not sent:
+                break
+            offset += sent
+    except OSError as e:
+        if offset == 0 and e.errno in (errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+            return False
+        raise
+    return check_copied(dst, offset, size)
+
+
+def copy_file(path, dest, size):
+    """Copies path to dest by the fastest means available.
+    Returns the name of the method used.
+
+    dest must not exist, so a file linked to another is never
+    written through.
+    """
+    with open(path, 'rb') as src, open(dest, 'xb') as dst:
+        if copy_range(src, dst, size):
+            return 'copy_file_range'
+        if send_file(src, dst, size):
+            return 'sendfile'
+        shutil.copyfileobj(src, dst, hashing.CHUNK_SIZE)
+    return 'copy'
+
+
+def store(path, dest, size, link=False):
+    """Adds path to the pool at dest. Returns the method used.
+
+    The file is written under a temporary name and renamed, so an
+    interrupted ingest never leaves a partial file in the pool.
+    """
+    temp = '%s.%d.tmp' % (dest, os.getpid())
+    # a run which was killed may have left a temporary file behind,
+    # possibly linked to an earlier source file
+    if os.path.lexists(temp):
+        os.remove(temp)
+    method = None
+    if link:
+        try:
+            os.link(path, temp)
+            method = 'hardlink'
+        except OSError:
+            pass
+    try:
+        if method is None:
+            method = copy_file(path, temp, size)
+        os.replace(temp, dest)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+    return method
+
+
+def ingest(paths, root, link=False, cache=None, workers=None, hashes=None):
+    """Adds files to the pool under root, returning a Manifest.
+
+    Files are hashed in parallel, using cache, a hashing.HashCache,
+    if given. hashes may map paths to hashes which are already known.
+    Files whose pool entry already exists are skipped.
+
+    With link set, files are hard linked into the pool where possible.
+    The pool then shares the source file, so changes made to the file
+    in place would also change the pool.
+    """
+    paths = list(paths)
+    known = dict(hashes or {})
+    missing = [path for path in paths if path not in known]
+    if missing:
+        known.update(hashing.hash_files(missing, 'sha1', cache, workers))
+
+    # create each directory once
+    directories = set()
+    for path in paths:
+        directories.add(os.path.dirname(os.path.join(root, pool_link(known[path]))))
+    for directory in directories:
+        # other publishes may be creating the same directories
+        os.makedirs(directory, exist_ok=True)
+
+    manifest = Manifest()
+    for path in paths:
+        hash_value = known[path]
+        rel_dest = pool_link(hash_value)
+        dest = os.path.join(root, rel_dest)
+        size = os.path.getsize(path)
+        if os.path.exists(dest) and os.path.getsize(dest) == size:
+            method = 'existing'
+        else:
+            method = store(path, dest, size, link)
+        manifest.append(PoolEntry(path, hash_value, rel_dest, size, method))
+    return manifest
@@ -0,0 +1,152 @@
+"""Reads XML documents back into the values of a property plan.
+
+The plan is compiled into an Index, mapping element and attribute
+paths back to the plan entries which write them.
+
+Documents are read in a single iterparse pass. Elements are cleared
+once they are read, so memory use is bounded by the depth of the
+document, and the size of the largest list child.
+"""
+from __future__ import absolute_import
+from xml.etree.ElementTree import iterparse
+
+
+class Index(object):
+    """Maps the element paths of a plan back to its entries.
+
+    'texts' maps an element path to the entry holding its text.
+    'attrs' maps an element path to a dict of {attribute: entry}.
+    'lists' maps the path of a repeated child element to its entry.
+    """
+    __slots__ = ('texts', 'attrs', 'lists')
+
+    def __init__(self):
+        self.texts = {}
+        self.attrs = {}
+        self.lists = {}
+
+
+def compile_index(plan):
+    index = Index()
+    for entry in plan:
+        if entry.prop.is_list:
+            index.lists[entry.parents + (entry.leaf,)] = entry
+        elif entry.leaf == '_text':
+            index.texts[entry.parents] = entry
+        else:
+            index.attrs.setdefault(entry.parents, {})[entry.leaf] = entry
+    return index
+
+
+def element_to_dict(elem):
+    """Converts an element to a dict, as dict2xml would expect it."""
+    data = dict(elem.attrib)
+    text = elem.text.strip() if elem.text and len(elem) else elem.text
+    if text:
+        data['_text'] = text
+    for child in elem:
+        value = element_to_dict(child)
+        if child.tag in data:
+            if not isinstance(data[child.tag], list):
+                data[child.tag] = [data[child.tag]]
+            data[child.tag].append(value)
+        else:
+            data[child.tag] = value
+    return data
+
+
+def read_child(entry, elem):
+    """Converts a list child element to the property's child type."""
+    child = entry.prop.child
+    if child is None:
+        return element_to_dict(elem)
+    return child.from_element(elem)
+
+
+def read_start(elem, path, index, values):
+    """Reads the attributes of an element."""
+    attrs = index.attrs.get(path)
+    if attrs:
+        for name, value in elem.attrib.items():
+            entry = attrs.get(name)
+            if entry is not None:
+                values[entry] = value
+
+
+def read_text(elem, path, index, values, had_children):
+    """Reads the text of an element once it has ended."""
+    entry = index.texts.get(path)
+    if entry is not None and elem.text:
+        # pretty printed documents put whitespace around mixed text
+        text = elem.text.strip() if had_children else elem.text
+        if text:
+            values[entry] = text
+
+
+def read_element(elem, index, path=(), values=None):
+    """Returns {entry: value} for an element which has been fully parsed.
+    path is the path of elem within the plan.
+    """
+    if values is None:
+        values = {}
+    read_start(elem, path, index, values)
+    for child in elem:
+        child_path = path + (child.tag,)
+        entry = index.lists.get(child_path)
+        if entry is not None:
+            values.setdefault(entry, []).append(read_child(entry, child))
+        else:
+            read_element(child, index, child_path, values)
+    read_text(elem, path, index, values, len(elem) > 0)
+    return values
+
+
+def read_document(source, index):
+    """Returns {entry: value} for a document, read with iterparse.
+
+    source is a filename or a file object.
+    List children are collected whole, then converted and cleared.
+    """
+    values = {}
+    path = []
+    elements = []
+    had_children = []
+    # the depth of the list child being collected, if any
+    collecting = None
+
+    for event, elem in iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            path.append(elem.tag)
+            if collecting is not None:
+                continue
+            key = tuple(path)
+            if key in index.lists:
+                collecting = len(path)
+                continue
+            if had_children:
+                had_children[-1] = True
+            read_start(elem, key, index, values)
+            elements.append(elem)
+            had_children.append(False)
+            continue
+
+        key = tuple(path)
+        path.pop()
+        if collecting is not None:
+            if len(key) == collecting:
+                entry = index.lists[key]
+                values.setdefault(entry, []).append(read_child(entry, elem))
+                collecting = None
+                if elements:
+                    had_children[-1] = True
+                    del elements[-1][:]
+            continue
+
+        read_text(elem, key, index, values, had_children.pop())
+        elements.pop()
+        elem.clear()
+        if elements:
+            # earlier siblings have been read, drop them from the parent
+            del elements[-1][:]
+
+    return values
@@ -0,0 +1,137 @@
+"""Writes rows of values as repeated child elements, without
+creating an object per row.
+
+Records is assigned to a list property in place of a list of objects::
+
+    sync.files_download = Records(FileDownload, {
+        'name': names, 'hash': hashes, 'size': sizes, 'link': links,
+    })
+
+Column names are the class's property names. The source may be:
+
+    a dict of column name to a list of values
+    a NumPy structured array, whose field names are the columns
+    an iterable of tuples, such as a DB-API cursor, with the column
+    names given by columns or the cursor's description
+
+Rows are written with the class's compiled plan, through one reused
+instance, so property defaults and descriptors behave as they would
+for separate objects. Classes which extend to_dict are written with
+an object per row.
+"""
+from __future__ import absolute_import
+
+from . import writer
+
+
+def read_source(source, columns=None):
+    """Returns the column names, an iterator of row tuples and the
+    number of rows, or None if it isn't known.
+    """
+    if isinstance(source, dict):
+        names = list(columns or source)
+        data = [source[name] for name in names]
+        length = len(data[0]) if data and hasattr(data[0], '__len__') else None
+        return names, zip(*data), length
+
+    dtype = getattr(source, 'dtype', None)
+    if dtype is not None and dtype.names:
+        # convert to python values once per column, not per value
+        names = list(columns or dtype.names)
+        return names, zip(*[source[name].tolist() for name in names]), len(source)
+
+    if columns is None:
+        description = getattr(source, 'description', None)
+        if not description:
+            raise ValueError('columns must be given for rows of tuples')
+        columns = [column[0] for column in description]
+    length = len(source) if hasattr(source, '__len__') else None
+    return list(columns), iter(source), length
+
+
+class Records(object):
+    """Rows of property values for an XML_Object class, written as
+    one element per row.
+
+    Iterating creates an object for each row, for anything which needs
+    them, such as diff. Rows from an iterator can only be read once.
+    """
+    def __init__(self, cls, source, columns=None):
+        self.cls = cls
+        self.source = source
+        self.columns = columns
+
+    @property
+    def reusable(self):
+        """False if the rows come from an iterator, and so can only
+        be read once.
+        """
+        return iter(self.source) is not self.source
+
+    def __len__(self):
+        length = read_source(self.source, self.columns)[2]
+        if length is None:
+            raise TypeError('The number of rows is not known')
+        return length
+
+    def __bool__(self):
+        # properties test their value, which mustn't need the
+        # rows of a cursor to be counted
+        length = read_source(self.source, self.columns)[2]
+        return length is None or length > 0
+
+    __nonzero__ = __bool__
+
+    def properties(self, names):
+        """Returns the descriptor of each column."""
+        from . import compile_plan
+        entries = dict((entry.name, entry.prop) for entry in compile_plan(self.cls))
+        try:
+            return [entries[name] for name in names]
+        except KeyError as e:
+            raise ValueError('{} has no property {}'.format(self.cls.__name__, e))
+
+    def __iter__(self):
+        names, rows, _ = read_source(self.source, self.columns)
+        props = self.properties(names)
+        for row in rows:
+            obj = self.cls()
+            for prop, value in zip(props, row):
+                prop.store(obj, value)
+            yield obj
+
+    def iter_xml_element(self, tag, out, fmt=writer.COMPACT, level=0):
+        """Writes each row as the element 'tag', yielding after each."""
+        from . import compile_plan, overrides
+        cls = self.cls
+        if overrides(cls, 'to_dict'):
+            # to_dict may add content of its own, which needs an object
+            for obj in self:
+                for flush in obj.iter_xml_element(tag, out, fmt, level):
+                    yield flush
+                yield None
+            return
+
+        plan = compile_plan(cls)
+        layout = plan.layout
+        constants = plan.constants if cls.xml_constants else None
+        names, rows, _ = read_source(self.source, self.columns)
+        props = self.properties(names)
+
+        # every row is read through the same instance, so there's
+        # nothing to gain from caching fragments
+        row_obj = cls()
+        render = row_obj.xml_serializer(incremental=False)
+        for row in rows:
+            for prop, value in zip(props, row):
+                prop.store(row_obj, value)
+            if render is not None:
+                for flush in render(row_obj, out, fmt, level, tag):
+                    yield flush
+                yield None
+                continue
+            values = row_obj.xml_values(plan)
+            bound = constants.bind(values) if constants is not None else None
+            for flush in writer.iter_node(tag, layout, values, out, fmt, level, None, bound):
+                yield flush
+            yield None
@@ -0,0 +1,557 @@
+"""Streaming XML writer.
+
+Emits XML text straight into a list of string chunks using the same
+attribute and _text rules as dict2xml, without building an element tree.
+
+Scalar values become attributes, '_text' becomes the element text,
+dicts become child elements and lists become repeated child elements.
+
+The iter_* functions are generators. They append text to 'out' and
+yield after each list child, giving the caller a chance to flush
+'out' to a file or socket.
+"""
+from __future__ import absolute_import
+
+try:
+    text_type = unicode
+    string_types = (str, unicode)
+except NameError:
+    text_type = str
+    string_types = (str, bytes)
+
+
+def escape_text(value):
+    """Escapes a string for use as element text."""
+    if '&' in value:
+        value = value.replace('&', '&amp;')
+    if '<' in value:
+        value = value.replace('<', '&lt;')
+    if '>' in value:
+        value = value.replace('>', '&gt;')
+    if '\r' in value:
+        # parsers would read it back as a newline
+        value = value.replace('\r', '&#13;')
+    return value
+
+
+def escape_attrib(value):
+    """Escapes a string for use as an attribute value."""
+    value = escape_text(value)
+    if '"' in value:
+        value = value.replace('"', '&quot;')
+    if '\n' in value:
+        value = value.replace('\n', '&#10;')
+    if '\t' in value:
+        value = value.replace('\t', '&#9;')
+    return value
+
+
+def is_sequence(value):
+    """Returns True if the value is written as repeated elements.
+
+    Any iterable other than a string, dict or XML_Object is a sequence,
+    so generators can be used to stream children.
+    """
+    if isinstance(value, list):
+        return True
+    if isinstance(value, string_types) or isinstance(value, dict):
+        return False
+    return hasattr(value, '__iter__') and not hasattr(value, 'xml_plan')
+
+
+def is_reusable(value):
+    """Returns True if a sequence can be read more than once.
+
+    Iterators can't, nor can iterables which set reusable to False.
+    """
+    if iter(value) is value:
+        return False
+    return getattr(value, 'reusable', True)
+
+
+def is_element(value):
+    """Returns True if the value is written as a child element
+    rather than an attribute.
+    """
+    if isinstance(value, string_types) or isinstance(value, (int, float)):
+        return False
+    if isinstance(value, (dict, list)):
+        return True
+    return hasattr(value, 'iter_xml_element') or hasattr(value, '__iter__')
+
+
+class Node(object):
+    """An element in the compiled layout of a property plan.
+
+    'leaves' holds (name, index) pairs for values stored directly
+    on this element, where index is the position in the plan.
+    'items' holds (name, index, node) in document order, node is None
+    for leaves.
+    'indices' holds the plan index of every value beneath this element.
+    'path' holds the tags from the document root to this element.
+    'reorders' is True if the order of the items depends on which
+    values are None, see may_reorder.
+    """
+    __slots__ = ('tag', 'path', 'leaves', 'items', 'indices', 'nodes', 'reorders')
+
+    def __init__(self, tag, path=()):
+        self.tag = tag
+        self.path = path
+        self.leaves = []
+        self.items = []
+        self.indices = []
+        self.nodes = {}
+        self.reorders = False
+
+
+def compile_layout(plan):
+    """Groups the flat paths of a plan into a tree of Nodes."""
+    root = Node(None)
+    for index, entry in enumerate(plan):
+        node = root
+        node.indices.append(index)
+        for tag in entry.parents:
+            child = node.nodes.get(tag)
+            if child is None:
+                child = node.nodes[tag] = Node(tag, node.path + (tag,))
+                node.items.append((tag, None, child))
+            node = child
+            node.indices.append(index)
+        node.leaves.append((entry.leaf, index))
+        node.items.append((entry.leaf, index, None))
+    mark_reorders(root)
+    return root
+
+
+def may_reorder(node):
+    """Returns True if the order the items of node are written in
+    depends on which values are None.
+
+    An element is written where its first value which isn't None is
+    in the plan, so a later sibling can come first if it holds values
+    ahead of some of this element's.
+    """
+    items = [item[2].indices if item[2] is not None else [item[1]] for item in node.items]
+    for i, indices in enumerate(items):
+        for later in items[i + 1:]:
+            if indices[-1] > later[0]:
+                return True
+    return False
+
+
+def mark_reorders(node):
+    node.reorders = may_reorder(node)
+    for child in node.nodes.values():
+        mark_reorders(child)
+
+
+def is_present(node, values):
+    """An element is present if any value beneath it is not None."""
+    for index in node.indices:
+        if values[index] is not None:
+            return True
+    return False
+
+
+def first_present(node, values):
+    """Returns the plan index of the first value beneath node which
+    is not None, or None.
+    """
+    for index in node.indices:
+        if values[index] is not None:
+            return index
+    return None
+
+
+def present_items(node, values):
+    """Returns (name, index, node) for the items of a layout node
+    which have a value, in the order to_dict adds them: elements
+    come where the first value beneath them which isn't None is
+    in the plan, rather than the first value.
+    """
+    items = []
+    if not node.reorders:
+        for item in node.items:
+            child = item[2]
+            if child is None:
+                if values[item[1]] is not None:
+                    items.append(item)
+                continue
+            for index in child.indices:
+                if values[index] is not None:
+                    items.append(item)
+                    break
+        return items
+
+    keys = []
+    ordered = True
+    last = -1
+    for item in node.items:
+        child = item[2]
+        if child is not None:
+            key = None
+            for index in child.indices:
+                if values[index] is not None:
+                    key = index
+                    break
+            if key is None:
+                continue
+        else:
+            key = item[1]
+            if values[key] is None:
+                continue
+        if key < last:
+            ordered = False
+        last = key
+        items.append(item)
+        keys.append(key)
+    if ordered:
+        return items
+    return [item for _, item in sorted(zip(keys, items), key=lambda pair: pair[0])]
+
+
+class Format(object):
+    """Controls how elements are laid out.
+
+    With pretty set, each element goes on its own line, indented by
+    'indent' for each level, as xml.dom.minidom's toprettyxml does.
+    With short_empty_elements set, empty elements are written as <tag/>,
+    otherwise as <tag></tag>.
+    """
+    def __init__(self, pretty=False, indent='  ', short_empty_elements=True):
+        self.pretty = pretty
+        self.indent = indent if pretty else ''
+        self.newline = '\n' if pretty else ''
+        if not short_empty_elements:
+            self.empty = '></%s>'
+        elif pretty:
+            self.empty = '/>'
+        else:
+            self.empty = ' />'
+        self.prefixes = ['']
+
+    def prefix(self, level):
+        """Returns the indentation for the given level."""
+        prefixes = self.prefixes
+        while len(prefixes) <= level:
+            prefixes.append(prefixes[-1] + self.indent)
+        return prefixes[level]
+
+
+COMPACT = Format()
+
+
+def start_tag(tag, attrs):
+    if attrs:
+        return '<%s %s' % (tag, ' '.join(
+            '%s="%s"' % (name, escape_attrib(text_type(value))) for name, value in attrs
+        ))
+    return '<' + tag
+
+
+def child_header(text, fmt, level):
+    """Returns the text which closes the start tag of an element
+    with child elements, followed by its text.
+    """
+    if fmt.pretty:
+        header = '>' + fmt.newline
+        if text is not None:
+            header += fmt.prefix(level + 1) + escape_text(text_type(text)) + fmt.newline
+        return header
+    if text is not None:
+        return '>' + escape_text(text_type(text))
+    return '>'
+
+
+def iter_element(tag, attrs, text, children, values, out, fmt, level,
+                 fragments=None, constants=None):
+    """Writes an element with its attributes, text and child elements.
+
+    children holds (name, value, node) tuples. When node is set
+    the child is written from the layout node and 'values',
+    otherwise it is written from value.
+    """
+    prefix = fmt.prefix(level)
+    mark = len(out)
+    out.append(prefix + start_tag(tag, attrs))
+
+    # the text goes inline unless there are child elements
+    # we don't know that until one writes something
+    # so the text is written in the header before the first child
+    header = child_header(text, fmt, level)
+
+    # once we've yielded, out may have been flushed and the indices
+    # we hold are stale, but we only yield after writing a child
+    # children without children of their own are written as soon
+    # as iter_node is called, so the header must be in place first
+    has_children = False
+    for name, value, node in children:
+        if not has_children:
+            out.append(header)
+            start = len(out)
+        if node is not None:
+            child = iter_node(name, node, values, out, fmt, level + 1, fragments, constants)
+        else:
+            child = iter_value(name, value, out, fmt, level + 1)
+
+        if has_children:
+            for flush in child:
+                yield flush
+            continue
+
+        for flush in child:
+            has_children = True
+            yield flush
+        if has_children or len(out) > start:
+            has_children = True
+        else:
+            out.pop()
+
+    if has_children:
+        out.append(prefix + '</%s>' % tag + fmt.newline)
+    elif text is not None:
+        out.append('>%s</%s>' % (escape_text(text_type(text)), tag) + fmt.newline)
+    elif '%s' in fmt.empty:
+        out[mark] += fmt.empty % tag + fmt.newline
+    else:
+        out[mark] += fmt.empty + fmt.newline
+
+
+def write_leaf(tag, node, values, out, fmt, level):
+    """Writes an element whose values are all attributes or text,
+    and returns True. Returns False, writing nothing, if one of the
+    values is written as an element.
+    """
+    attrs = ''
+    text = None
+    for name, index in node.leaves:
+        value = values[index]
+        if value is None:
+            continue
+        if name == '_text':
+            # as in ElementTree, empty text is no text
+            text = text_type(value) or None
+        elif is_element(value):
+            return False
+        else:
+            attrs += ' %s="%s"' % (name, escape_attrib(text_type(value)))
+    start = fmt.prefix(level) + '<' + tag + attrs
+    if text is not None:
+        out.append(start + '>' + escape_text(text) + '</' + tag + '>' + fmt.newline)
+    elif '%s' in fmt.empty:
+        out.append(start + fmt.empty % tag + fmt.newline)
+    else:
+        out.append(start + fmt.empty + fmt.newline)
+    return True
+
+
+def node_content(node, values):
+    """Returns the attributes, text and child elements of a layout node."""
+    attrs = []
+    text = None
+    for name, index in node.leaves:
+        value = values[index]
+        if value is None:
+            continue
+        if name == '_text':
+            # as in ElementTree, empty text is no text
+            text = text_type(value) or None
+        elif not is_element(value):
+            attrs.append((name, value))
+    children = []
+    for name, index, child in present_items(node, values):
+        if child is not None:
+            children.append((name, None, child))
+        else:
+            value = values[index]
+            if name != '_text' and is_element(value):
+                children.append((name, value, None))
+
+    return attrs, text, children
+
+
+def iter_node(tag, node, values, out, fmt=COMPACT, level=0, fragments=None, constants=None):
+    """Writes the element 'tag' using a compiled layout node and
+    the plan values.
+
+    fragments, if given, caches the text of elements between renders.
+    constants, if given, is a (Constants, unchanged) pair from
+    Constants.bind, and supplies the text of elements whose values
+    are all defaults.
+    """
+    # elements which can't yield are written at once, rather than
+    # by a generator, as most elements have no children
+    if constants is not None and constants[0].applies(node, constants[1]):
+        out.append(constants[0].fragment(tag, node, values, fmt, level))
+        return ()
+    if fragments is not None:
+        return iter_cached_node(tag, node, values, out, fmt, level, fragments, constants)
+    if not node.nodes and write_leaf(tag, node, values, out, fmt, level):
+        return ()
+    attrs, text, children = node_content(node, values)
+    return iter_element(tag, attrs, text, children, values, out, fmt, level, None, constants)
+
+
+def cached_fragment(fragments, path, key):
+    """Returns the cached text of the element at path, or None."""
+    variants = fragments.get(path)
+    if variants:
+        return variants.get(key)
+    return None
+
+
+def iter_cached_node(tag, node, values, out, fmt, level, fragments, constants=None):
+    """Writes the element 'tag', reusing its text from fragments
+    if it was written before.
+
+    fragments maps a node path to a dict of text, keyed by
+    (fmt, level, tag), or to False if the element holds lists,
+    dicts or objects, which can change without us knowing.
+    Entries must be removed when a value beneath them changes.
+    """
+    key = (fmt, level, tag)
+    fragment = cached_fragment(fragments, node.path, key)
+    if fragment is not None:
+        out.append(fragment)
+        return
+    variants = fragments.get(node.path)
+
+    attrs, text, children = node_content(node, values)
+    mark = len(out)
+    flushed = False
+    for flush in iter_element(tag, attrs, text, children, values, out, fmt, level,
+                              fragments, constants):
+        flushed = True
+        yield flush
+
+    if variants is False:
+        return
+    if flushed or any(is_element(values[index]) for index in node.indices if values[index] is not None):
+        fragments[node.path] = False
+    else:
+        fragments.setdefault(node.path, {})[key] = ''.join(out[mark:])
+
+
+def same(value, default):
+    """Returns True if value is written exactly as default is."""
+    return value is default or (type(value) is type(default) and value == default)
+
+
+class Constants(object):
+    """The written text of elements whose values are all defaults.
+
+    A class's instances mostly leave their properties at the class
+    defaults, so elements holding only defaults are written once and
+    the text shared by every instance.
+    defaults holds the default value of each plan entry, or MISSING
+    for entries which can't be shared, such as lists.
+    """
+    def __init__(self, defaults, missing):
+        self.defaults = defaults
+        self.missing = missing
+        self.fragments = {}
+
+    def bind(self, values):
+        """Returns the pair iter_node takes for a render of values,
+        or None if no value is at its default.
+        """
+        missing = self.missing
+        # same(), inlined as this runs for every document
+        unchanged = [
+            default is not missing and (value is default or (
+                type(value) is type(default) and value == default
+            ))
+            for value, default in zip(values, self.defaults)
+        ]
+        if not any(unchanged):
+            return None
+        return self, unchanged
+
+    def applies(self, node, unchanged):
+        """Returns True if every value beneath node is a default."""
+        for index in node.indices:
+            if not unchanged[index]:
+                return False
+        return True
+
+    def fragment(self, tag, node, values, fmt, level):
+        """Returns the text of the element, writing it the first time."""
+        key = (fmt, level, tag)
+        fragment = cached_fragment(self.fragments, node.path, key)
+        if fragment is None:
+            out = []
+            # defaults are never lists, so nothing is yielded
+            for _ in iter_node(tag, node, values, out, fmt, level):
+                pass
+            fragment = ''.join(out)
+            self.fragments.setdefault(node.path, {})[key] = fragment
+        return fragment
+
+
+def iter_dict(tag, data, out, fmt=COMPACT, level=0):
+    """Writes the element 'tag' from a dict, as dict2xml would."""
+    attrs = []
+    children = []
+    text = None
+    for name, value in data.items():
+        if value is None:
+            continue
+        if name == '_text':
+            text = text_type(value) or None
+        elif is_element(value):
+            children.append((name, value, None))
+        else:
+            attrs.append((name, value))
+
+    return iter_element(tag, attrs, text, children, None, out, fmt, level)
+
+
+def iter_value(tag, value, out, fmt=COMPACT, level=0):
+    """Writes a value as one or more 'tag' elements."""
+    if isinstance(value, dict):
+        for flush in iter_dict(tag, value, out, fmt, level):
+            yield flush
+    elif hasattr(value, 'iter_xml_element'):
+        for flush in value.iter_xml_element(tag, out, fmt, level):
+            yield flush
+    elif is_sequence(value):
+        # items are pulled one at a time, so generators are
+        # written without being held in memory
+        for item in value:
+            if hasattr(item, 'iter_xml_element'):
+                child = item.iter_xml_element(tag, out, fmt, level)
+            else:
+                child = iter_value(tag, item, out, fmt, level)
+            for flush in child:
+                yield flush
+            yield None
+    else:
+        text = text_type(value)
+        if text:
+            out.append('%s<%s>%s</%s>%s' % (
+                fmt.prefix(level), tag, escape_text(text), tag, fmt.newline
+            ))
+        else:
+            empty = fmt.empty % tag if '%s' in fmt.empty else fmt.empty
+            out.append(fmt.prefix(level) + '<' + tag + empty + fmt.newline)
+
+
+def iter_document(node, values, out, fmt=COMPACT, fragments=None, constants=None):
+    """Writes the root elements of a document from a compiled layout."""
+    for name, index, child in present_items(node, values):
+        if child is not None:
+            for flush in iter_node(name, child, values, out, fmt, 0, fragments, constants):
+                yield flush
+        else:
+            value = values[index]
+            if is_element(value):
+                for flush in iter_value(name, value, out, fmt):
+                    yield flush
+
+
+def iter_dict_document(data, out, fmt=COMPACT):
+    """Writes the root elements of a document from a dict."""
+    for name, value in data.items():
+        if value is not None:
+            for flush in iter_value(name, value, out, fmt):
+                yield flush
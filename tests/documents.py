@@ -0,0 +1,67 @@
+"""Documents shared by the tests, covering attributes, text, nested
+elements, lists of objects, dicts and scalars, and text which needs
+escaping.
+"""
+from obj2xml import XML_Object, XML_Property, XML_TextProperty, XML_ListProperty
+
+
+# every character the writer escapes, in text and in attributes
+SPECIAL = 'a & b < c > d " e \' f\tg\rh\ni'
+
+
+class Item(XML_Object):
+    name = XML_Property(['name'])
+    size = XML_Property(['size'], default=0)
+    text = XML_TextProperty([])
+
+
+class Document(XML_Object):
+    name = XML_Property(['root', 'name'], default='document')
+    version = XML_Property(['root', 'info', 'version'], default=1)
+    enabled = XML_Property(['root', 'info', 'enabled'])
+    title = XML_TextProperty(['root', 'title'])
+    summary = XML_TextProperty(['root', 'info'])
+    empty = XML_Property(['root', 'empty', 'value'])
+    items = XML_ListProperty(['root', 'items', 'item'], child=Item)
+    tags = XML_ListProperty(['root', 'tags', 'tag'])
+    extra = XML_ListProperty(['root', 'extra'])
+
+
+class Blank(Document):
+    # empty text, and an empty default, are written as no text
+    title = XML_TextProperty(['root'], default='')
+    summary = XML_TextProperty(['root', 'info'], default='')
+
+
+def create_basic():
+    return Document(title='Title')
+
+
+def create_defaults():
+    return Document()
+
+
+def create_special():
+    doc = Document(name=SPECIAL, title=SPECIAL, summary=SPECIAL)
+    doc.items = Item(name=SPECIAL, text=SPECIAL)
+    doc.tags = SPECIAL
+    return doc
+
+
+def create_lists():
+    doc = Document(title='Lists', version=2, enabled=True, empty='')
+    doc.items = [Item(name='item %d' % i, size=i, text='text %d' % i) for i in range(3)]
+    doc.items = Item()
+    doc.tags = ['a', 'b', 3]
+    doc.extra = [{'key': 'a', '_text': 'first'}, {'key': 'b', 'nested': {'value': 1}}, {}]
+    return doc
+
+
+def create_blank():
+    doc = Blank(tags=['', 'a'])
+    doc.extra = [{'_text': ''}, {'key': 'c', '_text': '', 'nested': {'_text': ''}}]
+    return doc
+
+
+def create_all():
+    return [create_basic(), create_defaults(), create_special(), create_lists(), create_blank()]
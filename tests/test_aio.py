@@ -0,0 +1,78 @@
+import asyncio
+import unittest
+
+from obj2xml import XML_Object, XML_Property, XML_ListProperty, RenderCache
+
+
+class Child(XML_Object):
+    name = XML_Property(['name'])
+
+
+class Document(XML_Object):
+    name = XML_Property(['root', 'name'], default='doc')
+    children = XML_ListProperty(['root', 'children', 'child'])
+
+
+class CachedDocument(Document):
+    pass
+
+
+def collect(iterator):
+    async def run():
+        return [chunk async for chunk in iterator]
+    return asyncio.run(run())
+
+
+class Stream(object):
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, chunk):
+        self.chunks.append(chunk)
+
+    async def drain(self):
+        pass
+
+
+def create(cls, count=500):
+    doc = cls()
+    doc.children = [Child(name='child %d' % i) for i in range(count)]
+    return doc
+
+
+class AioTest(unittest.TestCase):
+    def test_chunks(self):
+        doc = create(Document)
+        chunks = collect(doc.aiter_xml(chunk_size=1000))
+        self.assertEqual(b''.join(chunks), doc.to_bytes())
+        self.assertTrue(all(len(chunk) == 1000 for chunk in chunks[:-1]))
+        self.assertTrue(0 < len(chunks[-1]) <= 1000)
+
+    def test_text(self):
+        doc = create(Document, 10)
+        chunks = collect(doc.aiter_xml(encoding=None, pretty=True))
+        self.assertEqual(''.join(chunks), doc.to_string(pretty=True))
+
+    def test_awrite(self):
+        doc = create(Document)
+        stream = Stream()
+        asyncio.run(doc.awrite(stream, chunk_size=4096))
+        self.assertEqual(b''.join(stream.chunks), doc.to_bytes())
+
+    def test_cache(self):
+        CachedDocument.xml_cache = RenderCache()
+        doc = create(CachedDocument)
+        expected = doc.to_bytes()
+        chunks = collect(doc.aiter_xml(chunk_size=1000))
+        self.assertEqual(b''.join(chunks), expected)
+        self.assertEqual(CachedDocument.xml_cache.stats()['hits'], 1)
+        self.assertTrue(all(len(chunk) == 1000 for chunk in chunks[:-1]))
+
+    def test_backend(self):
+        doc = create(Document, 20)
+        chunks = collect(doc.aiter_xml(chunk_size=100, backend='etree'))
+        self.assertEqual(b''.join(chunks), doc.to_bytes())
+
+
+if __name__ == '__main__':
+    unittest.main()
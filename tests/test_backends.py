@@ -0,0 +1,59 @@
+import itertools
+import unittest
+
+from obj2xml import backends
+
+from tests import documents
+
+
+class Extended(documents.Document):
+    def to_dict(self):
+        data = super(Extended, self).to_dict()
+        data['root']['added'] = {'value': 1}
+        return data
+
+
+class BackendsTest(unittest.TestCase):
+    def create(self):
+        return documents.create_all() + [Extended(title='extended')]
+
+    def test_identical(self):
+        names = backends.available()
+        self.assertIn('native', names)
+        self.assertIn('etree', names)
+        for doc in self.create():
+            for pretty, indent, short in itertools.product((False, True), ('  ', '\t'), (True, False)):
+                texts = [
+                    doc.to_string(pretty, indent, short, backend=name) for name in names
+                ]
+                for name, text in zip(names[1:], texts[1:]):
+                    self.assertEqual(text, texts[0], (name, pretty, indent, short))
+
+    def test_class_backend(self):
+        class Etree(documents.Document):
+            xml_backend = 'etree'
+
+        doc = Etree(title='t')
+        self.assertEqual(doc.to_bytes(), doc.to_bytes(backend='native'))
+
+    def test_to_xml(self):
+        doc = documents.create_lists()
+        elem = doc.to_xml(backend='etree')
+        self.assertEqual(elem.tag, 'root')
+        self.assertEqual(len(elem.find('items')), 4)
+
+    def test_unknown(self):
+        self.assertRaises(ValueError, backends.get, 'unknown')
+        self.assertRaises(ValueError, backends.set_default, 'unknown')
+
+    def test_default(self):
+        try:
+            backends.set_default('etree')
+            self.assertEqual(backends.get().name, 'etree')
+        finally:
+            backends.set_default(None)
+        self.assertEqual(backends.get().name, backends.available()[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+
+from obj2xml import Records, render_many, render_sharded
+from obj2xml.batch import iter_sharded
+
+from tests import documents
+
+
+def create_documents(count=10):
+    return [documents.Document(title='Title %d' % i, tags=[str(i)]) for i in range(count)]
+
+
+class RenderManyTest(unittest.TestCase):
+    def check(self, objects, chunksize=None, **options):
+        expected = [obj.to_bytes(**options) for obj in objects]
+        for executor in ('serial', 'thread', 'process'):
+            self.assertEqual(render_many(
+                objects, workers=2, executor=executor, chunksize=chunksize, **options
+            ), expected)
+            pairs = render_many(objects, workers=2, executor=executor, chunksize=chunksize,
+                                ordered=False, **options)
+            self.assertEqual([document for _, document in sorted(pairs)], expected)
+
+    def test_ordered(self):
+        self.check(create_documents(), chunksize=3)
+
+    def test_default_chunks(self):
+        self.check(create_documents(17))
+
+    def test_mixed_classes(self):
+        self.check(documents.create_all() * 2, chunksize=2)
+
+    def test_options(self):
+        self.check(create_documents(), pretty=True, indent='\t', short_empty_elements=False)
+
+    def test_encoding(self):
+        objects = create_documents(4)
+        self.check(objects, encoding=None)
+        text = render_many(objects, workers=2, executor='thread', encoding=None)[0]
+        self.assertIsInstance(text, str)
+        self.assertTrue(text.startswith('<?xml version="1.0" ?>'))
+
+    def test_unordered_indices(self):
+        pairs = list(render_many(create_documents(), workers=2, executor='thread',
+                                 chunksize=3, ordered=False))
+        self.assertEqual(sorted(index for index, _ in pairs), list(range(10)))
+
+    def test_small(self):
+        self.assertEqual(render_many([]), [])
+        doc = create_documents(1)[0]
+        self.assertEqual(render_many([doc]), [doc.to_bytes()])
+        self.assertEqual(list(render_many(iter([doc]), ordered=False)), [(0, doc.to_bytes())])
+
+    def test_executor(self):
+        self.assertRaises(ValueError, render_many, create_documents(), executor='fibers')
+
+
+def create_large(count=25):
+    doc = documents.Document(title='Large')
+    doc.items = [documents.Item(name='item %d' % i, size=i, text='text %d' % i) for i in range(count)]
+    doc.tags = [str(i) for i in range(count)]
+    doc.extra = [{'key': str(i)} for i in range(3)]
+    return doc
+
+
+class Extended(documents.Document):
+    def to_dict(self):
+        data = super(Extended, self).to_dict()
+        data['root']['added'] = {'_text': 'added'}
+        return data
+
+
+class RenderShardedTest(unittest.TestCase):
+    def check(self, doc, chunksize=4, **options):
+        expected = doc.to_bytes(**options)
+        for executor in ('serial', 'thread', 'process'):
+            self.assertEqual(
+                render_sharded(doc, workers=2, chunksize=chunksize, executor=executor, **options),
+                expected
+            )
+
+    def test_lists(self):
+        self.check(create_large())
+
+    def test_chunk_sizes(self):
+        doc = create_large()
+        for chunksize in (1, 5, 24, 25, 100):
+            self.check(doc, chunksize)
+
+    def test_options(self):
+        self.check(create_large(), pretty=True, indent='\t', short_empty_elements=False)
+        self.check(create_large(), xml_declaration=False)
+        self.check(documents.create_special(), chunksize=1, pretty=True)
+
+    def test_encoding(self):
+        self.check(create_large(), encoding='latin-1')
+        doc = create_large()
+        self.check(doc, encoding=None)
+        self.assertIsInstance(render_sharded(doc, workers=2, chunksize=4, executor='thread',
+                                             encoding=None), str)
+
+    def test_generator(self):
+        # children whose number isn't known are always split
+        doc = create_large()
+        expected = doc.to_bytes()
+        for executor in ('thread', 'process'):
+            doc.tags = (str(i) for i in range(25))
+            self.assertEqual(render_sharded(doc, workers=2, chunksize=100, executor=executor),
+                             expected)
+
+    def test_records(self):
+        doc = create_large()
+        doc.items = Records(documents.Item, {'name': ['a', 'b'], 'size': [1, 2]})
+        self.check(doc, chunksize=1)
+
+    def test_to_dict_override(self):
+        doc = Extended(title='Extended', tags=[str(i) for i in range(10)])
+        self.assertIn(b'<added>added</added>', render_sharded(doc, chunksize=2, executor='thread'))
+        self.check(doc)
+
+    def test_buffer(self):
+        doc = create_large()
+        chunks = list(iter_sharded(doc, workers=2, chunksize=4, executor='thread', buffer_size=1))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks), doc.to_bytes())
+
+    def test_executor(self):
+        self.assertRaises(ValueError, render_sharded, create_large(), executor='fibers')
+
+
+if __name__ == '__main__':
+    unittest.main()
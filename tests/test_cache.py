@@ -0,0 +1,172 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from obj2xml import XML_Object, XML_Property, XML_ListProperty, RenderCache
+from obj2xml.cache import Uncacheable
+
+
+class Document(XML_Object):
+    name = XML_Property(['root', 'name'])
+    value = XML_Property(['root', 'value'], default='two')
+    files = XML_ListProperty(['root', 'files', 'file'])
+
+
+class Named(object):
+    def __str__(self):
+        return 'named'
+
+
+def create_document():
+    return Document(name='a', files=[{'name': 'b'}, {'name': 'c'}])
+
+
+class DigestTest(unittest.TestCase):
+    def test_values(self):
+        doc = create_document()
+        digest = doc.digest()
+        self.assertEqual(create_document().digest(), digest)
+        doc.name = 'b'
+        self.assertNotEqual(doc.digest(), digest)
+        doc.name = 'a'
+        self.assertEqual(doc.digest(), digest)
+        doc.files.append({'name': 'd'})
+        self.assertNotEqual(doc.digest(), digest)
+
+    def test_types(self):
+        digests = set(Document(name=value).digest() for value in ('1', 1, 1.0, True))
+        self.assertEqual(len(digests), 4)
+
+    def test_default_changed(self):
+        doc = create_document()
+        digest = doc.digest()
+        prop = Document.__dict__['value']
+        prop.default = 'three'
+        try:
+            self.assertNotEqual(doc.digest(), digest)
+        finally:
+            prop.default = 'two'
+        self.assertEqual(doc.digest(), digest)
+
+    def test_instance_descriptor(self):
+        doc = Document(name='a')
+        digest = doc.digest()
+        doc.extra = XML_Property(['root', 'extra'], default='E')
+        self.assertNotEqual(doc.digest(), digest)
+        del doc.extra
+        self.assertEqual(doc.digest(), digest)
+
+    def test_processes(self):
+        code = (
+            'from tests.test_cache import create_document, Named\n'
+            'doc = create_document()\n'
+            'doc.name = Named()\n'
+            'print(doc.digest())\n'
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+        digests = set(
+            subprocess.check_output([sys.executable, '-c', code], cwd=root, env=env).strip()
+            for _ in range(2)
+        )
+        doc = create_document()
+        doc.name = Named()
+        self.assertEqual(digests, set([doc.digest().encode('ascii')]))
+
+    def test_default_repr(self):
+        doc = Document(name=object())
+        self.assertRaises(Uncacheable, doc.digest)
+
+    def test_generator(self):
+        doc = Document(files=({'name': str(i)} for i in range(2)))
+        self.assertRaises(Uncacheable, doc.digest)
+
+
+class RenderCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = Document.xml_cache = RenderCache(max_entries=2)
+
+    def tearDown(self):
+        del Document.xml_cache
+
+    def test_hit(self):
+        doc = create_document()
+        text = doc.to_string()
+        self.assertEqual(create_document().to_string(), text)
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+        self.assertEqual(stats['size'], len(text))
+
+    def test_miss(self):
+        doc = create_document()
+        doc.to_string()
+        doc.name = 'b'
+        self.assertIn('name="b"', doc.to_string())
+        self.assertIn('name="b"', doc.to_string(pretty=False))
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (0, 3, 2))
+
+    def test_default_changed(self):
+        doc = create_document()
+        self.assertIn('value="two"', doc.to_string())
+        prop = Document.__dict__['value']
+        prop.default = 'three'
+        try:
+            self.assertIn('value="three"', doc.to_string())
+        finally:
+            prop.default = 'two'
+
+    def test_instance_descriptor(self):
+        doc = create_document()
+        doc.to_string()
+        doc.extra = XML_Property(['root', 'extra'], default='E')
+        self.assertIn('extra="E"', doc.to_string())
+        del doc.extra
+        self.assertNotIn('extra="E"', doc.to_string())
+
+    def test_max_entries(self):
+        for name in 'abc':
+            Document(name=name).to_string()
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        # a was evicted, b is used again so c is evicted next
+        Document(name='b').to_string()
+        Document(name='a').to_string()
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (1, 4, 2))
+        Document(name='b').to_string()
+        self.assertEqual(self.cache.stats()['hits'], 2)
+
+    def test_max_size(self):
+        cache = RenderCache(max_entries=None, max_size=100)
+        cache.put('a', 'x' * 60)
+        cache.put('b', 'y' * 30)
+        self.assertEqual(len(cache), 2)
+        cache.put('c', 'z' * 30)
+        self.assertEqual((cache.get('a'), len(cache), cache.size), (None, 2, 60))
+        cache.put('d', 'w' * 101)
+        self.assertIsNone(cache.get('d'))
+        self.assertEqual(cache.get('b'), 'y' * 30)
+
+    def test_clear(self):
+        create_document().to_string()
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_generator(self):
+        doc = Document(files=({'name': str(i)} for i in range(2)))
+        text = doc.to_string(pretty=False)
+        self.assertIn('<file name="1" />', text)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_default_repr(self):
+        doc = Document(name=object())
+        self.assertIn('name="&lt;object object', doc.to_string())
+        self.assertEqual(len(self.cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
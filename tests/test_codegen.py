@@ -0,0 +1,115 @@
+import itertools
+import unittest
+
+from obj2xml import XML_Object, XML_Property, XML_TextProperty, XML_ListProperty, Records, compile_plan
+
+from tests import documents
+
+
+class Timezone(XML_Object):
+    xml_codegen = True
+    tz = XML_Property(['sync', 'tz'], default='AEST')
+
+
+class Custom(XML_Property):
+    def __get__(self, instance, owner):
+        value = super(Custom, self).__get__(instance, owner)
+        return value.upper() if value else value
+
+
+class Row(XML_Object):
+    xml_codegen = True
+    name = XML_Property(['name'])
+    size = XML_TextProperty(['size'], default=0)
+    label = Custom(['label'], default='x')
+
+
+class Compact(XML_Object):
+    xml_codegen = True
+    xml_compact = True
+    value = XML_Property(['root', 'a', 'value'], default=3)
+    text = XML_TextProperty(['root', 'a'])
+    children = XML_ListProperty(['root', 'children', 'child'])
+
+
+def render_all(doc):
+    return [
+        doc.to_string(pretty=pretty, indent=indent, short_empty_elements=short)
+        for pretty, indent, short in itertools.product((False, True), ('  ', '\t'), (True, False))
+    ]
+
+
+class CodegenTest(unittest.TestCase):
+    def assert_generic(self, doc):
+        """Checks the generated writer writes what the generic one does."""
+        cls = doc.__class__
+        previous = cls.xml_codegen
+        try:
+            cls.xml_codegen = False
+            expected = render_all(doc)
+            cls.xml_codegen = True
+            self.assertIsNotNone(doc.xml_serializer())
+            self.assertEqual(render_all(doc), expected)
+        finally:
+            cls.xml_codegen = previous
+
+    def test_documents(self):
+        for doc in documents.create_all():
+            self.assert_generic(doc)
+
+    def test_custom_descriptor(self):
+        self.assert_generic(Row(name='a&b', size=3, label='y'))
+
+    def test_compact(self):
+        doc = Compact(text='t\r\n')
+        doc.children = [{'name': 'a'}, {'_text': 'b'}]
+        self.assert_generic(doc)
+        self.assert_generic(Compact())
+
+    def test_empty_list(self):
+        doc = Compact()
+        doc.children = []
+        self.assert_generic(doc)
+        doc.children = (child for child in [])
+        generated = doc.to_string()
+        Compact.xml_codegen = False
+        try:
+            doc.children = (child for child in [])
+            self.assertEqual(doc.to_string(), generated)
+        finally:
+            Compact.xml_codegen = True
+
+    def test_records(self):
+        doc = Compact()
+        doc.children = Records(Row, {'name': ['a', 'b'], 'size': [1, 0]})
+        self.assert_generic(doc)
+
+    def test_default_changed(self):
+        doc = Timezone()
+        self.assertIn('tz="AEST"', doc.to_string())
+        Timezone.__dict__['tz'].default = 'UTC'
+        try:
+            self.assertEqual(doc.tz, 'UTC')
+            self.assertIn('tz="UTC"', doc.to_string())
+        finally:
+            Timezone.__dict__['tz'].default = 'AEST'
+
+    def test_descriptor_replaced(self):
+        class Replaced(XML_Object):
+            xml_codegen = True
+            a = XML_Property(['root', 'a'], default='1')
+
+        render = compile_plan(Replaced).serializer
+        Replaced.b = XML_Property(['root', 'b'], default='2')
+        self.assertIsNot(compile_plan(Replaced).serializer, render)
+        self.assertIn('b="2"', Replaced().to_string())
+
+    def test_instance_descriptor(self):
+        doc = Timezone()
+        doc.extra = XML_Property(['sync', 'extra'], default='e')
+        self.assertIsNone(doc.xml_serializer())
+        self.assertIn('extra="e"', doc.to_string())
+
+
+if __name__ == '__main__':
+    unittest.main()
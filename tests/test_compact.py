@@ -0,0 +1,107 @@
+import copy
+import pickle
+import unittest
+
+from obj2xml import XML_Object, XML_Property, XML_TextProperty, XML_ListProperty, MISSING
+
+
+class TrueFalseProperty(XML_Property):
+    def __get__(self, instance, owner):
+        value = super(TrueFalseProperty, self).__get__(instance, owner)
+        if value is None:
+            return None
+        return 'true' if value else 'false'
+
+
+class Compact(XML_Object):
+    xml_compact = True
+    name = XML_Property(['root', 'name'])
+    size = XML_Property(['root', 'size'], default=0)
+    enabled = TrueFalseProperty(['root', 'enabled'])
+    title = XML_TextProperty(['root', 'title'])
+    files = XML_ListProperty(['root', 'files', 'file'])
+
+
+class Extended(Compact):
+    extra = XML_Property(['root', 'extra'])
+
+
+class Plain(Compact):
+    xml_compact = False
+    extra = XML_Property(['root', 'extra'])
+
+
+def create_compact(cls=Compact):
+    doc = cls(name='a', size=5, enabled=True, title='t')
+    doc.files = [{'name': 'b'}]
+    return doc
+
+
+class CompactTest(unittest.TestCase):
+    def test_storage(self):
+        doc = create_compact()
+        self.assertEqual(doc.__dict__, {})
+        self.assertEqual(len(doc._xml_values), 5)
+        self.assertEqual((doc.name, doc.size, doc.enabled, doc.title), ('a', 5, 'true', 't'))
+        self.assertEqual(Compact().size, 0)
+        self.assertIsNone(Compact().name)
+
+    def test_delete(self):
+        doc = create_compact()
+        del doc.name
+        self.assertIsNone(doc.name)
+        self.assertIn(MISSING, doc._xml_values)
+        self.assertNotIn('name="a"', doc.to_string())
+        self.assertRaises(AttributeError, delattr, doc, 'name')
+        doc.name = 'c'
+        self.assertIn('name="c"', doc.to_string())
+
+    def test_copy(self):
+        doc = create_compact()
+        copied = copy.copy(doc)
+        copied.size = 9
+        self.assertEqual((doc.size, copied.size), (5, 9))
+        # a shallow copy shares the list children
+        self.assertIs(copied.files, doc.files)
+
+    def test_deepcopy(self):
+        doc = create_compact()
+        copied = copy.deepcopy(doc)
+        copied.size = 9
+        copied.files.append({'name': 'c'})
+        self.assertEqual((doc.size, len(doc.files)), (5, 1))
+        text = copied.to_string()
+        self.assertIn('size="9"', text)
+        self.assertIn('<file name="c"/>', text)
+
+    def test_pickle(self):
+        doc = create_compact()
+        for protocol in range(2, pickle.HIGHEST_PROTOCOL + 1):
+            read = pickle.loads(pickle.dumps(doc, protocol))
+            self.assertEqual(read.to_string(), doc.to_string())
+            read.size = 9
+            self.assertEqual(doc.size, 5)
+
+    def test_subclass(self):
+        doc = create_compact(Extended)
+        doc.extra = 'e'
+        self.assertEqual(doc.__dict__, {})
+        self.assertEqual(len(doc._xml_values), 6)
+        self.assertIn('extra="e"', doc.to_string())
+
+    def test_subclass_opt_out(self):
+        self.assertIsNone(Plain._xml_slots)
+        doc = create_compact(Plain)
+        doc.extra = 'e'
+        self.assertIsNone(getattr(doc, '_xml_values', None))
+        self.assertEqual(doc.__dict__["['root', 'name']"], 'a')
+        self.assertEqual((doc.name, doc.extra, doc.enabled), ('a', 'e', 'true'))
+        copied = copy.copy(doc)
+        copied.size = 9
+        self.assertEqual(doc.size, 5)
+        self.assertEqual(create_compact(Compact).to_string(),
+                         create_compact(Plain).to_string())
+
+
+if __name__ == '__main__':
+    unittest.main()
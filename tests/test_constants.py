@@ -0,0 +1,79 @@
+import unittest
+
+from obj2xml import XML_Object, XML_Property, XML_TextProperty, XML_ListProperty, compile_plan
+
+
+def create_class():
+    class Document(XML_Object):
+        client = XML_Property(['sync', 'meta', 'client', 'version'], default='1')
+        server = XML_Property(['sync', 'meta', 'server', 'version'], default='2')
+        title = XML_TextProperty(['sync', 'title'], default='title')
+        files = XML_ListProperty(['sync', 'files', 'file'])
+    return Document
+
+
+class ConstantsTest(unittest.TestCase):
+    def setUp(self):
+        self.Document = create_class()
+
+    def generic(self, doc, **options):
+        """Renders without shared constants."""
+        self.Document.xml_constants = False
+        try:
+            return doc.to_string(**options)
+        finally:
+            self.Document.xml_constants = True
+
+    def check(self, doc):
+        for pretty in (False, True):
+            self.assertEqual(doc.to_string(pretty=pretty), self.generic(doc, pretty=pretty))
+        return doc.to_string(pretty=False)
+
+    def test_shared(self):
+        first = self.check(self.Document())
+        self.assertEqual(self.check(self.Document()), first)
+        self.assertTrue(compile_plan(self.Document).constants.fragments)
+
+    def test_set(self):
+        self.check(self.Document())
+        doc = self.Document(client='3')
+        text = self.check(doc)
+        self.assertIn('<client version="3" />', text)
+        self.assertIn('<server version="2" />', text)
+        self.assertIn('<client version="1" />', self.check(self.Document()))
+
+        doc.client = '1'
+        self.assertIn('<client version="1" />', self.check(doc))
+        del doc.client
+        self.assertIn('<client version="1" />', self.check(doc))
+
+    def test_same_value_other_type(self):
+        self.check(self.Document())
+        self.assertIn('<client version="1.0" />', self.check(self.Document(client=1.0)))
+
+    def test_replace_descriptor(self):
+        self.check(self.Document())
+        self.Document.client = XML_Property(['sync', 'meta', 'client', 'version'], default='9')
+        self.assertIn('<client version="9" />', self.check(self.Document()))
+        del self.Document.title
+        self.assertNotIn('<title>', self.check(self.Document()))
+
+    def test_levels(self):
+        class Parent(XML_Object):
+            child = XML_ListProperty(['root', 'child'])
+
+        parent = Parent()
+        parent.child = self.Document()
+        self.check(self.Document())
+        text = parent.to_string(pretty=True)
+        self.assertIn('\n        <client version="1"/>', text)
+        self.assertEqual(text, self.generic(parent, pretty=True))
+
+    def test_lists(self):
+        doc = self.Document()
+        doc.files = [{'name': 'a'}]
+        self.assertIn('<file name="a" />', self.check(doc))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+
+from obj2xml import XML_Object, XML_Property
+
+
+class Upper(object):
+    """A descriptor which isn't an XML_Property."""
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        return instance.__dict__.get(self.name, '').upper()
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.name] = value
+
+
+class Constant(object):
+    """A descriptor without __set__."""
+    def __get__(self, instance, owner):
+        return 'constant'
+
+
+class Document(XML_Object):
+    name = XML_Property(['root', 'name'])
+
+    def method(self):
+        return 'method'
+
+
+class DescriptorTest(unittest.TestCase):
+    def test_property(self):
+        doc = Document(name='a')
+        doc.extra = XML_Property(['root', 'extra'], default='E')
+        self.assertEqual(doc.extra, 'E')
+        doc.extra = 'e'
+        self.assertEqual(doc.extra, 'e')
+        self.assertIn('extra="e"', doc.to_string())
+        del doc.extra
+        self.assertRaises(AttributeError, getattr, doc, 'extra')
+        self.assertNotIn('extra=', doc.to_string())
+
+    def test_generic(self):
+        doc = Document(name='a')
+        doc.label = Upper('_label')
+        doc.label = 'abc'
+        self.assertEqual(doc.label, 'ABC')
+        self.assertEqual(doc.__dict__['_label'], 'abc')
+        # only XML_Property descriptors are written
+        self.assertNotIn('abc', doc.to_string().lower())
+        self.assertEqual(doc.name, 'a')
+
+    def test_replaces_value(self):
+        doc = Document()
+        doc.label = 'plain'
+        doc.label = Upper('_label')
+        doc.label = 'abc'
+        self.assertEqual(doc.label, 'ABC')
+
+    def test_without_set(self):
+        doc = Document()
+        doc.value = Constant()
+        self.assertEqual(doc.value, 'constant')
+        doc.value = 'plain'
+        self.assertEqual(doc.value, 'plain')
+
+    def test_plain(self):
+        doc = Document()
+        doc.value = 1
+        doc.function = len
+        self.assertEqual(doc.__dict__['value'], 1)
+        self.assertIs(doc.function, len)
+        self.assertEqual(doc.method(), 'method')
+        self.assertIsNone(doc._xml_descriptors)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+
+from obj2xml import XML_Object, XML_Property, XML_TextProperty, XML_ListProperty
+from obj2xml.diff import Change, ChangeSet, ListChange
+
+
+class Child(XML_Object):
+    name = XML_Property(['name'])
+    size = XML_Property(['size'], default=0)
+
+
+class Document(XML_Object):
+    name = XML_Property(['root', 'name'])
+    version = XML_Property(['root', 'info', 'version'], default='1')
+    title = XML_TextProperty(['root', 'title'])
+    children = XML_ListProperty(['root', 'children', 'child'], child=Child, key='name')
+    tags = XML_ListProperty(['root', 'tags', 'tag'])
+
+
+def create_document(**kwargs):
+    doc = Document(name='doc', title='Title', **kwargs)
+    doc.children = [Child(name='a', size=1), Child(name='b', size=2)]
+    doc.tags = ['x', 'y']
+    return doc
+
+
+class DiffTest(unittest.TestCase):
+    def test_same(self):
+        changes = create_document().diff(create_document())
+        self.assertIsInstance(changes, ChangeSet)
+        self.assertFalse(changes)
+        self.assertEqual(changes, [])
+
+    def test_defaults(self):
+        # an unset value compares as its default
+        self.assertFalse(create_document().diff(create_document(version='1')))
+        self.assertTrue(create_document().diff(create_document(version='2')))
+
+    def test_values(self):
+        new = create_document(version='2')
+        new.title = None
+        changes = create_document().diff(new)
+        self.assertEqual(changes, [
+            Change('title', ('root', 'title', '_text'), 'Title', None),
+            Change('version', ('root', 'info', 'version'), '1', '2'),
+        ])
+
+    def test_keyed_children(self):
+        new = create_document()
+        new.children = [Child(name='b', size=3), Child(name='c'), Child(name='a', size=1)]
+        (change,) = create_document().diff(new)
+        self.assertIsInstance(change, ListChange)
+        self.assertEqual((change.name, change.key), ('children', 'name'))
+        self.assertEqual([child.name for child in change.added], ['c'])
+        self.assertEqual(change.removed, [])
+        ((old, child, nested),) = change.changed
+        self.assertEqual((old.size, child.size), (2, 3))
+        self.assertEqual(nested, [Change('size', ('size',), 2, 3)])
+
+    def test_positional_children(self):
+        new = create_document()
+        new.tags = ['x', 'z', 'w']
+        (change,) = create_document().diff(new)
+        self.assertIsNone(change.key)
+        self.assertEqual((change.added, change.removed), (['w'], []))
+        self.assertEqual(change.changed, [('y', 'z', None)])
+
+        new.tags = ['x']
+        (change,) = create_document().diff(new)
+        self.assertEqual((change.added, change.removed, change.changed), ([], ['y'], []))
+
+    def test_keys(self):
+        new = create_document()
+        new.children = [Child(name='b', size=2), Child(name='a', size=1)]
+        self.assertFalse(create_document().diff(new))
+        self.assertFalse(create_document().diff(new, keys={'children': lambda child: child.size}))
+        # None matches children by position
+        (change,) = create_document().diff(new, keys={'children': None})
+        self.assertEqual(len(change.changed), 2)
+
+    def test_generators(self):
+        new = create_document()
+        new.tags = (tag for tag in ['x', 'y'])
+        self.assertFalse(create_document().diff(new))
+
+    def test_instance_descriptor(self):
+        new = create_document()
+        new.extra = XML_Property(['root', 'extra'], default='e')
+        (change,) = create_document().diff(new)
+        self.assertEqual(change, Change('extra', ('root', 'extra'), None, 'e'))
+
+
+class DeltaTest(unittest.TestCase):
+    def delta(self, new):
+        return create_document().diff(new).to_string(xml_declaration=False)
+
+    def test_values(self):
+        new = create_document(version='2')
+        new.title = None
+        self.assertEqual(self.delta(new), '<root><title /><info version="2" /></root>')
+
+    def test_children(self):
+        new = create_document()
+        new.children = [Child(name='b', size=3), Child(name='c')]
+        self.assertEqual(
+            self.delta(new),
+            '<root><children>'
+            '<child name="c" size="0" delta="added" />'
+            '<child name="b" size="3" delta="changed" />'
+            '<child name="a" delta="removed" />'
+            '</children></root>'
+        )
+
+    def test_scalar_children(self):
+        new = create_document()
+        new.tags = ['x', 'z', 'w']
+        self.assertEqual(self.delta(new), '<root><tags><tag>w</tag><tag>z</tag></tags></root>')
+
+    def test_bytes(self):
+        new = create_document()
+        new.name = 'caf\xe9'
+        changes = create_document().diff(new)
+        self.assertEqual(changes.to_bytes(),
+                         b'<?xml version="1.0" encoding="utf-8"?><root name="caf\xc3\xa9" />')
+        self.assertEqual(changes.to_bytes('ascii', xml_declaration=False),
+                         b'<root name="caf&#233;" />')
+        self.assertEqual(changes.to_string(pretty=True, xml_declaration=False),
+                         '<root name="caf\xe9"/>\n')
+
+    def test_empty(self):
+        self.assertEqual(ChangeSet().to_dict(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import collections
+import unittest
+
+try:
+    import dataclasses
+except ImportError:
+    dataclasses = None
+
+from obj2xml import XML_Object, XML_Property
+
+
+class Document(XML_Object):
+    name = XML_Property(['root', 'name'])
+    size = XML_Property(['root', 'size'], default=0)
+    _secret = XML_Property(['root', 'secret'])
+
+
+Row = collections.namedtuple('Row', ['name', 'size', 'other'])
+
+
+class Plain(object):
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self.other = 'other'
+
+
+class Computed(object):
+    @property
+    def name(self):
+        return 'computed'
+
+    def size(self):
+        return 1
+
+
+class Slotted(object):
+    __slots__ = ('name', 'size')
+
+    def __init__(self, name):
+        self.name = name
+
+
+def values(doc):
+    return (doc.name, doc.size, doc._secret)
+
+
+class FromObjectTest(unittest.TestCase):
+    def test_mapping(self):
+        doc = Document.from_object({'name': 'a', 'size': 2, 'other': 3, '_secret': 's'})
+        self.assertEqual(values(doc), ('a', 2, None))
+
+    def test_mapping_callable(self):
+        doc = Document.from_object({'name': 'a', 'size': len})
+        self.assertEqual(values(doc), ('a', 0, None))
+
+    def test_namedtuple(self):
+        self.assertEqual(values(Document.from_object(Row('a', 2, 3))), ('a', 2, None))
+
+    def test_attributes(self):
+        self.assertEqual(values(Document.from_object(Plain('a', 2))), ('a', 2, None))
+
+    def test_properties_and_methods(self):
+        # properties are read, methods are skipped
+        self.assertEqual(values(Document.from_object(Computed())), ('computed', 0, None))
+
+    def test_slots(self):
+        # unset slots are missing
+        self.assertEqual(values(Document.from_object(Slotted('a'))), ('a', 0, None))
+
+    @unittest.skipIf(dataclasses is None, 'dataclasses needs Python 3.7')
+    def test_dataclass(self):
+        cls = dataclasses.make_dataclass('Data', ['name', 'size'])
+        self.assertEqual(values(Document.from_object(cls('a', 2))), ('a', 2, None))
+
+    def test_underscore(self):
+        source = {'name': 'a', '_secret': 's'}
+        doc = Document.from_object(source, ignore_underscore=False)
+        self.assertEqual(values(doc), ('a', 0, 's'))
+        self.assertEqual(values(Document.from_object(source, names=['_secret'])), (None, 0, 's'))
+
+    def test_from_objects(self):
+        read = []
+
+        def rows():
+            for row in [Row('a', 1, None), {'name': 'b'}, Plain('c', 3)]:
+                read.append(row)
+                yield row
+
+        docs = Document.from_objects(rows())
+        self.assertEqual(read, [])
+        self.assertEqual(values(next(docs)), ('a', 1, None))
+        self.assertEqual(len(read), 1)
+        self.assertEqual([values(doc) for doc in docs], [('b', 0, None), ('c', 3, None)])
+
+    def test_from_objects_names(self):
+        docs = Document.from_objects([{'name': 'a', 'size': 1}], names=['size'])
+        self.assertEqual([values(doc) for doc in docs], [(None, 1, None)])
+
+
+if __name__ == '__main__':
+    unittest.main()
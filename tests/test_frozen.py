@@ -0,0 +1,136 @@
+import pickle
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from obj2xml.frozen import FrozenDict
+
+from tests import documents
+from tests.test_compact import create_compact
+
+
+def create_document():
+    doc = documents.create_lists()
+    doc.extra = {'key': 'c', 'nested': {'values': [1, 2]}}
+    return doc
+
+
+class FreezeTest(unittest.TestCase):
+    def test_snapshot(self):
+        doc = create_document()
+        expected = doc.to_bytes()
+        frozen = doc.freeze()
+        self.assertIsNot(frozen, doc)
+        self.assertTrue(frozen.xml_frozen)
+        self.assertFalse(doc.xml_frozen)
+        self.assertIs(frozen.freeze(), frozen)
+        self.assertEqual(frozen.to_bytes(), expected)
+
+        # changing the original leaves the snapshot alone
+        doc.title = 'Changed'
+        doc.items[0].name = 'changed'
+        doc.items = documents.Item(name='added')
+        doc.extra[3]['nested']['values'].append(3)
+        self.assertEqual(frozen.to_bytes(), expected)
+
+    def test_values(self):
+        frozen = create_document().freeze()
+        self.assertIsInstance(frozen.items, tuple)
+        self.assertTrue(all(item.xml_frozen for item in frozen.items))
+        self.assertIsInstance(frozen.extra[3], FrozenDict)
+        self.assertEqual(frozen.extra[3]['nested']['values'], (1, 2))
+        # defaults are read as they are from the original
+        self.assertEqual(frozen.name, 'document')
+
+    def test_immutable(self):
+        frozen = create_document().freeze()
+        self.assertRaises(AttributeError, setattr, frozen, 'title', 'x')
+        self.assertRaises(AttributeError, setattr, frozen, 'items', [])
+        self.assertRaises(AttributeError, setattr, frozen, 'other', 1)
+        self.assertRaises(AttributeError, delattr, frozen, 'title')
+        self.assertRaises(AttributeError, setattr, frozen.items[0], 'name', 'x')
+        self.assertFalse(hasattr(frozen.items, 'append'))
+
+    def test_frozen_dict(self):
+        data = FrozenDict(a=1, b={'c': 2})
+        for change in (lambda: data.__setitem__('a', 2), lambda: data.__delitem__('a'),
+                       data.clear, lambda: data.pop('a'), data.popitem,
+                       lambda: data.setdefault('d', 1), lambda: data.update(d=1),
+                       lambda: data.__ior__({'d': 1})):
+            self.assertRaises(TypeError, change)
+        self.assertEqual(data, {'a': 1, 'b': {'c': 2}})
+
+    def test_frozen_dict_hash(self):
+        self.assertEqual(hash(FrozenDict(a=1, b=2)), hash(FrozenDict(b=2, a=1)))
+        self.assertEqual(FrozenDict(a=1), {'a': 1})
+        self.assertRaises(TypeError, hash, FrozenDict(a=[1]))
+        read = pickle.loads(pickle.dumps(FrozenDict(a=1)))
+        self.assertIsInstance(read, FrozenDict)
+        self.assertEqual(read, {'a': 1})
+
+    def test_generator(self):
+        doc = documents.Document()
+        doc.tags = (str(i) for i in range(3))
+        frozen = doc.freeze()
+        self.assertEqual(frozen.tags, ('0', '1', '2'))
+        self.assertEqual(frozen.to_string(), frozen.to_string())
+
+    def test_compact(self):
+        doc = create_compact()
+        frozen = doc.freeze()
+        doc.size = 9
+        self.assertEqual(frozen.size, 5)
+        self.assertEqual(frozen.files, (FrozenDict(name='b'),))
+        self.assertRaises(AttributeError, setattr, frozen, 'size', 1)
+
+    def test_threads(self):
+        frozen = create_document().freeze()
+        expected = frozen.to_bytes()
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(lambda _: frozen.to_bytes(), range(20)))
+        self.assertEqual(results, [expected] * 20)
+
+
+class FrozenEqualityTest(unittest.TestCase):
+    def test_equal(self):
+        a = create_document().freeze()
+        b = create_document().freeze()
+        self.assertEqual(a, b)
+        self.assertEqual(hash(a), hash(b))
+        self.assertEqual(len(set([a, b])), 1)
+        self.assertFalse(a != b)
+
+    def test_not_equal(self):
+        a = create_document().freeze()
+        doc = create_document()
+        doc.title = 'Other'
+        self.assertNotEqual(a, doc.freeze())
+        self.assertNotEqual(documents.create_basic().freeze(), documents.Blank(title='Title').freeze())
+
+    def test_unfrozen(self):
+        # unfrozen objects compare by identity
+        a = create_document()
+        self.assertNotEqual(a, create_document())
+        self.assertNotEqual(a.freeze(), a)
+        self.assertEqual(hash(a), object.__hash__(a))
+
+
+class FrozenPickleTest(unittest.TestCase):
+    def test_pickle(self):
+        frozen = create_document().freeze()
+        for protocol in range(2, pickle.HIGHEST_PROTOCOL + 1):
+            read = pickle.loads(pickle.dumps(frozen, protocol))
+            self.assertTrue(read.xml_frozen)
+            self.assertEqual(read, frozen)
+            self.assertEqual(hash(read), hash(frozen))
+            self.assertEqual(read.to_bytes(), frozen.to_bytes())
+            self.assertRaises(AttributeError, setattr, read, 'title', 'x')
+
+    def test_pickle_compact(self):
+        frozen = create_compact().freeze()
+        read = pickle.loads(pickle.dumps(frozen))
+        self.assertEqual(read, frozen)
+        self.assertRaises(AttributeError, setattr, read, 'size', 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
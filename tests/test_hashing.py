@@ -0,0 +1,94 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from obj2xml import hashing
+
+
+class HashingTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.directory, 'hashes.json')
+        self.paths = []
+        for i in range(3):
+            path = os.path.join(self.directory, 'file%d' % i)
+            with open(path, 'wb') as f:
+                f.write(b'data %d' % i * 100)
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def expected(self, path, algorithm='sha1'):
+        with open(path, 'rb') as f:
+            return hashlib.new(algorithm, f.read()).hexdigest()
+
+    def hash_files(self, cache):
+        """Returns the hashes of the files and the number which were read."""
+        with mock.patch.object(hashing, 'hash_file', wraps=hashing.hash_file) as hash_file:
+            hashes = hashing.hash_files(self.paths, cache=cache, workers=1)
+        return hashes, hash_file.call_count
+
+    def test_hash_file(self):
+        path = self.paths[0]
+        for chunk_size in (1, 7, hashing.CHUNK_SIZE):
+            self.assertEqual(hashing.hash_file(path, chunk_size=chunk_size), self.expected(path))
+        self.assertEqual(hashing.hash_file(path, 'md5'), self.expected(path, 'md5'))
+
+    def test_hash_files(self):
+        expected = dict((path, self.expected(path)) for path in self.paths)
+        for workers in (1, 3):
+            self.assertEqual(hashing.hash_files(self.paths, workers=workers), expected)
+
+    def test_persist(self):
+        cache = hashing.HashCache(self.cache_path)
+        hashes, read = self.hash_files(cache)
+        self.assertEqual(read, 3)
+        self.assertTrue(cache.changed)
+        cache.save()
+        self.assertFalse(cache.changed)
+
+        cache = hashing.HashCache(self.cache_path)
+        self.assertEqual(self.hash_files(cache), (hashes, 0))
+        self.assertFalse(cache.changed)
+
+    def test_changed_file(self):
+        cache = hashing.HashCache(self.cache_path)
+        self.hash_files(cache)
+        cache.save()
+
+        path = self.paths[0]
+        stat = os.stat(path)
+        # the same size, but modified later
+        with open(path, 'r+b') as f:
+            f.write(b'X')
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+        cache = hashing.HashCache(self.cache_path)
+        hashes, read = self.hash_files(cache)
+        self.assertEqual(read, 1)
+        self.assertEqual(hashes[path], self.expected(path))
+
+    def test_algorithm(self):
+        cache = hashing.HashCache()
+        path = self.paths[0]
+        self.assertEqual(hashing.cached_hash(path, 'sha1', cache), self.expected(path))
+        self.assertEqual(hashing.cached_hash(path, 'md5', cache), self.expected(path, 'md5'))
+
+    def test_save(self):
+        cache = hashing.HashCache()
+        self.hash_files(cache)
+        self.assertRaises(ValueError, cache.save)
+        cache.save(self.cache_path)
+        self.assertEqual(hashing.HashCache(self.cache_path).entries, cache.entries)
+        self.assertEqual(os.listdir(self.directory).count('hashes.json'), 1)
+        self.assertFalse([name for name in os.listdir(self.directory) if name.endswith('.tmp')])
+
+
+if __name__ == '__main__':
+    unittest.main()
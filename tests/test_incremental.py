@@ -0,0 +1,117 @@
+import copy
+import unittest
+
+from obj2xml import XML_Object, XML_Property, XML_TextProperty, XML_ListProperty
+
+
+def create_classes(compact=False):
+    class Child(XML_Object):
+        xml_incremental = True
+        name = XML_Property(['name'])
+
+    class Document(XML_Object):
+        xml_incremental = True
+        xml_compact = compact
+        client = XML_Property(['sync', 'meta', 'client', 'version'], default='1')
+        server = XML_Property(['sync', 'meta', 'server', 'version'], default='2')
+        title = XML_TextProperty(['sync', 'title'])
+        files = XML_ListProperty(['sync', 'files', 'file'])
+
+    return Document, Child
+
+
+class IncrementalTest(unittest.TestCase):
+    compact = False
+
+    def setUp(self):
+        self.Document, self.Child = create_classes(self.compact)
+
+    def check(self, doc):
+        """Checks the cached render matches a fresh one."""
+        text = doc.to_string(pretty=False)
+        doc.__dict__['xml_incremental'] = False
+        try:
+            self.assertEqual(text, doc.to_string(pretty=False))
+        finally:
+            del doc.__dict__['xml_incremental']
+        return text
+
+    def test_set(self):
+        doc = self.Document()
+        self.assertIn('<client version="1" />', self.check(doc))
+        doc.client = '3'
+        text = self.check(doc)
+        self.assertIn('<client version="3" />', text)
+        self.assertIn('<server version="2" />', text)
+
+    def test_delete(self):
+        doc = self.Document(client='3', title='t')
+        self.check(doc)
+        del doc.client
+        del doc.title
+        text = self.check(doc)
+        self.assertIn('<client version="1" />', text)
+        self.assertNotIn('<title>', text)
+
+    def test_formats(self):
+        doc = self.Document()
+        compact = doc.to_string(pretty=False)
+        pretty = doc.to_string(pretty=True)
+        self.assertEqual(doc.to_string(pretty=False), compact)
+        self.assertEqual(doc.to_string(pretty=True), pretty)
+        self.assertNotEqual(compact, pretty)
+
+    def test_replace_descriptor(self):
+        doc = self.Document()
+        self.check(doc)
+        self.Document.client = XML_Property(['sync', 'meta', 'client', 'version'], default='9')
+        self.assertIn('<client version="9" />', self.check(doc))
+        del self.Document.server
+        self.assertNotIn('<server', self.check(doc))
+
+    def test_add_descriptor(self):
+        doc = self.Document()
+        self.check(doc)
+        doc.extra = XML_Property(['sync', 'meta', 'extra'], default='E')
+        self.assertIn('<meta extra="E">', self.check(doc))
+
+    def test_remove_descriptor(self):
+        doc = self.Document()
+        doc.extra = XML_Property(['sync', 'meta', 'extra'], default='E')
+        self.assertIn('extra="E"', self.check(doc))
+        del doc.extra
+        self.assertNotIn('extra="E"', self.check(doc))
+
+    def test_copy(self):
+        doc = self.Document()
+        self.check(doc)
+        copied = copy.copy(doc)
+        copied.client = '3'
+        self.assertIn('<client version="3" />', self.check(copied))
+        self.assertIn('<client version="1" />', self.check(doc))
+
+    def test_lists(self):
+        doc = self.Document()
+        files = [{'name': 'a'}]
+        doc.files = files
+        self.check(doc)
+        files.append({'name': 'b'})
+        self.assertIn('<file name="b" />', self.check(doc))
+        files[0]['name'] = 'c'
+        self.assertIn('<file name="c" />', self.check(doc))
+
+    def test_children(self):
+        doc = self.Document()
+        child = self.Child(name='a')
+        doc.files = child
+        self.check(doc)
+        child.name = 'b'
+        self.assertIn('<file name="b" />', self.check(doc))
+
+
+class CompactIncrementalTest(IncrementalTest):
+    compact = True
+
+
+if __name__ == '__main__':
+    unittest.main()
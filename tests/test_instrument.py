@@ -0,0 +1,66 @@
+import threading
+import unittest
+
+from obj2xml import XML_Object, XML_Property, instrument
+
+
+class Switching(XML_Property):
+    """Switches recording on while a document is being written."""
+    def __get__(self, instance, owner):
+        if instance is not None:
+            instrument.enable()
+        return super(Switching, self).__get__(instance, owner)
+
+
+class Document(XML_Object):
+    name = XML_Property(['root', 'name'], default='doc')
+
+
+class SwitchingDocument(XML_Object):
+    name = Switching(['root', 'name'], default='doc')
+
+
+class InstrumentTest(unittest.TestCase):
+    def setUp(self):
+        instrument.disable()
+        instrument.reset()
+
+    tearDown = setUp
+
+    def test_switched_on_during_render(self):
+        for render in ('to_string', 'to_bytes', 'to_dict'):
+            instrument.disable()
+            getattr(SwitchingDocument(), render)()
+
+    def test_stats(self):
+        instrument.enable()
+        Document().to_bytes()
+        self.assertEqual(instrument.stats()['write']['Document']['count'], 1)
+
+    def test_capture_other_threads(self):
+        started = threading.Event()
+        finished = threading.Event()
+        breakdowns = []
+
+        def capture():
+            with instrument.capture() as breakdown:
+                started.set()
+                finished.wait()
+                Document().to_bytes()
+            breakdowns.append(breakdown)
+
+        thread = threading.Thread(target=capture)
+        thread.start()
+        started.wait()
+        # written while the other thread captures, so not recorded
+        Document().to_bytes()
+        finished.set()
+        thread.join()
+
+        self.assertEqual(breakdowns[0].stages['write']['count'], 1)
+        self.assertEqual(instrument.stats()['write']['Document']['count'], 1)
+        self.assertFalse(instrument.enabled)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import shutil
+import tempfile
+import unittest
+import weakref
+from xml.etree.ElementTree import ParseError
+
+from obj2xml import XML_Object, XML_Property, XML_TextProperty, XML_ListProperty
+
+
+class Child(XML_Object):
+    name = XML_Property(['name'])
+
+
+class Document(XML_Object):
+    name = XML_Property(['root', 'name'])
+    title = XML_TextProperty(['root', 'title'])
+    notes = XML_TextProperty(['root', 'notes'])
+    body = XML_TextProperty(['root', 'body'])
+    children = XML_ListProperty(['root', 'body', 'child'], child=Child)
+
+
+class LazyTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'document.xml')
+        doc = Document(name='doc', title='Title')
+        for i in range(3):
+            doc.children = Child(name=str(i))
+        with open(self.path, 'wb') as f:
+            doc.write(f)
+        self.expected = Document.from_xml(self.path).to_bytes()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def test_close_after_reading_one_value(self):
+        doc = Document.from_xml(self.path, lazy=True)
+        self.assertEqual(doc.name, 'doc')
+        doc.xml_close()
+        self.assertEqual(doc.to_bytes(), self.expected)
+
+    def test_write_after_reading_one_value(self):
+        doc = Document.from_xml(self.path, lazy=True)
+        self.assertEqual(doc.title, 'Title')
+        self.assertEqual(doc.to_bytes(), self.expected)
+
+    def test_freeze_after_reading_one_value(self):
+        doc = Document.from_xml(self.path, lazy=True)
+        self.assertEqual(doc.name, 'doc')
+        self.assertEqual(doc.freeze().to_bytes(), self.expected)
+        self.assertEqual(doc.to_bytes(), self.expected)
+
+    def test_children(self):
+        doc = Document.from_xml(self.path, lazy=True)
+        self.assertEqual(len(doc.children), 3)
+        self.assertEqual(doc.children[1].name, '1')
+        doc.xml_close()
+        self.assertEqual(doc.to_bytes(), self.expected)
+
+    def test_text_matches_eager(self):
+        self.write(
+            b'<root><title><![CDATA[x < y]]></title>'
+            b'<notes>hello<!-- comment --> world</notes>'
+            b'<body>\n  text\n  <child name="a"/>\n</body></root>'
+        )
+        eager = Document.from_xml(self.path)
+        lazy = Document.from_xml(self.path, lazy=True)
+        for name in ('title', 'notes', 'body'):
+            self.assertEqual(getattr(lazy, name), getattr(eager, name))
+        self.assertEqual(lazy.title, 'x < y')
+        self.assertEqual(lazy.notes, 'hello world')
+        self.assertEqual(lazy.body, 'text')
+        lazy.xml_close()
+
+    def test_empty(self):
+        self.write(b'')
+        self.assertRaises(ParseError, Document.from_xml, self.path)
+        doc = Document.from_xml(self.path, lazy=True)
+        self.assertIsNone(doc.name)
+        self.assertRaises(ParseError, doc.xml_close)
+        self.assertRaises(ParseError, doc.to_bytes)
+
+    def test_invalid(self):
+        self.write(b'<root name="doc"><title>Title</root>')
+        self.assertRaises(ParseError, Document.from_xml, self.path)
+        doc = Document.from_xml(self.path, lazy=True)
+        self.assertEqual(doc.name, 'doc')
+        self.assertRaises(ParseError, doc.xml_close)
+
+    def test_with(self):
+        with Document.from_xml(self.path, lazy=True) as doc:
+            self.assertEqual(doc.name, 'doc')
+            source = doc.__dict__['_xml_lazy']
+        self.assertTrue(source.data.closed)
+        self.assertNotIn('_xml_lazy', doc.__dict__)
+        self.assertEqual(doc.to_bytes(), self.expected)
+
+    def test_with_error(self):
+        with self.assertRaises(KeyError):
+            with Document.from_xml(self.path, lazy=True) as doc:
+                self.assertEqual(len(doc.children), 3)
+                source = doc.__dict__['_xml_lazy']
+                raise KeyError
+        self.assertTrue(source.data.closed)
+        # the rest of the file wasn't read
+        self.assertIsNone(doc.title)
+
+    def test_release(self):
+        doc = Document.from_xml(self.path, lazy=True)
+        self.assertEqual(doc.name, 'doc')
+        source = weakref.ref(doc.__dict__['_xml_lazy'])
+        # a suspended scan doesn't keep the source alive
+        del doc
+        self.assertIsNone(source())
+
+
+if __name__ == '__main__':
+    unittest.main()
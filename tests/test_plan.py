@@ -0,0 +1,100 @@
+import unittest
+
+import obj2xml
+from obj2xml import XML_Object, XML_Property, XML_TextProperty, compile_plan
+
+
+def names(plan):
+    return [entry.name for entry in plan]
+
+
+class PlanTest(unittest.TestCase):
+    def setUp(self):
+        # fresh classes, as the tests change them
+        class Parent(XML_Object):
+            name = XML_Property(['root', 'name'])
+            title = XML_TextProperty(['root', 'title'])
+
+        class Child(Parent):
+            size = XML_Property(['root', 'size'])
+
+        self.Parent = Parent
+        self.Child = Child
+
+    def test_entries(self):
+        plan = compile_plan(self.Child)
+        self.assertEqual(names(plan), ['name', 'size', 'title'])
+        entry = plan[2]
+        self.assertIs(entry.prop, self.Parent.__dict__['title'])
+        self.assertEqual((entry.parents, entry.leaf), (('root', 'title'), '_text'))
+        self.assertIs(plan.owner, self.Child)
+        self.assertIs(compile_plan(self.Child), plan)
+        self.assertIs(self.Child().xml_plan(), plan)
+
+    def test_other_attributes(self):
+        plan = compile_plan(self.Child)
+        generation = obj2xml._plan_generation[0]
+        self.Child.xml_indent = '\t'
+        self.Child.other = 1
+        self.assertEqual(obj2xml._plan_generation[0], generation)
+        self.assertIs(compile_plan(self.Child), plan)
+
+    def test_add(self):
+        plan = compile_plan(self.Child)
+        self.Child.extra = XML_Property(['root', 'extra'], default='e')
+        self.assertIsNot(compile_plan(self.Child), plan)
+        self.assertEqual(names(compile_plan(self.Child)), ['extra', 'name', 'size', 'title'])
+        self.assertIn('extra="e"', self.Child().to_string())
+
+    def test_replace(self):
+        self.assertIn('<root name="a"', self.Child(name='a').to_string())
+        self.Parent.name = XML_Property(['root', 'info', 'name'])
+        plan = compile_plan(self.Child)
+        self.assertIs(plan[0].prop, self.Parent.__dict__['name'])
+        self.assertIn('<info name="a"', self.Child(name='a').to_string())
+
+    def test_mask(self):
+        compile_plan(self.Child)
+        self.Child.name = 'masked'
+        self.assertEqual(names(compile_plan(self.Child)), ['size', 'title'])
+        self.assertEqual(names(compile_plan(self.Parent)), ['name', 'title'])
+        del self.Child.name
+        self.assertEqual(names(compile_plan(self.Child)), ['name', 'size', 'title'])
+
+    def test_delete(self):
+        compile_plan(self.Child)
+        del self.Parent.title
+        self.assertEqual(names(compile_plan(self.Parent)), ['name'])
+        self.assertEqual(names(compile_plan(self.Child)), ['name', 'size'])
+        self.assertNotIn('title', self.Child(title='t').to_string())
+
+    def test_subclass(self):
+        compile_plan(self.Child)
+        self.Parent.extra = XML_Property(['root', 'extra'])
+        self.assertIn('extra', names(compile_plan(self.Child)))
+        # a subclass property masks the parent's
+        self.Child.extra = XML_Property(['root', 'child-extra'])
+        self.assertIs(compile_plan(self.Child)[0].prop, self.Child.__dict__['extra'])
+        self.assertIs(compile_plan(self.Parent)[0].prop, self.Parent.__dict__['extra'])
+
+    def test_instance_descriptor(self):
+        doc = self.Child(name='a')
+        other = self.Child()
+        doc.extra = XML_Property(['root', 'extra'], default='e')
+        plan = doc.xml_plan()
+        self.assertEqual(names(plan), ['extra', 'name', 'size', 'title'])
+        self.assertIs(doc.xml_plan(), plan)
+        self.assertIs(other.xml_plan(), compile_plan(self.Child))
+        self.assertNotIn('extra', names(compile_plan(self.Child)))
+
+        # the instance plan follows changes to the class
+        self.Parent.added = XML_Property(['root', 'added'])
+        self.assertIn('added', names(doc.xml_plan()))
+
+        del doc.extra
+        self.assertIs(doc.xml_plan(), compile_plan(self.Child))
+        self.assertNotIn('extra', doc.to_string())
+
+
+if __name__ == '__main__':
+    unittest.main()
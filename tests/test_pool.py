@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+from obj2xml import pool
+
+
+def copy_nothing(*args):
+    return 0
+
+
+def copy_short():
+    """Returns a copy function which reports copying two bytes,
+    then nothing.
+    """
+    counts = [2, 0]
+    return lambda *args: counts.pop(0)
+
+
+class PoolTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.root = os.path.join(self.directory, 'dest')
+        self.paths = []
+        for i, data in enumerate((b'first', b'second', b'first')):
+            path = os.path.join(self.directory, 'file%d' % i)
+            with open(path, 'wb') as f:
+                f.write(data)
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_ingest(self):
+        manifest = pool.ingest(self.paths, self.root)
+        self.assertEqual([entry.path for entry in manifest], self.paths)
+        self.assertEqual(len(manifest.written), 2)
+        self.assertEqual(len(manifest.existing), 1)
+        for entry in manifest:
+            self.assertEqual(self.read(os.path.join(self.root, entry.link)), self.read(entry.path))
+
+        again = pool.ingest(self.paths, self.root)
+        self.assertEqual(len(again.existing), 3)
+
+    def test_stale_temporary_file(self):
+        # a killed run left a temporary file linked to an earlier source
+        earlier = os.path.join(self.directory, 'earlier')
+        with open(earlier, 'wb') as f:
+            f.write(b'earlier')
+        hash_value = pool.hashing.hash_file(self.paths[1])
+        dest = os.path.join(self.root, pool.pool_link(hash_value))
+        os.makedirs(os.path.dirname(dest))
+        os.link(earlier, '%s.%d.tmp' % (dest, os.getpid()))
+
+        pool.ingest(self.paths[1:2], self.root, link=True)
+        self.assertEqual(self.read(earlier), b'earlier')
+        self.assertEqual(self.read(dest), b'second')
+
+    def test_copy(self):
+        manifest = pool.ingest(self.paths, self.root, link=False)
+        for entry in manifest.written:
+            self.assertNotEqual(entry.method, 'hardlink')
+        os.remove(self.paths[0])
+        self.assertEqual(self.read(os.path.join(self.root, manifest[0].link)), b'first')
+
+    def ingest_second(self):
+        manifest = pool.ingest(self.paths[1:2], self.root)
+        dest = os.path.join(self.root, manifest[0].link)
+        self.assertEqual(self.read(dest), b'second')
+        return manifest[0].method
+
+    def test_nothing_copied(self):
+        with mock.patch.object(os, 'copy_file_range', copy_nothing, create=True):
+            self.assertIn(self.ingest_second(), ('sendfile', 'copy'))
+
+    def test_nothing_sent(self):
+        with mock.patch.object(os, 'copy_file_range', copy_nothing, create=True), \
+                mock.patch.object(os, 'sendfile', copy_nothing, create=True):
+            self.assertEqual(self.ingest_second(), 'copy')
+
+    def assert_short(self, name):
+        with mock.patch.object(os, 'copy_file_range', copy_nothing, create=True), \
+                mock.patch.object(os, name, copy_short(), create=True):
+            self.assertRaises(IOError, pool.ingest, self.paths[1:2], self.root)
+        hash_value = pool.hashing.hash_file(self.paths[1])
+        directory = os.path.dirname(os.path.join(self.root, pool.pool_link(hash_value)))
+        self.assertEqual(os.listdir(directory), [])
+
+    def test_short_copy(self):
+        self.assert_short('copy_file_range')
+
+    def test_short_send(self):
+        self.assert_short('sendfile')
+
+
+if __name__ == '__main__':
+    unittest.main()
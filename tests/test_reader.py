@@ -0,0 +1,76 @@
+import io
+import unittest
+from xml.etree.ElementTree import ParseError, fromstring
+
+from obj2xml import XML_Object, XML_Property, XML_TextProperty, XML_ListProperty
+
+
+class Child(XML_Object):
+    name = XML_Property(['name'])
+    text = XML_Property(['_text'])
+
+
+class Document(XML_Object):
+    name = XML_Property(['root', 'name'])
+    version = XML_Property(['root', 'info', 'version'], default='1')
+    title = XML_TextProperty(['root', 'title'])
+    body = XML_TextProperty(['root', 'body'])
+    items = XML_ListProperty(['root', 'items', 'item'])
+    children = XML_ListProperty(['root', 'body', 'child'], child=Child)
+
+
+class ReaderTest(unittest.TestCase):
+    def test_dict_children(self):
+        doc = Document.from_xml(
+            b'<root><items>'
+            b'<item name="a">one</item>'
+            b'<item><size>1</size><size>2</size><part kind="x"/></item>'
+            b'</items></root>'
+        )
+        self.assertEqual(doc.items, [
+            {'name': 'a', '_text': 'one'},
+            {'size': [{'_text': '1'}, {'_text': '2'}], 'part': {'kind': 'x'}},
+        ])
+
+    def test_object_children(self):
+        doc = Document.from_xml(b'<root><body><child name="a">x</child><child/></body></root>')
+        self.assertEqual([(c.name, c.text) for c in doc.children], [('a', 'x'), (None, None)])
+        self.assertIsNone(doc.body)
+
+    def test_missing(self):
+        doc = Document.from_xml(b'<root><other name="x"><title>x</title></other></root>')
+        self.assertEqual((doc.name, doc.title, doc.items, doc.children), (None, None, None, None))
+        # unset values still read as their default
+        self.assertEqual(doc.version, '1')
+
+    def test_mixed_content(self):
+        doc = Document.from_xml(
+            b'<root><body>\n  text\n  <child name="a"/>\n  <child name="b"/>\n</body>'
+            b'<title> spaced </title></root>'
+        )
+        # text around children is pretty printing, text on its own is kept
+        self.assertEqual(doc.body, 'text')
+        self.assertEqual(doc.title, ' spaced ')
+        self.assertEqual([c.name for c in doc.children], ['a', 'b'])
+
+    def test_sources(self):
+        data = Document(name='a', title='t', items=[{'name': 'b'}]).to_bytes()
+        for source in (data, io.BytesIO(data)):
+            doc = Document.from_xml(source)
+            self.assertEqual(doc.to_bytes(), data)
+
+    def test_from_element(self):
+        child = Child.from_element(fromstring('<child name="a">x</child>'))
+        self.assertEqual((child.name, child.text), ('a', 'x'))
+
+    def test_empty(self):
+        self.assertRaises(ParseError, Document.from_xml, b'')
+        self.assertRaises(ParseError, Document.from_xml, io.BytesIO())
+
+    def test_invalid(self):
+        for data in (b'<root>', b'<root></other>', b'text', b'<root/><root/>'):
+            self.assertRaises(ParseError, Document.from_xml, data)
+
+
+if __name__ == '__main__':
+    unittest.main()
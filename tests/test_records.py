@@ -0,0 +1,114 @@
+import sqlite3
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from obj2xml import XML_Object, XML_Property, XML_TextProperty, XML_ListProperty, Records
+
+
+class Row(XML_Object):
+    name = XML_Property(['name'])
+    size = XML_Property(['size'], default=0)
+    link = XML_TextProperty(['link'])
+
+
+class Extended(Row):
+    def to_dict(self):
+        data = super(Extended, self).to_dict()
+        data['extra'] = {'_text': self.name}
+        return data
+
+
+class Cached(Row):
+    xml_incremental = True
+    xml_codegen = True
+
+
+class Document(XML_Object):
+    rows = XML_ListProperty(['root', 'rows', 'row'])
+
+
+NAMES = ['a', 'b', 'c']
+SIZES = [1, None, 3]
+LINKS = ['x', 'y', None]
+
+
+def write(rows, cls=Row):
+    doc = Document()
+    doc.rows = rows
+    return doc.to_string(pretty=False)
+
+
+def expected(cls=Row):
+    return write([cls(name=n, size=s, link=l) for n, s, l in zip(NAMES, SIZES, LINKS)])
+
+
+class RecordsTest(unittest.TestCase):
+    def test_columns(self):
+        records = Records(Row, {'name': NAMES, 'size': SIZES, 'link': LINKS})
+        self.assertEqual(len(records), 3)
+        self.assertEqual(write(records), expected())
+        # dict sources can be written again
+        self.assertTrue(records.reusable)
+        self.assertEqual(write(records), expected())
+        self.assertEqual(write(Records(Row, {'name': []})), Document().to_string(pretty=False))
+
+    def test_tuples(self):
+        rows = list(zip(NAMES, SIZES, LINKS))
+        self.assertEqual(write(Records(Row, rows, columns=['name', 'size', 'link'])), expected())
+        self.assertRaises(ValueError, write, Records(Row, rows))
+
+    def test_iterator(self):
+        records = Records(Row, iter(zip(NAMES, SIZES, LINKS)), columns=['name', 'size', 'link'])
+        self.assertFalse(records.reusable)
+        self.assertRaises(TypeError, len, records)
+        self.assertEqual(write(records), expected())
+
+    def test_cursor(self):
+        db = sqlite3.connect(':memory:')
+        try:
+            db.execute('CREATE TABLE files (name TEXT, size INTEGER, link TEXT)')
+            db.executemany('INSERT INTO files VALUES (?, ?, ?)', zip(NAMES, SIZES, LINKS))
+            cursor = db.execute('SELECT name, size, link FROM files ORDER BY name')
+            self.assertEqual(write(Records(Row, cursor)), expected())
+        finally:
+            db.close()
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_structured_array(self):
+        array = numpy.array(
+            list(zip(NAMES, [1, 0, 3], LINKS)),
+            dtype=[('name', 'U1'), ('size', 'i4'), ('link', 'O')]
+        )
+        sizes = [Row(name=n, size=s, link=l) for n, s, l in zip(NAMES, [1, 0, 3], LINKS)]
+        self.assertEqual(write(Records(Row, array)), write(sizes))
+
+    def test_unknown_column(self):
+        self.assertRaises(ValueError, write, Records(Row, {'name': NAMES, 'other': NAMES}))
+
+    def test_iterate(self):
+        rows = list(Records(Row, {'name': NAMES, 'size': SIZES}))
+        self.assertEqual([(row.name, row.size) for row in rows], [('a', 1), ('b', 0), ('c', 3)])
+        self.assertEqual(len(set(map(id, rows))), 3)
+
+    def test_to_dict_override(self):
+        records = Records(Extended, {'name': NAMES, 'size': SIZES, 'link': LINKS})
+        text = write(records)
+        self.assertEqual(text, expected(Extended))
+        self.assertIn('<extra>a</extra>', text)
+
+    def test_incremental(self):
+        records = Records(Cached, {'name': NAMES, 'size': SIZES, 'link': LINKS})
+        self.assertEqual(write(records), expected(Cached))
+        self.assertEqual(write(records), expected())
+        # the class's options are left alone
+        self.assertTrue(Cached().xml_incremental)
+        self.assertIsNone(Cached().xml_serializer())
+        self.assertIsNotNone(Cached().xml_serializer(incremental=False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import io
+import unittest
+
+from tests import documents
+
+
+def create_items(count, pulled=None):
+    """Yields count Items, recording in pulled how many were read."""
+    for i in range(count):
+        if pulled is not None:
+            pulled[0] = i + 1
+        yield documents.Item(name='item %d' % i, size=i, text='text %d' % i)
+
+
+def create_document(items):
+    doc = documents.Document(title='Streaming')
+    doc.items = items
+    doc.tags = ['a', 'b']
+    return doc
+
+
+class StreamingTest(unittest.TestCase):
+    def test_matches_list(self):
+        for options in ({}, {'pretty': True}, {'pretty': True, 'short_empty_elements': False}):
+            expected = create_document(list(create_items(5))).to_bytes(**options)
+            self.assertEqual(create_document(create_items(5)).to_bytes(**options), expected)
+            fp = io.BytesIO()
+            create_document(create_items(5)).write(fp, buffer_size=1, **options)
+            self.assertEqual(fp.getvalue(), expected)
+
+    def test_pulled_one_at_a_time(self):
+        pulled = [0]
+        doc = create_document(create_items(1000, pulled))
+        chunks = doc.iter_bytes(buffer_size=1)
+        data = next(chunks)
+        # the document's head is written before the children are read
+        self.assertLess(pulled[0], 2)
+        while b'item 10"' not in data:
+            data += next(chunks)
+        self.assertLess(pulled[0], 20)
+        data += b''.join(chunks)
+        self.assertEqual(pulled[0], 1000)
+        self.assertEqual(data.count(b'<item '), 1000)
+
+    def test_append_keeps_generator(self):
+        pulled = [0]
+        doc = create_document(create_items(3, pulled))
+        doc.items = documents.Item(name='last')
+        doc.items = documents.Item(name='after')
+        self.assertEqual(pulled[0], 0)
+        text = doc.to_string(pretty=False)
+        self.assertEqual(pulled[0], 3)
+        self.assertLess(text.index('item 2'), text.index('"last"'))
+        self.assertLess(text.index('"last"'), text.index('"after"'))
+
+    def test_written_once(self):
+        doc = create_document(create_items(3))
+        self.assertIn('item 2', doc.to_string())
+        self.assertNotIn('<item ', doc.to_string())
+
+    def test_iterables(self):
+        expected = create_document(list(create_items(3))).to_bytes()
+        for items in (tuple(create_items(3)), iter(list(create_items(3))),
+                      map(lambda item: item, create_items(3))):
+            self.assertEqual(create_document(items).to_bytes(), expected)
+
+    def test_replace(self):
+        doc = create_document(list(create_items(3)))
+        doc.items = create_items(1)
+        text = doc.to_string()
+        self.assertIn('item 0', text)
+        self.assertNotIn('item 1', text)
+
+    def test_scalars_and_dicts(self):
+        doc = documents.Document()
+        doc.tags = (str(i) for i in range(3))
+        doc.extra = ({'key': str(i)} for i in range(2))
+        self.assertIn('<extra key="0" /><extra key="1" />'
+                      '<tags><tag>0</tag><tag>1</tag><tag>2</tag></tags>', doc.to_string(pretty=False))
+
+    def test_to_dict(self):
+        doc = create_document(create_items(2))
+        self.assertEqual(len(doc.to_dict()['root']['items']['item']), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
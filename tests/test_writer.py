@@ -0,0 +1,198 @@
+import io
+import itertools
+import unittest
+import xml.dom.minidom
+from xml.etree import ElementTree
+
+from obj2xml import XML_Object, XML_Property, XML_TextProperty, XML_ListProperty
+
+from tests import documents
+
+
+FORMATS = list(itertools.product((False, True), ('  ', '\t'), (True, False)))
+
+
+class Empty(XML_Object):
+    value = XML_Property(['root', 'empty', 'value'])
+    child = XML_Property(['root', 'empty'])
+    text = XML_TextProperty(['root', 'text'])
+
+
+class Tabbed(Empty):
+    xml_indent = '\t'
+    xml_short_empty_elements = False
+
+
+class Blank(XML_Object):
+    # empty text is written as no text
+    text = XML_TextProperty(['root'], default='')
+    value = XML_Property(['root', 'empty', 'value'])
+    tags = XML_ListProperty(['root', 'tag'])
+
+
+def minidom_text(doc):
+    """The text the dict2xml and minidom round trip writes."""
+    data = ElementTree.tostring(doc.to_xml(), encoding='UTF-8')
+    return xml.dom.minidom.parseString(data).toprettyxml(indent='  ')
+
+
+class DictParityTest(unittest.TestCase):
+    """The writer writes what dict2xml and minidom did.
+
+    minidom leaves tabs and newlines in attributes unescaped, so they
+    read back as spaces, and escapes quotes in text, so documents with
+    those characters are checked by reading them back instead.
+    """
+    def create(self):
+        special = Empty(text='a & b < c > d')
+        special.value = 'e & f < g > h'
+        return [
+            documents.create_basic(),
+            documents.create_defaults(),
+            documents.create_lists(),
+            special,
+            Empty(text='', child={'_text': ''}),
+            Blank(),
+            Blank(value='v', tags=['', 't']),
+        ]
+
+    def test_pretty(self):
+        for doc in self.create():
+            self.assertEqual(str(doc), minidom_text(doc))
+
+    def test_compact(self):
+        for doc in self.create():
+            expected = ElementTree.tostring(doc.to_xml(), encoding='unicode')
+            self.assertEqual(doc.to_string(pretty=False, xml_declaration=False), expected)
+
+    def test_element_order(self):
+        # elements are placed where their first value which
+        # isn't None is in the plan, as to_dict adds them
+        doc = documents.Document(title='Title')
+        doc.enabled = None
+        self.assertEqual(
+            doc.to_string(pretty=False, xml_declaration=False),
+            '<root name="document"><title>Title</title><info version="1" /></root>'
+        )
+
+
+class EscapingTest(unittest.TestCase):
+    def test_round_trip(self):
+        special = documents.SPECIAL
+        doc = documents.create_special()
+        for pretty, indent, short in FORMATS:
+            text = doc.to_string(pretty, indent, short, xml_declaration=False)
+            root = ElementTree.fromstring(text)
+            self.assertEqual(root.get('name'), special)
+            self.assertEqual(root.find('title').text, special)
+            self.assertEqual(root.find('info').text, special)
+            self.assertEqual(root.find('items/item').get('name'), special)
+            self.assertEqual(root.find('items/item').text, special)
+            self.assertEqual(root.find('tags/tag').text, special)
+
+    def test_escapes(self):
+        doc = Empty(text='&<>"\t\r\n')
+        doc.value = '&<>"\t\r\n'
+        self.assertEqual(
+            doc.to_string(pretty=False, xml_declaration=False),
+            '<root><text>&amp;&lt;&gt;"\t&#13;\n</text>'
+            '<empty value="&amp;&lt;&gt;&quot;&#9;&#13;&#10;" /></root>'
+        )
+
+
+class FormatTest(unittest.TestCase):
+    def doc(self):
+        # a dict holding only None is written as an empty element
+        return Empty(text='t', child={'value': None})
+
+    def check(self, expected, **options):
+        self.assertEqual(self.doc().to_string(xml_declaration=False, **options), expected)
+
+    def test_compact_short(self):
+        self.check('<root><empty /><text>t</text></root>', pretty=False)
+
+    def test_compact_long(self):
+        self.check('<root><empty></empty><text>t</text></root>',
+                   pretty=False, short_empty_elements=False)
+
+    def test_pretty_short(self):
+        self.check('<root>\n  <empty/>\n  <text>t</text>\n</root>\n', pretty=True)
+
+    def test_pretty_long(self):
+        self.check('<root>\n\t<empty></empty>\n\t<text>t</text>\n</root>\n',
+                   pretty=True, indent='\t', short_empty_elements=False)
+
+    def test_empty_text(self):
+        doc = Blank(value='v', tags=[''])
+        self.assertEqual(doc.to_string(pretty=False, xml_declaration=False),
+                         '<root><tag /><empty value="v" /></root>')
+        self.assertEqual(doc.to_string(pretty=True, short_empty_elements=False, xml_declaration=False),
+                         '<root>\n  <tag></tag>\n  <empty value="v"></empty>\n</root>\n')
+        self.assertEqual(Blank().to_string(pretty=True, xml_declaration=False), '<root/>\n')
+
+    def test_declaration(self):
+        text = self.doc().to_string(pretty=False, encoding='utf-8')
+        self.assertTrue(text.startswith('<?xml version="1.0" encoding="utf-8"?>'))
+
+    def test_write(self):
+        for doc in documents.create_all():
+            for pretty, indent, short in FORMATS:
+                fp = io.BytesIO()
+                doc.write(fp, pretty=pretty, indent=indent, short_empty_elements=short,
+                          buffer_size=2)
+                expected = doc.to_bytes(pretty=pretty, indent=indent, short_empty_elements=short)
+                self.assertEqual(fp.getvalue(), expected)
+                self.assertEqual(b''.join(doc.iter_bytes(
+                    pretty=pretty, indent=indent, short_empty_elements=short, buffer_size=1
+                )), expected)
+
+    def test_generator(self):
+        doc = documents.Document()
+        doc.tags = (str(i) for i in range(3))
+        self.assertIn('<tags><tag>0</tag><tag>1</tag><tag>2</tag></tags>', doc.to_string(pretty=False))
+
+
+class StrTest(unittest.TestCase):
+    """str() pretty prints with the class's options."""
+    def test_default(self):
+        doc = Empty(text='t', child={'value': None})
+        self.assertEqual(str(doc), '<?xml version="1.0" ?>\n'
+                                   '<root>\n  <empty/>\n  <text>t</text>\n</root>\n')
+        self.assertEqual(str(doc), doc.to_string())
+
+    def test_class_options(self):
+        doc = Tabbed(text='t', child={'value': None})
+        self.assertEqual(str(doc), '<?xml version="1.0" ?>\n'
+                                   '<root>\n\t<empty></empty>\n\t<text>t</text>\n</root>\n')
+        # the class options also apply to compact output
+        self.assertEqual(doc.to_string(pretty=False, xml_declaration=False),
+                         '<root><empty></empty><text>t</text></root>')
+
+    def test_instance_options(self):
+        doc = Empty(text='t', child={'value': None})
+        doc.xml_indent = '    '
+        doc.xml_short_empty_elements = False
+        self.assertIn('\n    <empty></empty>\n', str(doc))
+        self.assertIn('\n  <empty/>\n', str(Empty(text='t', child={'value': None})))
+
+    def test_call_options(self):
+        doc = Tabbed(text='t', child={'value': None})
+        self.assertEqual(doc.to_string(indent=' ', short_empty_elements=True, xml_declaration=False),
+                         '<root>\n <empty/>\n <text>t</text>\n</root>\n')
+
+    def test_formats_shared(self):
+        doc = Tabbed()
+        self.assertIs(doc.xml_format(True), Empty().xml_format(True, '\t', False))
+        self.assertIsNot(doc.xml_format(True), Empty().xml_format(True))
+
+
+class ReadTest(unittest.TestCase):
+    def test_round_trip(self):
+        for doc in documents.create_all():
+            text = doc.to_bytes()
+            read = doc.__class__.from_xml(io.BytesIO(text))
+            self.assertEqual(read.to_bytes(), text)
+
+
+if __name__ == '__main__':
+    unittest.main()